@@ -0,0 +1,42 @@
+import tarfile
+import zipfile
+from pathlib import Path
+
+from tool.archive import FIXED_EPOCH, ArchiveMember, build_tar_xz, build_zip, collect_members
+
+
+def _tree(root: Path) -> None:
+    (root / "artifacts" / "assets").mkdir(parents=True)
+    (root / "artifacts" / "settings.json").write_text('{"profiles": {}}\n', encoding="utf-8")
+    (root / "artifacts" / "assets" / "icon.png").write_bytes(bytes(range(256)) * 40)
+    (root / "artifacts" / "__pycache__").mkdir()
+    (root / "artifacts" / "__pycache__" / "stale.pyc").write_bytes(b"x")
+    (root / "README.md").write_text("readme\n", encoding="utf-8")
+
+
+def test_zip_is_sorted_and_byte_identical(tmp_path: Path) -> None:
+    _tree(tmp_path)
+    members = collect_members([Path("README.md"), Path("artifacts")], root=tmp_path)
+
+    first = build_zip(members, tmp_path / "out" / "a.zip", workers=4)
+    (tmp_path / "README.md").touch()
+    second = build_zip(collect_members([Path("artifacts"), Path("README.md")], root=tmp_path), tmp_path / "out" / "b.zip", workers=1)
+
+    assert first.read_bytes() == second.read_bytes()
+    with zipfile.ZipFile(first) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == ["README.md", "artifacts/assets/icon.png", "artifacts/settings.json"]
+        assert zf.getinfo("README.md").date_time == (1980, 1, 1, 0, 0, 0)
+        assert zf.read("artifacts/assets/icon.png") == bytes(range(256)) * 40
+
+
+def test_tar_xz_is_reproducible(tmp_path: Path) -> None:
+    members = [ArchiveMember("patch.json", data=b"{}\n"), ArchiveMember("b.txt", data=b"b")]
+
+    first = build_tar_xz(members, tmp_path / "a.tar.xz")
+    second = build_tar_xz(members, tmp_path / "b.tar.xz")
+
+    assert first.read_bytes() == second.read_bytes()
+    with tarfile.open(first) as tar:
+        assert tar.getnames() == ["patch.json", "b.txt"]
+        assert tar.getmember("b.txt").mtime == FIXED_EPOCH
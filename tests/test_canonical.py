@@ -0,0 +1,69 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from tool import applier
+from tool.canonical import CanonicalError, canonical_bytes, canonical_digest, canonical_file_digest
+from tool.delta import plan_delta
+from tool.modes import ApplyMode
+from tool.validators import verify_manifest
+
+
+def test_encoding_ignores_order_whitespace_and_number_spelling() -> None:
+    left = {"b": [1.0, -0.0, 2.5], "a": {"y": "café", "x": None}, "c": True}
+    right = json.loads('{ "c": true, "a": {"x": null, "y": "cafe\\u0301"}, "b": [1, 0, 2.5] }')
+
+    assert canonical_bytes(left) == '{"a":{"x":null,"y":"café"},"b":[1,0,2.5],"c":true}'.encode()
+    assert canonical_digest(left) == canonical_digest(right)
+    assert canonical_digest({"n": 1e300}) != canonical_digest({"n": 1e299})
+    with pytest.raises(CanonicalError):
+        canonical_digest({"n": float("nan")})
+
+
+def _write(path: Path, data: dict, indent: int | None) -> None:
+    path.write_text(json.dumps(data, indent=indent, sort_keys=indent is None), encoding="utf-8")
+
+
+def test_reformatted_artifact_still_verifies_and_needs_no_delta(tmp_path: Path) -> None:
+    settings = {"profiles": {"list": [{"name": "Ubuntu", "guid": "{1}"}]}, "theme": "dark"}
+    path = tmp_path / "settings.json"
+    _write(path, settings, indent=2)
+    record = {
+        "name": "settings",
+        "path": path.as_posix(),
+        "sha256": "0" * 64,
+        "canonical_sha256": canonical_file_digest(path),
+    }
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps({"artifacts": [record]}), encoding="utf-8")
+
+    _write(path, settings, indent=None)
+    assert [result.status for result in verify_manifest(manifest)] == ["ok"]
+
+    reformatted = dict(record, sha256="1" * 64)
+    plan = plan_delta(
+        json.dumps({"artifacts": [record]}).encode(),
+        json.dumps({"artifacts": [reformatted]}).encode(),
+        "v1",
+        "v2",
+    )
+    assert plan.entries == []
+
+
+def test_apply_skips_when_target_is_canonically_equal(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    settings = {"profiles": {"list": [{"name": "Ubuntu", "guid": "{11111111-1111-1111-1111-111111111111}"}]}}
+    (tmp_path / "artifacts").mkdir()
+    _write(tmp_path / "artifacts" / "settings.json", settings, indent=2)
+    target = tmp_path / "settings.json"
+    _write(target, settings, indent=None)
+    before = target.read_bytes()
+    monkeypatch.setattr(applier, "resolve_windows_terminal_path", lambda: target)
+    monkeypatch.setattr(applier, "BACKUP_ROOT_WINDOWS", tmp_path / "backups")
+
+    _, backups = applier._apply_settings(ApplyMode.DEFAULT, dry_run=False)
+
+    assert backups == []
+    assert target.read_bytes() == before
+    assert not (tmp_path / "backups").exists()
@@ -0,0 +1,65 @@
+import json
+import os
+import subprocess
+import sys
+from hashlib import sha256
+from pathlib import Path
+
+import pytest
+
+from tool.validators import verify_manifest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+HEAVY_MODULES = {
+    "tool.applier",
+    "tool.exporter",
+    "tool.github_publisher",
+    "tool.installer",
+    "tool.sanitizer",
+    "tool.validators",
+    "rich.table",
+}
+# Generous enough for slow CI runners; tighten locally with OMNIFORGE_IMPORT_BUDGET_US.
+IMPORT_BUDGET_US = int(os.environ.get("OMNIFORGE_IMPORT_BUDGET_US", "400000"))
+
+
+def _import_times() -> dict[str, int]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import tool.cli"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_import_defers_command_modules() -> None:
+    times = _import_times()
+
+    assert not HEAVY_MODULES & times.keys()
+    assert times["tool.cli"] < IMPORT_BUDGET_US
+
+
+def test_verify_manifest_flags_hash_mismatch(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    good = tmp_path / "good.txt"
+    good.write_text("portable\n", encoding="utf-8")
+    (tmp_path / "bad.txt").write_text("edited\n", encoding="utf-8")
+    manifest = tmp_path / "manifest.json"
+    artifacts = [
+        {"path": "good.txt", "sha256": sha256(good.read_bytes()).hexdigest()},
+        {"path": "bad.txt", "sha256": "0" * 64},
+        {"path": "gone.txt", "sha256": "0" * 64},
+    ]
+    manifest.write_text(json.dumps({"artifacts": artifacts}), encoding="utf-8")
+
+    statuses = {result.name: result.status for result in verify_manifest(manifest)}
+
+    assert statuses == {"good.txt": "ok", "bad.txt": "mismatch", "gone.txt": "missing"}
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import socket
+import stat
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from pathlib import Path
+
+import pytest
+
+from tool import client
+from tool.daemon import SOCKET_MODE, Daemon
+
+
+@pytest.fixture
+def daemon_socket(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OMNIFORGE_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("OMNIFORGE_NO_DAEMON", raising=False)
+    path = client.socket_path()
+    thread = threading.Thread(target=asyncio.run, args=(Daemon(path).serve(),), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not path.exists():
+        assert time.monotonic() < deadline, "daemon did not start"
+        time.sleep(0.01)
+    yield path
+    client.request("shutdown", path=path)
+    thread.join(timeout=5)
+    assert not path.exists()
+
+
+def _manifest(tmp_path: Path) -> Path:
+    artifact = tmp_path / "artifacts" / "zshrc.portable"
+    artifact.parent.mkdir(parents=True)
+    artifact.write_text("export EDITOR=vim\n", encoding="utf-8")
+    manifest = tmp_path / "artifacts" / "manifest.json"
+    entry = {"path": "artifacts/zshrc.portable", "sha256": sha256(artifact.read_bytes()).hexdigest()}
+    manifest.write_text(json.dumps({"artifacts": [entry]}), encoding="utf-8")
+    return manifest
+
+
+def test_daemon_serves_concurrent_requests(daemon_socket: Path, tmp_path: Path) -> None:
+    _manifest(tmp_path)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        replies = list(pool.map(lambda _: client.request("verify", path=daemon_socket), range(16)))
+
+    assert all(reply["results"][0]["status"] == "ok" for reply in replies)
+    assert client.request("ping", path=daemon_socket)["requests"] >= len(replies) + 1
+    with pytest.raises(client.DaemonError, match="Unknown command"):
+        client.request("format-disk", path=daemon_socket)
+
+
+def test_client_forwards_sanitize_and_falls_back_without_daemon(
+    daemon_socket: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.setenv("HOME", str(tmp_path))
+    (tmp_path / ".zshrc").write_text("export PATH=/home/alice/bin:$PATH\n", encoding="utf-8")
+    (tmp_path / "docs").mkdir()
+
+    assert client.forward(["sanitize"]) == 0
+    assert "$HOME/bin" in (tmp_path / "artifacts" / "zshrc.portable").read_text(encoding="utf-8")
+    assert "path: artifacts/zshrc.portable" in capsys.readouterr().out
+
+    assert client.forward(["sanitize", "--trace", "t.json"]) is None
+    monkeypatch.setenv("OMNIFORGE_NO_DAEMON", "1")
+    assert client.forward(["verify"]) is None
+
+
+def test_non_object_requests_get_an_error_reply(daemon_socket: Path) -> None:
+    assert stat.S_IMODE(daemon_socket.stat().st_mode) == SOCKET_MODE
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.connect(str(daemon_socket))
+        stream = sock.makefile("rwb")
+        replies = []
+        for line in (b"[1]\n", b'"x"\n', b"{not json\n"):
+            stream.write(line)
+            stream.flush()
+            # Each bad line gets a reply on the same connection instead of killing it.
+            replies.append(json.loads(stream.readline()))
+
+    assert [(reply["id"], reply["ok"]) for reply in replies] == [(None, False)] * 3
+    assert "must be a JSON object" in replies[0]["error"]
+
+
+def test_parse_forwardable() -> None:
+    assert client.parse_forwardable(["apply", "--mode", "PROMOTE", "--dry-run"]) == (
+        "apply",
+        {"mode": "promote", "dry_run": True},
+    )
+    assert client.parse_forwardable(["export"]) == ("export", {})
+    assert client.parse_forwardable(["package"]) is None
+    assert client.parse_forwardable(["apply", "--force"]) is None
+
+
+def test_requests_from_another_checkout_run_locally(
+    daemon_socket: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _manifest(tmp_path)
+    artifact = tmp_path / "artifacts" / "zshrc.portable"
+    before = artifact.read_bytes()
+    other = tmp_path / "other-checkout"
+    other.mkdir()
+    monkeypatch.chdir(other)
+
+    with pytest.raises(client.DaemonUnavailableError, match="Daemon serves"):
+        client.request("verify", path=daemon_socket)
+    # forward() falls back to the local CLI rather than acting on the daemon's tree.
+    assert client.forward(["sanitize"]) is None
+    assert artifact.read_bytes() == before
@@ -0,0 +1,97 @@
+import json
+import zipfile
+from hashlib import sha256
+from pathlib import Path
+
+import pytest
+
+from tool.archive import ArchiveMember, build_zip
+from tool.delta import PATCH_MANIFEST, DeltaError, apply_delta, plan_delta
+
+
+def _manifest(**hashes: str) -> bytes:
+    artifacts = [{"path": path.replace("__", "/"), "sha256": digest} for path, digest in hashes.items()]
+    return json.dumps({"artifacts": artifacts}).encode("utf-8")
+
+
+def _digest(data: bytes) -> str:
+    return sha256(data).hexdigest()
+
+
+def test_plan_delta_lists_only_changed_artifacts() -> None:
+    base = _manifest(artifacts__settings="a", artifacts__zsh="b")
+    target = _manifest(artifacts__settings="a", artifacts__zsh="c")
+
+    plan = plan_delta(base, target, "v1.0.0", "v1.0.1")
+
+    assert [(entry.path, entry.action) for entry in plan.entries] == [
+        ("artifacts/zsh", "modify"),
+        ("artifacts/manifest.json", "modify"),
+    ]
+    assert plan_delta(base, base, "v1.0.0", "v1.0.0").entries == []
+
+
+def _bundle(tmp_path: Path, old: bytes, new: bytes) -> Path:
+    base_manifest = _manifest(artifacts__zshrc=_digest(old))
+    target_manifest = _manifest(artifacts__zshrc=_digest(new))
+    plan = plan_delta(base_manifest, target_manifest, "v1", "v2")
+    members = [
+        ArchiveMember("artifacts/zshrc", data=new),
+        ArchiveMember("artifacts/manifest.json", data=target_manifest),
+        ArchiveMember(PATCH_MANIFEST, data=plan.to_json().encode("utf-8")),
+    ]
+    release = tmp_path / "release"
+    (release / "artifacts").mkdir(parents=True)
+    (release / "artifacts" / "manifest.json").write_bytes(base_manifest)
+    return build_zip(members, tmp_path / "delta.zip")
+
+
+def test_apply_delta_updates_in_place(tmp_path: Path) -> None:
+    bundle = _bundle(tmp_path, b"old\n", b"new\n")
+    release = tmp_path / "release"
+    (release / "artifacts" / "zshrc").write_bytes(b"old\n")
+
+    changed = apply_delta(bundle, root=release)
+
+    assert (release / "artifacts" / "zshrc").read_bytes() == b"new\n"
+    assert len(changed) == len(["artifacts/zshrc", "artifacts/manifest.json"])
+    assert apply_delta(bundle, root=release) == []
+
+
+def test_apply_delta_rejects_diverged_base(tmp_path: Path) -> None:
+    bundle = _bundle(tmp_path, b"old\n", b"new\n")
+    release = tmp_path / "release"
+    (release / "artifacts" / "zshrc").write_bytes(b"locally edited\n")
+
+    with pytest.raises(DeltaError):
+        apply_delta(bundle, root=release)
+    assert (release / "artifacts" / "zshrc").read_bytes() == b"locally edited\n"
+
+
+def test_apply_delta_validates_everything_before_writing(tmp_path: Path) -> None:
+    release = tmp_path / "release"
+    (release / "artifacts").mkdir(parents=True)
+    (release / "artifacts" / "zshrc").write_bytes(b"old\n")
+
+    def bundle(name: str, entries: list[tuple[str, bytes | None, bytes]]) -> Path:
+        base = _manifest(**{path.replace("/", "__"): _digest(old) for path, old, _ in entries if old is not None})
+        target = _manifest(**{path.replace("/", "__"): _digest(new) for path, _, new in entries})
+        plan = plan_delta(base, target, "v1", "v2")
+        plan.entries.pop()  # drop the manifest entry; these bundles only carry the listed files
+        members = [ArchiveMember(path, data=new) for path, _, new in entries]
+        members.append(ArchiveMember(PATCH_MANIFEST, data=plan.to_json().encode("utf-8")))
+        return build_zip(members, tmp_path / name)
+
+    escaping = bundle("slip.zip", [("artifacts/zshrc", b"old\n", b"new\n"), ("../escaped", None, b"owned")])
+    with pytest.raises(DeltaError, match="Unsafe path"):
+        apply_delta(escaping, root=release)
+    assert not (tmp_path / "escaped").exists()
+
+    corrupt = bundle("corrupt.zip", [("artifacts/a", None, b"a"), ("artifacts/zshrc", b"old\n", b"new\n")])
+    with zipfile.ZipFile(corrupt) as zf:
+        members = [ArchiveMember(name, data=b"tampered" if name == "artifacts/zshrc" else zf.read(name)) for name in zf.namelist()]
+    build_zip(members, corrupt)
+    with pytest.raises(DeltaError, match="Corrupt delta member artifacts/zshrc"):
+        apply_delta(corrupt, root=release)
+    assert not (release / "artifacts" / "a").exists()
+    assert (release / "artifacts" / "zshrc").read_bytes() == b"old\n"
@@ -0,0 +1,88 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from tool.diagnostics import DiagnosticCheck, DiagnosticsEngine
+from tool.validators import DiagnosticResult
+
+# Two 0.3s checks run side by side finish well before they would back to back.
+CONCURRENT_BUDGET = 0.55
+# Far below the 60s the abandoned check would sleep if exit waited for it.
+EXIT_BUDGET = 10.0
+
+
+@pytest.fixture(autouse=True)
+def _cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("OMNIFORGE_CACHE_DIR", str(tmp_path / "cache"))
+
+
+def _sleeper(name: str, seconds: float, calls: list[str]) -> DiagnosticCheck:
+    def run() -> list[DiagnosticResult]:
+        calls.append(name)
+        time.sleep(seconds)
+        return [DiagnosticResult(name, "ok", "done")]
+
+    return DiagnosticCheck(name, run, timeout=5.0, cacheable=False)
+
+
+def test_checks_run_concurrently_and_time_out() -> None:
+    calls: list[str] = []
+    checks = [
+        _sleeper("a", 0.3, calls),
+        _sleeper("b", 0.3, calls),
+        DiagnosticCheck("slow", lambda: time.sleep(2) or [], timeout=0.1),
+    ]
+
+    started = time.monotonic()
+    results = DiagnosticsEngine(checks).run()
+
+    assert time.monotonic() - started < CONCURRENT_BUDGET
+    assert [(result.name, result.status) for result in results] == [
+        ("a", "ok"),
+        ("b", "ok"),
+        ("slow", "timeout"),
+    ]
+
+
+def test_results_are_cached_by_input_stat(tmp_path: Path) -> None:
+    source = tmp_path / "settings.json"
+    source.write_text("{}", encoding="utf-8")
+    library = tmp_path / "library"
+    (library / "objects" / "ab").mkdir(parents=True)
+    calls: list[int] = []
+
+    def run() -> list[DiagnosticResult]:
+        calls.append(1)
+        return [DiagnosticResult("settings", "ok", source.read_text(encoding="utf-8"))]
+
+    check = DiagnosticCheck("settings", run, inputs=(source, library))
+    engine = DiagnosticsEngine([check])
+
+    assert engine.run()[0].details == "{}"
+    assert engine.run()[0].details == "{}"
+    assert engine.cache_hits == ["settings"]
+
+    source.write_text('{"changed": true}', encoding="utf-8")
+    assert engine.run()[0].details == '{"changed": true}'
+    assert calls == [1, 1]
+
+    # Files deep inside a directory input invalidate the cached verdict too.
+    (library / "objects" / "ab" / "cdef.json").write_text("{}", encoding="utf-8")
+    engine.run()
+    assert calls == [1, 1, 1]
+
+
+def test_timed_out_check_does_not_hold_up_exit() -> None:
+    script = (
+        "import time\n"
+        "from tool.diagnostics import DiagnosticCheck, DiagnosticsEngine\n"
+        "check = DiagnosticCheck('hang', lambda: time.sleep(60) or [], timeout=0.1, cacheable=False)\n"
+        "print(DiagnosticsEngine([check], use_cache=False).run()[0].status)\n"
+    )
+    started = time.monotonic()
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=30, check=True)
+    assert result.stdout.strip() == "timeout"
+    assert time.monotonic() - started < EXIT_BUDGET
@@ -0,0 +1,118 @@
+import io
+import json
+import os
+import threading
+import zipfile
+from collections.abc import Iterator
+from hashlib import sha256
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import ClassVar
+
+import pytest
+
+from tool import downloads
+from tool.downloads import (
+    DownloadCache,
+    DownloadError,
+    extract_members,
+    font_selector,
+    load_font_faces,
+)
+from tool.library import Library, dehydrate
+
+PAYLOAD = bytes(range(256)) * 64
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    requests: ClassVar[list[str | None]] = []
+
+    def do_GET(self) -> None:
+        header = self.headers.get("Range")
+        type(self).requests.append(header)
+        start = int(header.removeprefix("bytes=").rstrip("-")) if header else 0
+        body = PAYLOAD[start:]
+        self.send_response(206 if header else 200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def server_url() -> Iterator[str]:
+    _RangeHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/CascadiaCode.zip"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_caches_and_verifies(tmp_path: Path, server_url: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = DownloadCache(tmp_path)
+    checksum = sha256(PAYLOAD).hexdigest()
+
+    first = cache.fetch(server_url, checksum)
+    hashed: list[Path] = []
+    monkeypatch.setattr(downloads, "_hash_file", lambda path: hashed.append(path) or checksum)
+    second = cache.fetch(server_url, checksum)
+
+    assert first == second
+    assert first.read_bytes() == PAYLOAD
+    assert len(_RangeHandler.requests) == 1
+    # The digest recorded at download time is trusted while size and mtime are unchanged.
+    assert hashed == []
+    os.utime(first, ns=(1, 1))
+    assert cache.lookup(server_url, checksum) == first
+    assert hashed == [first]
+    monkeypatch.undo()
+
+    with pytest.raises(DownloadError):
+        cache.fetch(server_url, "0" * 64)
+
+
+def test_fetch_resumes_partial_download(tmp_path: Path, server_url: str) -> None:
+    cache = DownloadCache(tmp_path)
+    destination = cache.path_for(server_url)
+    destination.with_name(destination.name + ".part").write_bytes(PAYLOAD[:1000])
+
+    result = cache.fetch(server_url)
+
+    assert result.read_bytes() == PAYLOAD
+    assert _RangeHandler.requests == ["bytes=1000-"]
+
+
+def test_extract_members_selects_profile_fonts(tmp_path: Path) -> None:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("CaskaydiaCoveNerdFont-Regular.ttf", b"regular")
+        zf.writestr("CaskaydiaCoveNerdFontMono-Regular.ttf", b"mono")
+        zf.writestr("README.md", b"docs")
+    archive = tmp_path / "fonts.zip"
+    archive.write_bytes(buffer.getvalue())
+    fonts = tmp_path / "fonts"
+
+    extracted = extract_members(archive, fonts, font_selector({"CaskaydiaCove NF"}))
+
+    assert [path.name for path in extracted] == ["CaskaydiaCoveNerdFont-Regular.ttf"]
+    assert sorted(path.name for path in fonts.iterdir()) == ["CaskaydiaCoveNerdFont-Regular.ttf"]
+    assert extract_members(archive, fonts, font_selector({"CaskaydiaCove NF"})) == []
+
+
+def test_font_faces_are_read_through_library_references(tmp_path: Path) -> None:
+    settings = {
+        "profiles": {
+            "defaults": {"font": {"face": "FiraCode NF", "size": 11}},
+            "list": [{"name": "Ubuntu", "font": {"face": "CaskaydiaCove NFM"}}],
+        }
+    }
+    settings_path = tmp_path / "artifacts" / "settings.json"
+    stored = dehydrate(settings, Library(settings_path.parent / "library"))
+    assert "$library" in stored["profiles"]["defaults"]
+    settings_path.write_text(json.dumps(stored), encoding="utf-8")
+
+    assert load_font_faces(settings_path) == {"FiraCode NF", "CaskaydiaCove NFM"}
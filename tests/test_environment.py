@@ -0,0 +1,94 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from tool import environment, validators
+
+
+@pytest.fixture(autouse=True)
+def _isolated(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("OMNIFORGE_CACHE_DIR", str(tmp_path / "cache"))
+    environment._memo.clear()
+
+
+def _install(root: Path, *parts: str) -> Path:
+    settings = root.joinpath(*parts, "settings.json")
+    settings.parent.mkdir(parents=True)
+    settings.write_text("{}", encoding="utf-8")
+    return settings
+
+
+def test_probe_resolves_all_channels_under_root(tmp_path: Path) -> None:
+    root = tmp_path / "LocalAppData"
+    preview = _install(root, "Packages", "Microsoft.WindowsTerminalPreview_8wekyb3d8bbwe", "LocalState")
+    unpackaged = _install(root, "Microsoft", "Windows Terminal")
+
+    snapshot = environment.probe_environment(root=root)
+
+    assert snapshot.terminal_installs == {"preview": str(preview), "unpackaged": str(unpackaged)}
+    assert snapshot.windows_terminal_settings == preview
+
+
+def test_probe_is_persisted_and_invalidated_by_mtime(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    root = tmp_path / "LocalAppData"
+    (root / "Packages").mkdir(parents=True)
+    calls: list[Path | None] = []
+    real_probe = environment._probe
+
+    def counting_probe(probe_root: Path | None) -> environment.EnvironmentSnapshot:
+        calls.append(probe_root)
+        return real_probe(probe_root)
+
+    monkeypatch.setattr(environment, "_probe", counting_probe)
+
+    first = environment.probe_environment(root=root)
+    environment._memo.clear()
+    assert environment.probe_environment(root=root) == first
+    assert calls == [root]
+
+    # The in-process memo is checked against the fingerprint too, as the daemon relies on it.
+    stable = _install(root, "Packages", "Microsoft.WindowsTerminal_8wekyb3d8bbwe", "LocalState")
+    assert environment.probe_environment(root=root).windows_terminal_settings == stable
+    assert calls == [root, root]
+    assert environment.probe_environment(root=root, ttl=0).terminal_installs == {"stable": str(stable)}
+    assert calls == [root, root, root]
+
+
+def test_resolve_restats_terminal_candidates_when_cached_probe_found_nothing(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    root = tmp_path / "LocalAppData"
+    package = root / "Packages" / "Microsoft.WindowsTerminal_8wekyb3d8bbwe" / "LocalState"
+    package.mkdir(parents=True)
+    monkeypatch.setenv("LOCALAPPDATA", str(root))
+    assert environment.probe_environment().windows_terminal_settings is None
+
+    def no_full_probe(probe_root: Path | None) -> environment.EnvironmentSnapshot:
+        raise AssertionError("a missing settings file must not re-run the tool and WSL probes")
+
+    monkeypatch.setattr(environment, "_probe", no_full_probe)
+    with pytest.raises(FileNotFoundError):
+        validators.resolve_windows_terminal_path()
+
+    # First launch creates settings.json without touching the watched Packages directory.
+    (package / "settings.json").write_text("{}", encoding="utf-8")
+    assert validators.resolve_windows_terminal_path() == package / "settings.json"
+    environment._memo.clear()
+    assert environment.probe_environment().windows_terminal_settings == package / "settings.json"
+
+
+def test_wsl_probe_timeout_reports_wsl_unavailable(monkeypatch: pytest.MonkeyPatch) -> None:
+    timeouts: list[object] = []
+
+    def hang(args: list[str], **kwargs: object) -> None:
+        timeouts.append(kwargs.get("timeout"))
+        raise subprocess.TimeoutExpired(args, environment.WSL_TIMEOUT)
+
+    monkeypatch.setattr(environment.shutil, "which", lambda tool: f"/usr/bin/{tool}")
+    monkeypatch.setattr(environment.subprocess, "run", hang)
+
+    snapshot = environment._probe(None)
+    assert not snapshot.wsl_available
+    assert snapshot.distros == []
+    assert timeouts == [environment.WSL_TIMEOUT]
@@ -0,0 +1,149 @@
+import io
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from tool import git_filter, redos, reporting, sanitizer
+from tool.cli import app
+
+ROOT = Path(__file__).resolve().parents[1]
+# Enough lines that the content spans many maximum-size packets.
+BIG_LINES = 5000
+PROFILE = b"export PATH=/home/alice/bin:$PATH\nalias hydra='hydra -V'\nalias ll='ls -l'\n"
+
+
+def _pkt(payload: bytes) -> bytes:
+    return b"%04x" % (len(payload) + 4) + payload
+
+
+def _session(*requests: tuple[list[str], bytes]) -> bytes:
+    stream = _pkt(b"git-filter-client\n") + _pkt(b"version=2\n") + git_filter.FLUSH
+    stream += _pkt(b"capability=clean\n") + _pkt(b"capability=smudge\n") + _pkt(b"capability=delay\n")
+    stream += git_filter.FLUSH
+    for headers, content in requests:
+        stream += b"".join(_pkt(f"{line}\n".encode()) for line in headers) + git_filter.FLUSH
+        for start in range(0, len(content), 1000):
+            stream += _pkt(content[start : start + 1000])
+        stream += git_filter.FLUSH
+    return stream
+
+
+def _replies(output: bytes) -> list[tuple[list[str], bytes]]:
+    reader = git_filter.PacketReader(io.BytesIO(output))
+    assert reader.lines() == ["git-filter-server", "version=2"]
+    assert reader.lines() == ["capability=clean", "capability=smudge"]
+    replies = []
+    while True:
+        try:
+            status = reader.lines()
+        except EOFError:
+            return replies
+        content = b"".join(reader.content())
+        assert reader.lines() == []
+        replies.append((status, content))
+
+
+def test_clean_requests_are_sanitized_and_cached(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    big = b"".join(b"line %d owner=dev@corp.example.com\n" % number for number in range(BIG_LINES))
+    requests = (
+        (["command=clean", "pathname=.zshrc"], PROFILE),
+        (["command=clean", "pathname=big.zsh"], big),
+        (["command=smudge", "pathname=.zshrc"], PROFILE),
+        (["command=clean", "pathname=plain.zsh"], b"setopt autocd\n"),
+    )
+    output = io.BytesIO()
+    stats = git_filter.run_filter_process(io.BytesIO(_session(*requests)), output, tmp_path / "cache")
+    replies = _replies(output.getvalue())
+
+    assert [status for status, _ in replies] == [["status=success"]] * 4
+    assert replies[0][1] == b"export PATH=$HOME/bin:$PATH\nalias ll='ls -l'\n"
+    assert replies[1][1].count(b"user@example.com") == BIG_LINES
+    assert replies[2][1] == PROFILE
+    assert replies[3][1] == b"setopt autocd\n"
+    assert (stats.cleaned, stats.cached, stats.passed) == (3, 0, 1)
+
+    def fail(text: str) -> str:
+        raise AssertionError("cached blobs must not be re-sanitized")
+
+    monkeypatch.setattr(git_filter, "scrub_text", fail)
+    output = io.BytesIO()
+    stats = git_filter.run_filter_process(
+        io.BytesIO(_session(requests[0], requests[1], requests[3])), output, tmp_path / "cache"
+    )
+    assert [content for _, content in _replies(output.getvalue())] == [replies[0][1], replies[1][1], replies[3][1]]
+    assert (stats.cleaned, stats.cached) == (0, 3)
+
+
+def test_guarded_rules_scrub_each_blob_in_one_worker_call(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (rule,) = sanitizer.build_rules([("Digit runs", r"\d+\d+\d+x", "<n>")])
+    assert rule.guarded
+    monkeypatch.setattr(sanitizer, "compiled_rules", lambda: [rule])
+    calls = []
+
+    def counting(*args: object) -> object:
+        calls.append(args)
+        return real_call(*args)
+
+    real_call = redos._call
+    monkeypatch.setattr(redos, "_call", counting)
+    content = b"".join(b"id 123x line %d\r\n" % number for number in range(BIG_LINES)) + b"alias hydra='x'\ntail"
+    try:
+        output = io.BytesIO()
+        git_filter.run_filter_process(io.BytesIO(_session((["command=clean"], content))), output, tmp_path)
+    finally:
+        redos._reset_worker()
+
+    ((status, cleaned),) = _replies(output.getvalue())
+    assert status == ["status=success"]
+    assert cleaned == content.replace(b"123x", b"<n>").replace(b"alias hydra='x'\n", b"")
+    assert len(calls) == 1
+
+
+def test_unknown_command_reports_error(tmp_path: Path) -> None:
+    output = io.BytesIO()
+    git_filter.run_filter_process(io.BytesIO(_session((["command=bogus"], b"data"))), output, tmp_path)
+    reader = git_filter.PacketReader(io.BytesIO(output.getvalue()))
+    reader.lines(), reader.lines()
+    assert reader.lines() == ["status=error"]
+
+
+def test_filter_command_keeps_event_summaries_off_the_protocol(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("OMNIFORGE_CACHE_DIR", str(tmp_path / "cache"))
+
+    def redacting(text: str) -> str:
+        reporting.record("lines redacted over rule budget", "slow rule")
+        return text
+
+    monkeypatch.setattr(git_filter, "scrub_text", redacting)
+
+    with reporting.scoped_reporter():
+        result = CliRunner().invoke(app, ["git-filter"], input=_session((["command=clean"], b"setopt autocd\n")))
+
+    assert result.exit_code == 0
+    assert _replies(result.stdout_bytes) == [(["status=success"], b"setopt autocd\n")]
+
+
+def test_git_add_runs_one_filter_process(tmp_path: Path) -> None:
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    env = {**os.environ, "PYTHONPATH": str(ROOT), "OMNIFORGE_CACHE_DIR": str(tmp_path / "cache")}
+
+    def git(*args: str) -> str:
+        result = subprocess.run(["git", *args], cwd=repo, env=env, check=True, capture_output=True)
+        return result.stdout.decode()
+
+    git("init", "-q", "-b", "main")
+    git("config", "filter.omniforge.process", f"'{sys.executable}' -m tool.cli git-filter")
+    git("config", "filter.omniforge.required", "true")
+    (repo / ".gitattributes").write_text("*.zsh filter=omniforge\n", encoding="utf-8")
+    for number in range(20):
+        (repo / f"profile{number}.zsh").write_bytes(PROFILE)
+
+    git("add", ".")
+
+    assert git("show", ":profile7.zsh") == "export PATH=$HOME/bin:$PATH\nalias ll='ls -l'\n"
+    assert (repo / "profile7.zsh").read_bytes() == PROFILE
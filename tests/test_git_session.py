@@ -0,0 +1,73 @@
+import subprocess
+from pathlib import Path
+
+from tool.git_session import GitSession, parse_status_v2
+
+
+def _repo(tmp_path: Path) -> Path:
+    def git(*args: str) -> None:
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    git("init", "-q", "-b", "main")
+    (tmp_path / "artifacts").mkdir()
+    (tmp_path / "artifacts" / "manifest.json").write_text('{"artifacts": []}\n', encoding="utf-8")
+    (tmp_path / "old.txt").write_text("old\n", encoding="utf-8")
+    git("add", ".")
+    git("-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-q", "-m", "init")
+    git("tag", "v1.0.0")
+    return tmp_path
+
+
+def test_parse_status_v2_handles_renames_and_branch_headers() -> None:
+    payload = (
+        b"# branch.oid abc\0# branch.head main\0# branch.ab +2 -1\0"
+        b"1 .M N... 100644 100644 100644 aaa aaa tool/cli.py\0"
+        b"2 R. N... 100644 100644 100644 bbb bbb R100 new name.txt\0old name.txt\0"
+        b"? vendor/cache/x\0"
+    )
+
+    status = parse_status_v2(payload)
+
+    assert (status.head, status.branch, status.ahead, status.behind) == ("abc", "main", 2, 1)
+    assert [entry.short for entry in status.entries] == [
+        " M tool/cli.py",
+        "R  old name.txt -> new name.txt",
+        "?? vendor/cache/x",
+    ]
+    assert status.has_staged
+
+
+def test_session_reads_objects_and_stages_only_requested_paths(tmp_path: Path) -> None:
+    root = _repo(tmp_path)
+    (root / "artifacts" / "manifest.json").write_text('{"artifacts": [1]}\n', encoding="utf-8")
+    (root / "vendor.txt").write_text("vendored\n", encoding="utf-8")
+
+    with GitSession(root, echo=False) as session:
+        assert session.read_object("v1.0.0:artifacts/manifest.json") == b'{"artifacts": []}\n'
+        assert session.read_object("v1.0.0:missing.json") is None
+        assert session.read_object("HEAD:old.txt") == b"old\n"
+        session.stage(["artifacts/manifest.json", "not-there.json"])
+        status = session.status()
+
+    by_path = {entry.path: entry for entry in status.entries}
+    assert by_path["artifacts/manifest.json"].staged
+    assert by_path["vendor.txt"].kind == "untracked"
+    # One cat-file --batch process serves every object read.
+    assert session.spawns == len(["cat-file --batch", "add", "status"])
+
+
+def test_stage_records_deletions_and_commit_leaves_unrelated_changes(tmp_path: Path) -> None:
+    root = _repo(tmp_path)
+    (root / "old.txt").unlink()
+    (root / "notes.txt").write_text("unrelated\n", encoding="utf-8")
+    for args in (["config", "user.name", "t"], ["config", "user.email", "t@example.com"], ["add", "notes.txt"]):
+        subprocess.run(["git", *args], cwd=root, check=True)
+
+    with GitSession(root, echo=False) as session:
+        assert session.stage([]) == []
+        assert session.stage(["old.txt", "never-tracked.json"]) == ["old.txt"]
+        session.commit("release", ["old.txt"])
+        assert session.read_object("HEAD:old.txt") is None
+        status = session.status()
+
+    assert [entry.short for entry in status.entries] == ["A  notes.txt"]
@@ -0,0 +1,125 @@
+import json
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from tool import applier, github_publisher
+from tool.git_session import GitSession
+from tool.library import (
+    Library,
+    LibraryError,
+    dehydrate,
+    library_for,
+    library_members,
+    materialize,
+    references,
+)
+from tool.modes import ApplyMode
+
+TAB = {"background": "terminalBackground", "showCloseButton": "hover"}
+# schemes 2 + themes 2 + shared tab + 2 windows + defaults + font
+OBJECTS_PER_EXPORT = 9
+
+
+def _settings(machine: str) -> dict:
+    return {
+        "defaultProfile": "{11111111-1111-1111-1111-111111111111}",
+        "profiles": {
+            "defaults": {"font": {"face": "CaskaydiaCove NF", "size": 11}, "opacity": 90},
+            "list": [{"guid": "{11111111-1111-1111-1111-111111111111}", "name": machine}],
+        },
+        "schemes": [
+            {"name": "Campbell", "background": "#0C0C0C", "foreground": "#CCCCCC"},
+            {"name": "One Half Dark", "background": "#282C34", "foreground": "#DCDFE4"},
+        ],
+        "themes": [
+            {"name": "team-dark", "tab": TAB, "window": {"applicationTheme": "dark"}},
+            {"name": "team-light", "tab": TAB, "window": {"applicationTheme": "light"}},
+        ],
+    }
+
+
+def _object_files(root: Path) -> list[Path]:
+    return sorted((root / "objects").rglob("*.json"))
+
+
+def test_exports_share_objects_and_round_trip(tmp_path: Path) -> None:
+    library = Library(tmp_path / "library")
+    first = dehydrate(_settings("laptop"), library)
+    stored = len(_object_files(library.root))
+    second = dehydrate(_settings("desktop"), Library(library.root))
+
+    assert stored == OBJECTS_PER_EXPORT
+    assert len(_object_files(library.root)) == stored
+    assert references(first) == references(second)
+    assert first["schemes"][0]["name"] == "Campbell" and "$library" in first["schemes"][0]
+    assert materialize(second, Library(library.root)) == _settings("desktop")
+
+    reopened = Library(library.root)
+    assert reopened.find("scheme", "Campbell") == [first["schemes"][0]["$library"]]
+    assert reopened.closure(references(first)) == {path.parent.name + path.stem for path in _object_files(library.root)}
+
+
+def test_corrupt_object_is_rejected(tmp_path: Path) -> None:
+    library = Library(tmp_path / "library")
+    settings = dehydrate(_settings("laptop"), library)
+    digest = settings["schemes"][0]["$library"]
+    library.object_path(digest).write_text('{"name":"Campbell"}', encoding="utf-8")
+
+    with pytest.raises(LibraryError, match="corrupt"):
+        materialize(settings, Library(library.root))
+
+
+def test_bundle_members_cover_only_referenced_objects(tmp_path: Path) -> None:
+    library = Library(tmp_path / "artifacts" / "library")
+    dehydrate({"schemes": [{"name": "Unused", "background": "#FFFFFF"}]}, library)
+    settings_path = tmp_path / "artifacts" / "settings.json"
+    settings_path.write_text(json.dumps(dehydrate(_settings("laptop"), library)), encoding="utf-8")
+
+    members = library_members([settings_path])
+
+    assert len(members) == OBJECTS_PER_EXPORT
+    assert len(_object_files(library.root)) == OBJECTS_PER_EXPORT + len(["Unused"])
+
+
+def test_default_apply_writes_materialized_settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    portable = tmp_path / "artifacts" / "settings.json"
+    portable.parent.mkdir()
+    portable.write_text(json.dumps(dehydrate(_settings("laptop"), Library())), encoding="utf-8")
+    target = tmp_path / "LocalState" / "settings.json"
+    target.parent.mkdir()
+    monkeypatch.setattr(applier, "resolve_windows_terminal_path", lambda: target)
+
+    applier._apply_settings(ApplyMode.DEFAULT, dry_run=False)
+
+    assert json.loads(target.read_text(encoding="utf-8")) == _settings("laptop")
+
+
+def test_published_tag_materializes_from_a_fresh_clone(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    for args in (["init", "-q", "-b", "main"], ["config", "user.name", "t"], ["config", "user.email", "t@example.com"]):
+        subprocess.run(["git", *args], cwd=repo, check=True)
+    monkeypatch.chdir(repo)
+    dehydrate({"schemes": [{"name": "Unused", "background": "#FFFFFF"}]}, Library())
+    github_publisher.SETTINGS_PATH.write_text(json.dumps(dehydrate(_settings("laptop"), Library())), encoding="utf-8")
+    manifest = {"artifacts": [{"path": github_publisher.SETTINGS_PATH.as_posix()}]}
+    patch = Path("artifacts/patches/0123.json")
+    patch.parent.mkdir()
+    patch.write_text("{}", encoding="utf-8")
+    github_publisher.MANIFEST_PATH.write_text(json.dumps(manifest), encoding="utf-8")
+
+    with GitSession(echo=False) as session:
+        github_publisher.stage_and_commit("chore: release v1.0.0", session=session)
+        github_publisher.tag_release("v1.0.0", session=session)
+    clone = tmp_path / "clone"
+    subprocess.run(["git", "clone", "-q", "--branch", "v1.0.0", str(repo), str(clone)], check=True)
+
+    settings_path = clone / github_publisher.SETTINGS_PATH
+    settings = json.loads(settings_path.read_text(encoding="utf-8"))
+    assert materialize(settings, library_for(settings_path)) == _settings("laptop")
+    # Objects no release references stay out of the commit; the patch chain ships for fast-forwards.
+    assert len(_object_files(library_for(settings_path).root)) == OBJECTS_PER_EXPORT
+    assert (clone / patch).exists()
@@ -0,0 +1,130 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from tool import exporter
+from tool.applier import PORTABLE_GUID, _ensure_portable_profile
+from tool.canonical import canonical_digest
+from tool.merge import MergeError, merge_files, merge_settings
+from tool.modes import MergePolicy
+from tool.validators import verify_manifest
+
+
+def _target() -> dict:
+    return {
+        "profiles": {
+            "list": [
+                {"guid": "{AAAA}", "name": "Ubuntu", "font": {"face": "Cascadia", "size": 11}, "hidden": False},
+                {"guid": "{bbbb}", "name": "PowerShell", "source": "Windows.Terminal.PowershellCore"},
+                *({"guid": f"{{gen-{n}}}", "name": f"Generated {n}"} for n in range(500)),
+            ]
+        },
+        "schemes": [{"name": "Campbell", "background": "#0C0C0C"}],
+        "actions": [{"command": "copy", "id": "User.copy", "keys": "ctrl+c"}],
+    }
+
+
+def _incoming() -> dict:
+    return {
+        "profiles": {
+            "list": [
+                {"guid": "{aaaa}", "name": "Ubuntu", "font": {"size": 12}},
+                {"guid": "{bbbb}", "name": "PowerShell", "source": "Windows.Terminal.PowershellCore"},
+                {"guid": "{cccc}", "name": "Team Shell"},
+            ]
+        },
+        "schemes": [{"name": "Campbell", "background": "#101010"}, {"name": "Team Dark"}],
+        "actions": [{"command": "paste", "id": "User.paste", "keys": "ctrl+v"}],
+    }
+
+
+def test_field_policy_overlays_nested_fields_and_reports() -> None:
+    target = _target()
+    report = merge_settings(target, _incoming(), MergePolicy.FIELD)
+
+    ubuntu = target["profiles"]["list"][0]
+    assert ubuntu["font"] == {"face": "Cascadia", "size": 12}
+    assert ubuntu["guid"] == "{aaaa}"
+    # Only Team Shell is new; Ubuntu matched despite its GUID's case.
+    assert len(target["profiles"]["list"]) == len(_target()["profiles"]["list"]) + 1
+    assert [(c.section, c.key, c.action) for c in report.changes] == [
+        ("profiles", "Ubuntu", "updated"),
+        ("profiles", "PowerShell", "unchanged"),
+        ("profiles", "Team Shell", "added"),
+        ("schemes", "Campbell", "updated"),
+        ("schemes", "Team Dark", "added"),
+        ("actions", "User.paste", "added"),
+    ]
+    assert report.changes[0].fields == ["font", "guid"]
+    assert report.summary() == "3 added, 2 updated, 1 unchanged"
+
+
+@pytest.mark.parametrize(
+    ("policy", "background", "action"),
+    [(MergePolicy.OURS, "#0C0C0C", "kept"), (MergePolicy.THEIRS, "#101010", "replaced")],
+)
+def test_ours_and_theirs_policies(policy: MergePolicy, background: str, action: str) -> None:
+    target = _target()
+    report = merge_settings(target, _incoming(), policy)
+
+    assert target["schemes"][0]["background"] == background
+    assert next(c for c in report.changes if c.key == "Campbell").action == action
+    assert target["schemes"][1] == {"name": "Team Dark"}
+
+
+def test_portable_profile_keeps_icon_and_ignores_same_named_profile() -> None:
+    settings = {
+        "profiles": {
+            "list": [
+                {"guid": "{other}", "name": "Runndownn Portable"},
+                {"guid": PORTABLE_GUID.upper(), "name": "old", "icon": "mine.png"},
+            ]
+        }
+    }
+
+    _ensure_portable_profile(settings, set_default=True)
+
+    other, portable = settings["profiles"]["list"]
+    assert other == {"guid": "{other}", "name": "Runndownn Portable"}
+    assert portable["name"] == "Runndownn Portable"
+    assert portable["icon"] == "mine.png"
+    assert settings["defaultProfile"] == PORTABLE_GUID
+    with pytest.raises(MergeError, match=r"profiles\.list must be a list"):
+        _ensure_portable_profile({"profiles": {"list": {}}}, set_default=False)
+
+
+def test_merge_files_writes_only_on_change(tmp_path: Path) -> None:
+    target = tmp_path / "settings.json"
+    target.write_text(json.dumps(_target()), encoding="utf-8")
+    fragment = tmp_path / "team.json"
+    fragment.write_text(json.dumps(_incoming()), encoding="utf-8")
+
+    dry = merge_files([fragment], target, dry_run=True)
+    assert dry.changed
+    assert json.loads(target.read_text(encoding="utf-8")) == _target()
+
+    merge_files([fragment], target)
+    again = merge_files([fragment], target)
+    assert not again.changed
+    assert again.summary() == "6 unchanged"
+
+
+def test_merge_into_exported_snapshot_keeps_manifest_and_patch_chain(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    live = tmp_path / "live.json"
+    live.write_text(json.dumps(_target()), encoding="utf-8")
+    monkeypatch.setattr(exporter, "resolve_windows_terminal_path", lambda: live)
+    exporter.export_windows_terminal_settings()
+    exported = json.loads(Path("artifacts/settings.json").read_text(encoding="utf-8"))
+    fragment = tmp_path / "team.json"
+    fragment.write_text(json.dumps(_incoming()), encoding="utf-8")
+
+    merge_files([fragment])
+
+    assert [result.status for result in verify_manifest()] == ["ok"]
+    merged = json.loads(Path("artifacts/settings.json").read_text(encoding="utf-8"))
+    patch = json.loads((tmp_path / "artifacts" / "patches" / f"{canonical_digest(exported)}.json").read_text())
+    assert patch["target"] == canonical_digest(merged)
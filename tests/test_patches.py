@@ -0,0 +1,108 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from tool import applier, exporter
+from tool.canonical import canonical_digest, canonical_file_digest
+from tool.modes import ApplyMode
+from tool.patches import PatchError, apply_patch, diff, fast_forward
+
+GUIDS = [f"{{{n:08d}-1111-1111-1111-111111111111}}" for n in range(3)]
+
+
+def test_diff_round_trips_and_rfc_operations_apply() -> None:
+    base = {"a/b": 1, "t~": [1, 2, 3], "nested": {"keep": True, "drop": None}, "kind": "x"}
+    target = {"a/b": 2, "t~": [1, 5], "nested": {"keep": True, "new": [1]}, "kind": ["x"], "extra": {}}
+
+    ops = diff(base, target)
+    assert {"op": "replace", "path": "/a~1b", "value": 2} in ops
+    assert apply_patch(base, ops) == target
+    assert base["t~"] == [1, 2, 3]
+
+    moved = apply_patch(
+        {"x": {"y": 1}, "list": [1, 2]},
+        [
+            {"op": "test", "path": "/x/y", "value": 1},
+            {"op": "move", "from": "/x/y", "path": "/list/0"},
+            {"op": "copy", "from": "/list", "path": "/copy"},
+        ],
+    )
+    assert moved == {"x": {}, "list": [1, 1, 2], "copy": [1, 1, 2]}
+    with pytest.raises(PatchError):
+        apply_patch({"list": []}, [{"op": "remove", "path": "/list/0"}])
+
+
+def _settings(font: str, extra_profile: bool = False) -> dict:
+    profiles = [{"name": f"Shell {n}", "guid": GUIDS[n]} for n in range(3 if extra_profile else 2)]
+    return {
+        "defaultProfile": GUIDS[0],
+        "profiles": {"defaults": {"font": {"face": font, "size": 11}}, "list": profiles},
+        "schemes": [],
+    }
+
+
+def test_apply_fast_forwards_through_export_chain(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    live = tmp_path / "live.json"
+    monkeypatch.setattr(exporter, "resolve_windows_terminal_path", lambda: live)
+    versions = [_settings("Cascadia"), _settings("Fira Code"), _settings("Fira Code", extra_profile=True)]
+    exported = []
+    for version in versions:
+        live.write_text(json.dumps(version), encoding="utf-8")
+        exporter.export_windows_terminal_settings()
+        exported.append(json.loads((tmp_path / "artifacts" / "settings.json").read_text()))
+
+    patches = sorted((tmp_path / "artifacts" / "patches").glob("*.json"))
+    assert len(patches) == len(versions) - 1
+    first = json.loads((tmp_path / "artifacts" / "patches" / f"{canonical_digest(exported[0])}.json").read_text())
+    assert first["patch"] == [{"op": "replace", "path": "/profiles/defaults/font/face", "value": "Fira Code"}]
+
+    # A machine still on the first export, stored in its own key order.
+    target = tmp_path / "terminal.json"
+    target.write_text(json.dumps(dict(reversed(exported[0].items())), indent=4), encoding="utf-8")
+    monkeypatch.setattr(applier, "resolve_windows_terminal_path", lambda: target)
+    monkeypatch.setattr(applier, "BACKUP_ROOT_WINDOWS", tmp_path / "backups")
+
+    def unexpected(_settings: dict) -> dict:
+        raise AssertionError("fast-forward must not load the snapshot")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(applier, "_materialize", unexpected)
+        applier._apply_settings(ApplyMode.DEFAULT, dry_run=False)
+
+    assert canonical_file_digest(target) == canonical_digest(exported[2])
+    # Patched in place: the machine's own key order survives, which a full apply would not keep.
+    assert list(json.loads(target.read_text())) == ["schemes", "profiles", "defaultProfile"]
+
+    # Local edits diverge from the chain, so the full settings are written instead.
+    target.write_text(json.dumps(_settings("Comic Mono")), encoding="utf-8")
+    applier._apply_settings(ApplyMode.DEFAULT, dry_run=False)
+    assert canonical_file_digest(target) == canonical_digest(exported[2])
+
+
+@pytest.mark.parametrize("operation", [["not an op"], [{"op": "replace", "path": "/schemes"}], [{"op": "add"}]])
+def test_malformed_patch_falls_back_to_a_full_write(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, operation: list
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    live = tmp_path / "live.json"
+    monkeypatch.setattr(exporter, "resolve_windows_terminal_path", lambda: live)
+    exported = []
+    for font in ("Cascadia", "Fira Code"):
+        live.write_text(json.dumps(_settings(font)), encoding="utf-8")
+        exporter.export_windows_terminal_settings()
+        exported.append(json.loads((tmp_path / "artifacts" / "settings.json").read_text()))
+    (patch,) = (tmp_path / "artifacts" / "patches").glob("*.json")
+    payload = json.loads(patch.read_text())
+    patch.write_text(json.dumps({**payload, "patch": operation}), encoding="utf-8")
+
+    target = tmp_path / "terminal.json"
+    target.write_text(json.dumps(exported[0]), encoding="utf-8")
+    with pytest.raises(PatchError):
+        fast_forward(exported[0], payload["target"], patch.parent)
+
+    monkeypatch.setattr(applier, "resolve_windows_terminal_path", lambda: target)
+    monkeypatch.setattr(applier, "BACKUP_ROOT_WINDOWS", tmp_path / "backups")
+    applier._apply_settings(ApplyMode.DEFAULT, dry_run=False)
+    assert canonical_file_digest(target) == canonical_digest(exported[1])
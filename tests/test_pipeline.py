@@ -0,0 +1,132 @@
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from tool import sanitizer
+from tool.pipeline import (
+    PipelineError,
+    PipelineRunner,
+    Stage,
+    release_stages,
+    run_pipeline,
+    stage_dependencies,
+)
+
+# Two 0.3s stages run side by side finish well before they would back to back.
+PARALLEL_BUDGET = 0.55
+
+
+@pytest.fixture(autouse=True)
+def _cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("OMNIFORGE_CACHE_DIR", str(tmp_path / "cache"))
+
+
+def _writer(calls: list[str], name: str, source: Path, target: Path, delay: float = 0.0) -> Stage:
+    def run() -> None:
+        calls.append(name)
+        time.sleep(delay)
+        target.write_text(source.read_text(encoding="utf-8").upper(), encoding="utf-8")
+
+    return Stage(name, run, inputs=(source,), outputs=(target,))
+
+
+def _stages(tmp_path: Path, calls: list[str], delay: float = 0.0) -> list[Stage]:
+    out = tmp_path / "out"
+    out.mkdir(exist_ok=True)
+
+    def bundle() -> None:
+        calls.append("bundle")
+        (tmp_path / "bundle.txt").write_text(
+            "".join(path.read_text(encoding="utf-8") for path in sorted(out.iterdir())), encoding="utf-8"
+        )
+
+    return [
+        _writer(calls, "left", tmp_path / "a.txt", out / "a.txt", delay),
+        _writer(calls, "right", tmp_path / "b.txt", out / "b.txt", delay),
+        Stage("bundle", bundle, inputs=(out,), outputs=(tmp_path / "bundle.txt",)),
+    ]
+
+
+def test_independent_stages_run_in_parallel_then_cache(tmp_path: Path) -> None:
+    (tmp_path / "a.txt").write_text("a", encoding="utf-8")
+    (tmp_path / "b.txt").write_text("b", encoding="utf-8")
+    calls: list[str] = []
+
+    started = time.monotonic()
+    runner = PipelineRunner(_stages(tmp_path, calls, delay=0.3))
+    results = runner.run()
+
+    assert time.monotonic() - started < PARALLEL_BUDGET
+    assert [result.status for result in results] == ["ran", "ran", "ran"]
+    assert [result.name for result in runner.critical_path()][-1] == "bundle"
+    assert (tmp_path / "bundle.txt").read_text(encoding="utf-8") == "AB"
+
+    calls.clear()
+    results = run_pipeline(_stages(tmp_path, calls))
+    assert calls == []
+    assert {result.status for result in results} == {"cached"}
+
+
+def test_changed_input_reruns_only_downstream_stages(tmp_path: Path) -> None:
+    (tmp_path / "a.txt").write_text("a", encoding="utf-8")
+    (tmp_path / "b.txt").write_text("b", encoding="utf-8")
+    calls: list[str] = []
+    run_pipeline(_stages(tmp_path, calls))
+
+    calls.clear()
+    (tmp_path / "b.txt").write_text("bee", encoding="utf-8")
+    run_pipeline(_stages(tmp_path, calls))
+
+    assert sorted(calls) == ["bundle", "right"]
+    assert (tmp_path / "bundle.txt").read_text(encoding="utf-8") == "ABEE"
+
+
+def test_failure_blocks_dependents_and_is_not_cached(tmp_path: Path) -> None:
+    (tmp_path / "a.txt").write_text("a", encoding="utf-8")
+    calls: list[str] = []
+
+    def explode() -> None:
+        raise RuntimeError("boom")
+
+    stages = [
+        Stage("broken", explode, outputs=(tmp_path / "out",)),
+        _writer(calls, "left", tmp_path / "a.txt", tmp_path / "a.out"),
+        Stage("bundle", lambda: calls.append("bundle"), inputs=(tmp_path / "out",)),
+    ]
+
+    runner = PipelineRunner(stages)
+    statuses = {result.name: result.status for result in runner.run()}
+
+    assert statuses == {"broken": "failed", "left": "ran", "bundle": "blocked"}
+    assert calls == ["left"]
+    with pytest.raises(PipelineError, match="broken, bundle"):
+        run_pipeline(stages)
+
+
+def test_shared_outputs_are_ordered_and_cycles_rejected(tmp_path: Path) -> None:
+    manifest = tmp_path / "manifest.json"
+    first = Stage("export", lambda: None, outputs=(manifest,))
+    second = Stage("sanitize", lambda: None, outputs=(manifest,))
+    assert stage_dependencies([first, second]) == {"export": set(), "sanitize": {"export"}}
+
+    with pytest.raises(PipelineError, match="cycle"):
+        stage_dependencies([Stage("a", lambda: None, after=("b",)), Stage("b", lambda: None, after=("a",))])
+
+
+def test_sanitize_stage_key_follows_the_rule_pack(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def sanitize_params() -> tuple[str, ...]:
+        sanitizer.compiled_rules.cache_clear()
+        return next(stage.params for stage in release_stages() if stage.name == "sanitize")
+
+    pack = tmp_path / "rules.json"
+    pack.write_text(json.dumps({"rules": [{"description": "Hosts", "pattern": "corp\\.example", "replacement": "<host>"}]}))
+    try:
+        builtin = sanitize_params()
+        monkeypatch.setenv(sanitizer.RULE_PACK_ENV, str(pack))
+        assert sanitize_params() != builtin
+    finally:
+        monkeypatch.delenv(sanitizer.RULE_PACK_ENV, raising=False)
+        sanitizer.compiled_rules.cache_clear()
+    assert builtin == (sanitizer.rules_fingerprint(),)
@@ -0,0 +1,90 @@
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+import pytest
+
+from tool import redos, sanitizer
+from tool.redos import EXPONENTIAL, POLYNOMIAL, REDACTED_LINE, RuleBudget, analyze, harden
+
+OLD_EMAIL = r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"
+# Seconds the hardened built-in rules may spend on the whole pathological corpus.
+CORPUS_BUDGET = 0.5
+# Starting and restarting the worker process, on top of the rule's own timeout.
+WORKER_STARTUP = 5.0
+
+
+def test_analysis_flags_nested_and_overlapping_quantifiers() -> None:
+    assert {issue.severity for issue in analyze(r"(a+)+$")} == {EXPONENTIAL}
+    assert {issue.severity for issue in analyze(r"(\w+\s?)*x")} == {EXPONENTIAL}
+    assert "overlapping-quantifier" in {issue.kind for issue in analyze(OLD_EMAIL)}
+    assert {issue.severity for issue in analyze(r"a*a*a*b")} == {POLYNOMIAL}
+    assert all(not rule.guarded for rule in sanitizer.compiled_rules())
+
+
+def test_hardening_keeps_matches_and_builtins_stay_linear() -> None:
+    hardened = harden(r"[a-z]+@corp")
+    assert hardened.pattern.startswith("(?<![a-z])")
+    assert "++" in hardened.pattern
+    assert not hardened.guarded
+
+    sample = "mail jo.doe+x@mail.example.org, a@b.co and ops@corp / Bearer abc.def= at /home/alice/x"
+    for description, pattern, _ in sanitizer.RULE_SOURCES:
+        compiled = next(rule.pattern for rule in sanitizer.compiled_rules() if rule.description == description)
+        assert compiled.findall(sample) == re.findall(pattern, sample)
+    assert re.findall(OLD_EMAIL, sample) == re.findall(sanitizer.RULE_SOURCES[-1][1], sample)
+
+    rules = [(rule.description, rule.pattern, rule.replacement) for rule in sanitizer.compiled_rules()]
+    timings = redos.benchmark(rules, redos.pathological_corpus())
+    assert sum(timings.values()) < CORPUS_BUDGET
+    # The quadratic old email pattern, on a quarter of the corpus to keep the test fast.
+    small = redos.pathological_corpus(5_000)
+    old = redos.benchmark([("old", re.compile(OLD_EMAIL), "")], small)["old"]
+    assert old > 10 * redos.benchmark(rules, small)["Scrub email addresses"]
+
+
+def test_rule_pack_rejects_exponential_rules_and_budgets_the_rest(tmp_path: Path) -> None:
+    pack = tmp_path / "rules.json"
+    pack.write_text(json.dumps({"rules": [{"description": "Nested", "pattern": "(a+)+$", "replacement": ""}]}))
+    with pytest.raises(sanitizer.RulePackError, match="Nested: nested-quantifier"):
+        sanitizer.load_rule_pack(pack)
+
+    pack.write_text(json.dumps({"rules": [{"description": "Runs", "pattern": "a*a*a*b", "replacement": "<b>"}]}))
+    (rule,) = sanitizer.load_rule_pack(pack)
+    assert rule.guarded
+
+    budget = RuleBudget(timeout=0.2)
+    try:
+        text, count, redacted = redos.budgeted_subn(rule.pattern, rule.replacement, "aab\n" + "a" * 5000 + "\n", budget)
+    finally:
+        redos._reset_worker()
+    assert text == f"<b>\n{REDACTED_LINE}\n"
+    assert (count, redacted) == (1, 1)
+
+
+def test_guarded_rule_is_budgeted_on_short_lines() -> None:
+    (rule,) = sanitizer.build_rules([("Digit runs", r"\d+\d+\d+x", "<n>")])
+    assert rule.guarded
+    budget = RuleBudget(timeout=0.5)
+
+    started = time.monotonic()
+    try:
+        # About three minutes of backtracking in process, though the line is only 1 kB.
+        text, count, redacted = redos.budgeted_subn(rule.pattern, rule.replacement, "1" * 1000 + "\n", budget)
+    finally:
+        redos._reset_worker()
+
+    assert time.monotonic() - started < budget.timeout + WORKER_STARTUP
+    assert (text, count, redacted) == (f"{REDACTED_LINE}\n", 0, 1)
+
+
+@pytest.mark.skipif(not Path("/proc/self/fd").is_dir(), reason="needs /proc")
+def test_worker_stdout_is_not_the_parent_stdout() -> None:
+    try:
+        worker = redos._worker()
+        stdout, stderr = (worker.apply(os.readlink, (f"/proc/self/fd/{fd}",)) for fd in (1, 2))
+    finally:
+        redos._reset_worker()
+    assert stdout == stderr
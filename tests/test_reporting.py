@@ -0,0 +1,80 @@
+import json
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from tool import reporting, sanitizer
+from tool.modes import ReportLevel
+
+
+@pytest.fixture(autouse=True)
+def fresh_reporter() -> Iterator[None]:
+    with reporting.scoped_reporter(ReportLevel.SUMMARY):
+        yield
+
+
+def _sanitize(tmp_path: Path) -> None:
+    aliases = "".join(f"alias {name}='{name} --fast'\n" for name in sorted(sanitizer.DENYLIST_ALIASES))
+    tokens = "".join(f"export TOKEN_{n}=ghp_{'x' * 36}\n" for n in range(50))
+    source = tmp_path / ".zshrc"
+    source.write_text(aliases + tokens + "cd /home/alice/src\n", encoding="utf-8")
+    sanitizer.sanitize_zshrc(
+        source=source,
+        destination=tmp_path / "portable",
+        manifest_path=tmp_path / "manifest.json",
+        log_path=tmp_path / "report.md",
+    )
+
+
+def test_sanitize_prints_one_summary_per_stage(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    _sanitize(tmp_path)
+
+    out = " ".join(capsys.readouterr().out.split())
+    assert "sanitize: 51 rule substitutions (Drop tokens 50, Normalize UNIX absolute paths); 5 aliases removed" in out
+    assert "Removed sensitive alias" not in out
+    assert reporting.get_reporter().counts("sanitize") == {}
+
+
+def test_quiet_level_writes_only_the_jsonl_sink(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    sink = tmp_path / "events.jsonl"
+    reporting.configure(ReportLevel.QUIET, sink)
+    _sanitize(tmp_path)
+
+    assert "sanitize:" not in capsys.readouterr().out
+    records = [json.loads(line) for line in sink.read_text(encoding="utf-8").splitlines()]
+    events = [record for record in records if record["type"] == "event"]
+    assert {event["event"] for event in events} == {"rule substitutions", "aliases removed"}
+    assert records[-1]["type"] == "summary"
+    assert records[-1]["counts"] == {"rule substitutions": 51, "aliases removed": 5}
+    assert records[-1]["details"]["aliases removed"]["hydra"] == 1
+
+
+def test_verbose_level_lists_events_and_collapses_long_summaries(capsys: pytest.CaptureFixture[str]) -> None:
+    reporting.configure(ReportLevel.VERBOSE)
+    with reporting.reporting_stage("export"):
+        for number in range(8):
+            reporting.record("assets copied", f"icon{number}.png")
+
+    out = " ".join(capsys.readouterr().out.split())
+    assert "export assets copied: icon7.png" in out
+    assert "export: 8 assets copied (icon0.png, icon1.png, icon2.png, icon3.png, icon4.png, +3 more)" in out
+
+
+def test_concurrent_scopes_keep_their_own_events() -> None:
+    both_started = threading.Barrier(2)
+
+    def request(name: str) -> dict[str, int]:
+        with reporting.scoped_reporter(ReportLevel.QUIET) as reporter:
+            both_started.wait()
+            for _ in range(100):
+                reporting.record("hits", name)
+            both_started.wait()
+            return reporter.counts(reporting.DEFAULT_STAGE)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        counts = list(pool.map(request, ["first", "second"]))
+
+    assert counts == [{"hits": 100}, {"hits": 100}]
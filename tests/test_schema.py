@@ -0,0 +1,79 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from tool import schema
+from tool.schema import compile_schema, validate_document
+
+
+@pytest.fixture(autouse=True)
+def _cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("OMNIFORGE_CACHE_DIR", str(tmp_path / "cache"))
+    schema.load_validator.cache_clear()
+
+
+def test_bundled_artifacts_validate() -> None:
+    for name, path in (("settings", "artifacts/settings.json"), ("manifest", "artifacts/manifest.json")):
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        assert validate_document(data, name) == []
+
+
+def test_every_violation_is_reported_with_pointer() -> None:
+    settings = {
+        "launchMode": "huge",
+        "profiles": {
+            "list": [
+                {"guid": "{6fd0b4a5-95a6-46ed-9ad4-71fb4c6d9d25}", "name": "ok"},
+                {"guid": "not-a-guid", "opacity": 300, "font": {"size": 0}},
+            ]
+        },
+        "schemes": [{"name": "Neon", "red": "#GG0000"}],
+    }
+
+    pointers = {str(violation) for violation in validate_document(settings, "settings")}
+
+    assert pointers >= {
+        '/launchMode: must be one of ["default", "maximized", "fullscreen", "focus", "maximizedFocus"]',
+        "/profiles/list/1/opacity: greater than 100",
+        "/profiles/list/1/font/size: less than 1",
+    }
+    assert any(p.startswith("/profiles/list/1/guid:") for p in pointers)
+    assert any(p.startswith("/schemes/0/red:") for p in pointers)
+
+
+def test_manifest_schema_flags_missing_path() -> None:
+    manifest = {"version": "1.0.0", "artifacts": [{"name": "x", "sha256": "0" * 64}]}
+
+    assert [str(v) for v in validate_document(manifest, "manifest")] == [
+        "/artifacts/0: missing required property 'path'"
+    ]
+
+
+def test_compiled_code_is_cached_on_disk(tmp_path: Path) -> None:
+    validate_document({}, "manifest")
+    cached = list((tmp_path / "cache" / "schemas").glob("manifest-*.bin"))
+    assert len(cached) == 1
+
+    schema.load_validator.cache_clear()
+    assert validate_document({"version": "1", "artifacts": []}, "manifest") == []
+
+
+def test_recursive_refs_and_additional_properties() -> None:
+    validate = compile_schema(
+        {
+            "definitions": {
+                "node": {
+                    "type": "object",
+                    "properties": {"children": {"type": "array", "items": {"$ref": "#/definitions/node"}}},
+                    "additionalProperties": False,
+                }
+            },
+            "$ref": "#/definitions/node",
+        }
+    )
+
+    assert validate({"children": [{"children": []}]}) == []
+    assert [str(v) for v in validate({"children": [{"extra/key": 1}]})] == [
+        "/children/0/extra~1key: unexpected property"
+    ]
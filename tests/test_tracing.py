@@ -0,0 +1,51 @@
+import json
+import threading
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from tool import tracing
+from tool.cli import app
+
+
+@tracing.traced("unit.work")
+def _work(value: int) -> int:
+    with tracing.span("unit.inner", value=value):
+        return value * 2
+
+
+def test_spans_are_recorded_only_while_tracing(tmp_path: Path) -> None:
+    assert [_work(n) for n in range(3)] == [0, 2, 4]
+    tracer = tracing.start_tracing()
+    try:
+        threads = [threading.Thread(target=_work, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        tracing.stop_tracing(tmp_path / "trace.json")
+    _work(2)
+
+    names = sorted(event["name"] for event in tracer.events)
+    assert names == ["unit.inner"] * 4 + ["unit.work"] * 4
+    payload = json.loads((tmp_path / "trace.json").read_text(encoding="utf-8"))
+    inner = [event for event in payload["traceEvents"] if event["name"] == "unit.inner"]
+    assert {event["args"]["value"] for event in inner} == {"0", "1", "2", "3"}
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in payload["traceEvents"])
+
+
+def test_cli_trace_and_profile_flags(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("HOME", str(tmp_path))
+    (tmp_path / ".zshrc").write_text("export PATH=/home/alice/bin:$PATH\n", encoding="utf-8")
+    (tmp_path / "docs").mkdir()
+
+    result = CliRunner().invoke(app, ["--trace", "trace.json", "--profile", "run.prof", "sanitize"])
+
+    assert result.exit_code == 0, result.output
+    events = json.loads((tmp_path / "trace.json").read_text(encoding="utf-8"))["traceEvents"]
+    assert {"sanitizer.sanitize_zshrc", "sanitizer.apply_rules"} <= {event["name"] for event in events}
+    assert (tmp_path / "run.prof").stat().st_size > 0
+    assert tracing.active_tracer() is None
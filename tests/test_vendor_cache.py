@@ -0,0 +1,73 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from tool import vendor_cache
+from tool.vendor_cache import VendorCacheError, VendorSource
+
+
+def _git(*args: str, cwd: Path | None = None) -> None:
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True)
+
+
+def _upstream(tmp_path: Path) -> Path:
+    work = tmp_path / "work"
+    work.mkdir()
+    _git("init", "-q", "-b", "main", cwd=work)
+    (work / "plugin.zsh").write_text("echo plugin\n", encoding="utf-8")
+    _git("add", "plugin.zsh", cwd=work)
+    _git("-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-q", "-m", "init", cwd=work)
+    bare = tmp_path / "upstream.git"
+    _git("clone", "-q", "--bare", str(work), str(bare))
+    return bare
+
+
+def test_offline_clone_uses_local_mirror(tmp_path: Path) -> None:
+    upstream = _upstream(tmp_path)
+    root = tmp_path / "cache"
+    source = VendorSource("zsh-demo", str(upstream))
+
+    result = vendor_cache.sync_cache(root=root, git_sources=[source], font_sources=[])
+    assert result.mirrors == [root / "git" / "zsh-demo.git"]
+
+    # Remove the upstream so any network-style access would fail.
+    shutil.rmtree(upstream)
+    destination = tmp_path / "plugins" / "zsh-demo"
+    command = vendor_cache.clone_command(
+        "zsh-demo", "https://example.invalid/zsh-demo", destination, offline=True, root=root
+    )
+    subprocess.run(command, check=True, capture_output=True)
+
+    assert (destination / "plugin.zsh").read_text(encoding="utf-8") == "echo plugin\n"
+
+
+def test_offline_clone_requires_cached_mirror(tmp_path: Path) -> None:
+    with pytest.raises(VendorCacheError):
+        vendor_cache.clone_command(
+            "missing", "https://example.invalid/missing", tmp_path / "dest", offline=True, root=tmp_path
+        )
+
+
+def test_font_digest_comes_from_the_release_checksums(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv(vendor_cache.FONT_SHA256_ENV, raising=False)
+    listing = tmp_path / "SHA-256.txt"
+    listing.write_text(f"{'cd' * 32}  Other.zip\n{'AB' * 32}  fonts.zip\n", encoding="utf-8")
+    source = VendorSource("fonts.zip", "https://example.invalid/v1/fonts.zip", checksums=listing.as_uri())
+    root = tmp_path / "cache"
+
+    assert vendor_cache.font_checksum(source, root) == "ab" * 32
+    # Offline installs read the list cached by the online lookup.
+    listing.unlink()
+    assert vendor_cache.font_checksum(source, root, offline=True) == "ab" * 32
+
+    monkeypatch.setenv(vendor_cache.FONT_SHA256_ENV, "EF" * 32)
+    assert vendor_cache.font_checksum(source, root) == "ef" * 32
+
+
+def test_font_sync_refuses_an_unknown_digest(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv(vendor_cache.FONT_SHA256_ENV, raising=False)
+    source = VendorSource("fonts.zip", "https://example.invalid/fonts.zip")
+    with pytest.raises(VendorCacheError, match="No sha256 known"):
+        vendor_cache.sync_font(source, root=tmp_path)
@@ -6,22 +6,19 @@ import json
 import shutil
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from enum import Enum
 from pathlib import Path
 from typing import Any
 
-from rich.console import Console
-
+from .canonical import canonical_digest, canonical_file_digest
+from .console import console
+from .library import LibraryError, library_for, materialize, references
+from .merge import merge_settings
+from .modes import ApplyMode, MergePolicy
+from .patches import fast_forward, patch_dir_for, read_head
+from .schema import validate_document
+from .tracing import traced
 from .validators import ensure_directory, resolve_windows_terminal_path
 
-console = Console()
-
-
-class ApplyMode(str, Enum):
-    DEFAULT = "default"
-    COPY = "copy"
-    PROMOTE = "promote"
-
 
 @dataclass
 class ApplyResult:
@@ -34,6 +31,18 @@ BACKUP_ROOT_WINDOWS = Path.home() / "wt-portable" / "backups"
 BACKUP_ROOT_WSL = Path("~/wt-portable/backups").expanduser()
 PORTABLE_SETTINGS = Path("artifacts/settings.json")
 PORTABLE_ZSH = Path("artifacts/zshrc.portable")
+PORTABLE_GUID = "{6fd0b4a5-95a6-46ed-9ad4-71fb4c6d9d25}"
+PORTABLE_DISTRO = "Ubuntu-22.04"
+# Schema failures list this many violations before collapsing the rest into a count.
+SCHEMA_REPORT_LIMIT = 10
+PORTABLE_PROFILE = {
+    "name": "Runndownn Portable",
+    "guid": PORTABLE_GUID,
+    "commandline": f"wsl.exe -d {PORTABLE_DISTRO} --exec /bin/zsh",
+    "startingDirectory": f"\\\\wsl$\\{PORTABLE_DISTRO}\\home\\$USER",
+    "icon": "ms-appdata:///roaming/runndownn-portable.png",
+    "hidden": False,
+}
 
 
 class ApplyError(RuntimeError):
@@ -44,6 +53,7 @@ def _timestamp() -> str:
     return datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
 
 
+@traced()
 def _backup_file(source: Path, root: Path) -> Path:
     ensure_directory(root)
     destination = root / f"{source.name}.{_timestamp()}"
@@ -52,6 +62,15 @@ def _backup_file(source: Path, root: Path) -> Path:
     return destination
 
 
+def _check_schema(settings: dict[str, Any], source: Path) -> None:
+    violations = validate_document(settings, "settings")
+    if violations:
+        details = "; ".join(str(violation) for violation in violations[:SCHEMA_REPORT_LIMIT])
+        extra = len(violations) - SCHEMA_REPORT_LIMIT
+        more = f" (+{extra} more)" if extra > 0 else ""
+        raise ApplyError(f"{source} fails schema validation: {details}{more}")
+
+
 def _load_json(path: Path) -> dict[str, Any]:
     with path.open("r", encoding="utf-8") as fp:
         data = json.load(fp)
@@ -60,6 +79,15 @@ def _load_json(path: Path) -> dict[str, Any]:
     return data
 
 
+def _materialize(settings: dict[str, Any]) -> dict[str, Any]:
+    if not references(settings):
+        return settings
+    try:
+        return materialize(settings, library_for(PORTABLE_SETTINGS))
+    except LibraryError as exc:
+        raise ApplyError(str(exc)) from exc
+
+
 def _write_json(path: Path, data: dict[str, Any]) -> None:
     with path.open("w", encoding="utf-8") as fp:
         json.dump(data, fp, indent=2)
@@ -67,67 +95,95 @@ def _write_json(path: Path, data: dict[str, Any]) -> None:
 
 
 def _ensure_portable_profile(settings: dict[str, Any], set_default: bool) -> dict[str, Any]:
-    profiles_section = settings.setdefault("profiles", {})
-    if not isinstance(profiles_section, dict):
-        raise ValueError("profiles section must be a mapping")
-    profile_list = profiles_section.setdefault("list", [])
-    if not isinstance(profile_list, list):
-        raise ValueError("profiles.list must be a list")
-    portable_guid = "{6fd0b4a5-95a6-46ed-9ad4-71fb4c6d9d25}"
-
-    existing = next((p for p in profile_list if isinstance(p, dict) and p.get("guid") == portable_guid), None)
-    if existing:
-        existing.update(
-            {
-                "name": "Runndownn Portable",
-                "commandline": "wsl.exe -d Ubuntu-22.04 --exec /bin/zsh",
-                "startingDirectory": "\\\\wsl$\\Ubuntu-22.04\\home\\$USER",
-                "hidden": False,
-            }
-        )
-    else:
-        profile_list.append(
-            {
-                "name": "Runndownn Portable",
-                "guid": portable_guid,
-                "commandline": "wsl.exe -d Ubuntu-22.04 --exec /bin/zsh",
-                "startingDirectory": "\\\\wsl$\\Ubuntu-22.04\\home\\$USER",
-                "icon": "ms-appdata:///roaming/runndownn-portable.png",
-                "hidden": False,
-            }
-        )
-
+    # A user-customised icon survives re-applying; every other portable field is refreshed.
+    incoming = {"profiles": {"list": [PORTABLE_PROFILE]}}
+    merge_settings(settings, incoming, MergePolicy.FIELD, preserve=("guid", "icon"))
     if set_default:
-        settings["defaultProfile"] = portable_guid
+        settings["defaultProfile"] = PORTABLE_GUID
     return settings
 
 
+def _already_applied(target: Path, desired: dict[str, Any]) -> bool:
+    if not target.exists():
+        return False
+    try:
+        return canonical_file_digest(target) == canonical_digest(desired)
+    except ValueError:
+        return False
+
+
+def _fast_forward(target: Path) -> tuple[dict[str, Any], int] | None:
+    """Patch the live settings up to the snapshot's recorded head, or None when the chain does not reach it."""
+    directory = patch_dir_for(PORTABLE_SETTINGS)
+    head = read_head(PORTABLE_SETTINGS)
+    if head is None or not target.exists() or not directory.is_dir():
+        return None
+    try:
+        return fast_forward(_load_json(target), head, directory)
+    except (OSError, ValueError) as exc:
+        # Local edits, a pruned or malformed chain or an unreadable target (PatchError is a ValueError).
+        console.print(f"[yellow]Settings diverged from the patch chain[/yellow] ({exc}); applying full settings")
+        return None
+
+
+def _write_forwarded(target: Path, patched: dict[str, Any], steps: int, dry_run: bool) -> list[Path]:
+    """Write the fast-forwarded settings; the snapshot itself is never loaded on this path."""
+    if steps == 0:
+        console.print(f"[green]Settings already up to date[/green] in {target}")
+        return []
+    _check_schema(patched, PORTABLE_SETTINGS)
+    if dry_run:
+        console.print(f"[cyan]Would fast-forward[/cyan] {target} through {steps} settings patches")
+        return []
+    backups = [_backup_file(target, BACKUP_ROOT_WINDOWS)]
+    _write_json(target, patched)
+    console.print(f"[green]Fast-forwarded[/green] {target} through {steps} settings patches")
+    return backups
+
+
+def _write_settings(target: Path, mode: ApplyMode, desired: dict[str, Any], copyable: bool, dry_run: bool) -> None:
+    """Copy or rewrite `target` to `desired`; a dry run only says which."""
+    if dry_run and mode == ApplyMode.DEFAULT:
+        console.print(f"[cyan]Would overwrite[/cyan] {target} with portable settings")
+    elif dry_run:
+        console.print(f"[cyan]Would update profiles list[/cyan] in {target}")
+    elif copyable:
+        shutil.copy2(PORTABLE_SETTINGS, target)
+    else:
+        # Library references are inlined here; Windows Terminal cannot read them.
+        _write_json(target, desired)
+
+
 def _apply_settings(mode: ApplyMode, dry_run: bool) -> tuple[Path, list[Path]]:
     if not PORTABLE_SETTINGS.exists():
         raise ApplyError("artifacts/settings.json not found; run export first")
 
     target = resolve_windows_terminal_path()
-    backups: list[Path] = []
-    if target.exists() and not dry_run:
-        backups.append(_backup_file(target, BACKUP_ROOT_WINDOWS))
-
     if mode == ApplyMode.DEFAULT:
-        if dry_run:
-            console.print(f"[cyan]Would overwrite[/cyan] {target} with portable settings")
-        else:
-            shutil.copy2(PORTABLE_SETTINGS, target)
+        forwarded = _fast_forward(target)
+        if forwarded is not None:
+            return target, _write_forwarded(target, *forwarded, dry_run=dry_run)
+    raw = _load_json(PORTABLE_SETTINGS)
+    portable = _materialize(raw)
+    if mode == ApplyMode.DEFAULT:
+        desired = portable
+        _check_schema(desired, PORTABLE_SETTINGS)
     else:
         base_path = PORTABLE_SETTINGS if mode != ApplyMode.COPY or not target.exists() else target
-        settings = _load_json(base_path)
-        portable = _load_json(PORTABLE_SETTINGS)
         if mode == ApplyMode.COPY:
-            updated = _ensure_portable_profile(settings, set_default=False)
+            desired = _ensure_portable_profile(_materialize(_load_json(base_path)), set_default=False)
         else:  # PROMOTE uses portable template and becomes default
-            updated = _ensure_portable_profile(portable, set_default=True)
-        if dry_run:
-            console.print(f"[cyan]Would update profiles list[/cyan] in {target}")
-        else:
-            _write_json(target, updated)
+            desired = _ensure_portable_profile(portable, set_default=True)
+        _check_schema(desired, base_path if mode == ApplyMode.COPY else PORTABLE_SETTINGS)
+
+    backups: list[Path] = []
+    if _already_applied(target, desired):
+        # Key order and whitespace are not changes; skip the backup and rewrite.
+        console.print(f"[green]Settings already up to date[/green] in {target}")
+        return target, backups
+    if target.exists() and not dry_run:
+        backups.append(_backup_file(target, BACKUP_ROOT_WINDOWS))
+    _write_settings(target, mode, desired, copyable=mode == ApplyMode.DEFAULT and portable is raw, dry_run=dry_run)
     return target, backups
 
 
@@ -185,6 +241,7 @@ def _apply_zsh(mode: ApplyMode, dry_run: bool) -> tuple[Path, list[Path]]:
     return target, backups
 
 
+@traced()
 def apply_profile(mode: ApplyMode = ApplyMode.COPY, dry_run: bool = False) -> ApplyResult:
     console.print(f"[magenta]Applying portable profile[/magenta] (mode={mode}, dry_run={dry_run})")
     settings_path, settings_backups = _apply_settings(mode, dry_run)
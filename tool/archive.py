@@ -0,0 +1,217 @@
+"""Deterministic zip and tar.xz builder for release bundles."""
+
+from __future__ import annotations
+
+import io
+import os
+import shutil
+import struct
+import tarfile
+import tempfile
+import zlib
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, BinaryIO, Literal
+
+CHUNK_SIZE = 1 << 20
+SPOOL_LIMIT = 1 << 20
+EXCLUDED_NAMES = {"__pycache__", ".git", ".pytest_cache", ".mypy_cache", ".ruff_cache"}
+EXCLUDED_SUFFIXES = (".pyc", ".pyo")
+# 1980-01-01 00:00:00 is the earliest timestamp a zip entry can carry.
+FIXED_EPOCH = 315532800
+FIXED_DOS_TIME = 0
+FIXED_DOS_DATE = (0 << 9) | (1 << 5) | 1
+ZIP32_LIMIT = 0xFFFFFFFF
+ZIP32_MAX_ENTRIES = 0xFFFF
+
+XzPreset = Literal[0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
+
+
+@dataclass(frozen=True)
+class ArchiveMember:
+    arcname: str
+    path: Path | None = None
+    data: bytes | None = None
+
+    def open(self) -> BinaryIO:
+        if self.data is not None:
+            return io.BytesIO(self.data)
+        if self.path is None:
+            raise ValueError(f"Archive member {self.arcname} has no content")
+        return self.path.open("rb")
+
+    @property
+    def size(self) -> int:
+        if self.data is not None:
+            return len(self.data)
+        return os.stat(self.path).st_size if self.path is not None else 0
+
+    @property
+    def mode(self) -> int:
+        if self.path is not None and os.stat(self.path).st_mode & 0o111:
+            return 0o755
+        return 0o644
+
+
+@dataclass
+class _Compressed:
+    member: ArchiveMember
+    crc: int
+    size: int
+    compressed_size: int
+    spool: IO[bytes]
+
+
+def walk_files(path: Path) -> Iterator[Path]:
+    if path.is_file():
+        yield path
+        return
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames[:] = sorted(name for name in dirnames if name not in EXCLUDED_NAMES)
+        for filename in sorted(filenames):
+            if not filename.endswith(EXCLUDED_SUFFIXES):
+                yield Path(dirpath) / filename
+
+
+def collect_members(inputs: Iterable[Path], root: Path = Path(".")) -> list[ArchiveMember]:
+    members: dict[str, ArchiveMember] = {}
+    for entry in inputs:
+        source = root / entry
+        if not source.exists():
+            continue
+        for path in walk_files(source):
+            arcname = path.relative_to(root).as_posix()
+            members[arcname] = ArchiveMember(arcname=arcname, path=path)
+    return [members[name] for name in sorted(members)]
+
+
+def _compress(member: ArchiveMember, level: int) -> _Compressed:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_LIMIT)
+    crc = 0
+    size = 0
+    with member.open() as fp:
+        for chunk in iter(lambda: fp.read(CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            spool.write(compressor.compress(chunk))
+    spool.write(compressor.flush())
+    compressed_size = spool.tell()
+    spool.seek(0)
+    return _Compressed(member, crc, size, compressed_size, spool)
+
+
+def _compress_ordered(
+    pool: ThreadPoolExecutor, members: Iterable[ArchiveMember], level: int, window: int
+) -> Iterator[_Compressed]:
+    # Keep a bounded number of members in flight so large trees are never staged all at once.
+    pending: deque[Future[_Compressed]] = deque()
+    for member in members:
+        pending.append(pool.submit(_compress, member, level))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def build_zip(
+    members: Iterable[ArchiveMember],
+    destination: Path,
+    workers: int | None = None,
+    level: int = 9,
+) -> Path:
+    """Compress members in parallel and write them in order with fixed metadata."""
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    partial = destination.with_name(destination.name + ".part")
+    central: list[bytes] = []
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool, partial.open("wb") as out:
+        for item in _compress_ordered(pool, members, level, window=workers * 2):
+            with item.spool:
+                if max(item.size, item.compressed_size, out.tell()) > ZIP32_LIMIT:
+                    raise ValueError(f"{item.member.arcname} needs zip64, which is not supported")
+                name = item.member.arcname.encode("utf-8")
+                flags = 0 if name.isascii() else 0x800
+                offset = out.tell()
+                out.write(
+                    struct.pack(
+                        "<IHHHHHIIIHH",
+                        0x04034B50,
+                        20,
+                        flags,
+                        zlib.DEFLATED,
+                        FIXED_DOS_TIME,
+                        FIXED_DOS_DATE,
+                        item.crc,
+                        item.compressed_size,
+                        item.size,
+                        len(name),
+                        0,
+                    )
+                )
+                out.write(name)
+                shutil.copyfileobj(item.spool, out, CHUNK_SIZE)
+            central.append(
+                struct.pack(
+                    "<IHHHHHHIIIHHHHHII",
+                    0x02014B50,
+                    (3 << 8) | 20,
+                    20,
+                    flags,
+                    zlib.DEFLATED,
+                    FIXED_DOS_TIME,
+                    FIXED_DOS_DATE,
+                    item.crc,
+                    item.compressed_size,
+                    item.size,
+                    len(name),
+                    0,
+                    0,
+                    0,
+                    0,
+                    (0o100000 | item.member.mode) << 16,
+                    offset,
+                )
+                + name
+            )
+        directory_offset = out.tell()
+        for record in central:
+            out.write(record)
+        directory_size = out.tell() - directory_offset
+        if len(central) > ZIP32_MAX_ENTRIES or out.tell() > ZIP32_LIMIT:
+            raise ValueError("Archive needs zip64, which is not supported")
+        out.write(
+            struct.pack(
+                "<IHHHHIIH",
+                0x06054B50,
+                0,
+                0,
+                len(central),
+                len(central),
+                directory_size,
+                directory_offset,
+                0,
+            )
+        )
+    partial.replace(destination)
+    return destination
+
+
+def build_tar_xz(members: Iterable[ArchiveMember], destination: Path, preset: XzPreset = 6) -> Path:
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    partial = destination.with_name(destination.name + ".part")
+    with tarfile.open(partial, "w:xz", preset=preset, format=tarfile.PAX_FORMAT) as tar:
+        for member in members:
+            info = tarfile.TarInfo(member.arcname)
+            info.size = member.size
+            info.mtime = FIXED_EPOCH
+            info.mode = member.mode
+            info.uid = info.gid = 0
+            info.uname = info.gname = ""
+            with member.open() as fp:
+                tar.addfile(info, fp)
+    partial.replace(destination)
+    return destination
@@ -0,0 +1,48 @@
+"""Shared on-disk cache location and JSON state helpers."""
+
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+DEFAULT_CACHE_DIR = Path("tmp/cache")
+
+
+def cache_dir() -> Path:
+    return Path(os.environ.get("OMNIFORGE_CACHE_DIR", DEFAULT_CACHE_DIR))
+
+
+def load_state(name: str) -> dict[str, Any]:
+    path = cache_dir() / f"{name}.json"
+    try:
+        with path.open("r", encoding="utf-8") as fp:
+            data = json.load(fp)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def store_state(name: str, data: dict[str, Any]) -> None:
+    path = cache_dir() / f"{name}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f"{path.name}.{os.getpid()}.part")
+    with partial.open("w", encoding="utf-8") as fp:
+        json.dump(data, fp, indent=2, sort_keys=True)
+        fp.write("\n")
+    partial.replace(path)
+
+
+def stat_key(paths: Iterable[Path]) -> list[list[Any]]:
+    """Cheap change detector: path, mtime and size for each input (None when missing)."""
+    key: list[list[Any]] = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except OSError:
+            key.append([path.as_posix(), None, None])
+        else:
+            key.append([path.as_posix(), stat.st_mtime_ns, stat.st_size])
+    return key
@@ -0,0 +1,99 @@
+"""Canonical JSON serialization and hashing that ignores key order, whitespace and number spelling."""
+
+from __future__ import annotations
+
+import json
+import math
+import unicodedata
+from collections.abc import Iterator
+from hashlib import sha256
+from pathlib import Path
+from typing import Any
+
+# Integral floats up to 2**53 are exact, so 1.0 and 1 serialize identically.
+_EXACT_INT_LIMIT = 2**53
+
+
+class CanonicalError(ValueError):
+    """Raised for values JSON cannot represent canonically (NaN, infinities, non-string keys)."""
+
+
+def _string(value: str) -> str:
+    return json.dumps(unicodedata.normalize("NFC", value), ensure_ascii=False)
+
+
+def _number(value: int | float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if not math.isfinite(value):
+        raise CanonicalError(f"{value!r} has no JSON representation")
+    if value.is_integer() and abs(value) < _EXACT_INT_LIMIT:
+        return str(int(value))
+    return repr(value)
+
+
+def _object(value: dict[Any, Any]) -> Iterator[str]:
+    items = []
+    for key, child in value.items():
+        if not isinstance(key, str):
+            raise CanonicalError(f"Object keys must be strings, got {key!r}")
+        items.append((unicodedata.normalize("NFC", key), child))
+    items.sort(key=lambda item: item[0])
+    yield "{"
+    for position, (key, child) in enumerate(items):
+        if position:
+            yield ","
+        yield _string(key)
+        yield ":"
+        yield from iter_canonical(child)
+    yield "}"
+
+
+def _array(value: list[Any] | tuple[Any, ...]) -> Iterator[str]:
+    yield "["
+    for position, child in enumerate(value):
+        if position:
+            yield ","
+        yield from iter_canonical(child)
+    yield "]"
+
+
+def _scalar(value: Any) -> str:
+    if isinstance(value, str):
+        return _string(value)
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if value is None:
+        return "null"
+    if isinstance(value, (int, float)):
+        return _number(value)
+    raise CanonicalError(f"{type(value).__name__} is not JSON serializable")
+
+
+def iter_canonical(value: Any) -> Iterator[str]:
+    """Yield the canonical encoding in pieces: sorted NFC keys, no whitespace, normalized numbers."""
+    if isinstance(value, dict):
+        yield from _object(value)
+    elif isinstance(value, (list, tuple)):
+        yield from _array(value)
+    else:
+        yield _scalar(value)
+
+
+def canonical_bytes(value: Any) -> bytes:
+    return "".join(iter_canonical(value)).encode("utf-8")
+
+
+def canonical_digest(value: Any) -> str:
+    """SHA-256 of the canonical encoding, hashed as it is produced rather than from one buffer."""
+    hasher = sha256()
+    for piece in iter_canonical(value):
+        hasher.update(piece.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def canonical_file_digest(path: Path) -> str:
+    with path.open("r", encoding="utf-8") as fp:
+        return canonical_digest(json.load(fp))
@@ -3,23 +3,53 @@
 from __future__ import annotations
 
 import shutil
+import sys
 from collections.abc import Callable
 from dataclasses import dataclass
 from pathlib import Path
 
 import typer
-from rich.console import Console
-from rich.table import Table
 
-from .applier import ApplyMode, apply_profile
-from .exporter import export_windows_terminal_settings
-from .github_publisher import publish
-from .installer import install_prerequisites
-from .sanitizer import sanitize_zshrc
-from .validators import resolve_windows_terminal_path, run_diagnostics
+from .console import console
+from .modes import ApplyMode, MergePolicy, OutputFormat, ReportLevel
 
+# Command modules are imported inside each command so `omniforge diagnostics` or
+# `omniforge verify` does not pay for the installer, publisher, or Rich tables.
 app = typer.Typer(add_completion=False)
-console = Console()
+cache_app = typer.Typer(help="Manage the local vendor cache used for offline installs.")
+app.add_typer(cache_app, name="cache")
+
+
+def _flush_reports() -> None:
+    # Events recorded outside a reporting stage are summarized once the command finishes.
+    reporting = sys.modules.get(f"{__package__}.reporting")
+    if reporting is not None:
+        reporting.flush()
+
+
+@app.callback()
+def main_options(
+    ctx: typer.Context,
+    trace: Path | None = typer.Option(None, "--trace", help="Write a Chrome trace-event JSON file of spans"),
+    profile: Path | None = typer.Option(None, "--profile", help="Run the command under cProfile and dump stats"),
+    report: ReportLevel = typer.Option(ReportLevel.SUMMARY, "--report", case_sensitive=False, help="Event output level"),
+    report_jsonl: Path | None = typer.Option(None, "--report-jsonl", help="Append events and stage summaries as JSON Lines"),
+) -> None:
+    """Windows Terminal portable profile toolkit."""
+    ctx.call_on_close(_flush_reports)
+    if report != ReportLevel.SUMMARY or report_jsonl is not None:
+        from .reporting import configure  # noqa: PLC0415
+
+        configure(report, report_jsonl)
+    if trace is None and profile is None:
+        return
+    from .tracing import profiled, tracing  # noqa: PLC0415
+
+    # Resources close when the command finishes, so the trace and stats cover the whole command.
+    if trace is not None:
+        ctx.with_resource(tracing(trace))
+    if profile is not None:
+        ctx.with_resource(profiled(profile))
 
 
 @dataclass
@@ -30,15 +60,31 @@ class MenuItem:
 
 
 def _export_settings_action() -> None:
+    from .exporter import export_windows_terminal_settings  # noqa: PLC0415
+
     export_windows_terminal_settings()
 
 
 def _sanitize_action() -> None:
+    from .sanitizer import sanitize_zshrc  # noqa: PLC0415
+
     sanitize_zshrc()
 
 
 def _install_action() -> None:
-    install_prerequisites()
+    from .installer import install_prerequisites  # noqa: PLC0415
+    from .vendor_cache import VendorCacheError  # noqa: PLC0415
+
+    try:
+        install_prerequisites()
+    except VendorCacheError as exc:
+        console.print(f"[red]{exc}[/red]")
+
+
+def _diagnostics_action() -> None:
+    from .validators import run_diagnostics  # noqa: PLC0415
+
+    run_diagnostics()
 
 
 def _menu_items() -> dict[str, MenuItem]:
@@ -76,7 +122,7 @@ def _menu_items() -> dict[str, MenuItem]:
         "7": MenuItem(
             label="Diagnostics & validation",
             description="Runs environment checks, manifest validation, and git status.",
-            action=lambda: run_diagnostics(),
+            action=_diagnostics_action,
         ),
         "8": MenuItem(
             label="Exit",
@@ -87,6 +133,10 @@ def _menu_items() -> dict[str, MenuItem]:
 
 
 def _apply_menu() -> None:
+    from rich.table import Table  # noqa: PLC0415
+
+    from .applier import apply_profile  # noqa: PLC0415
+
     table = Table(title="Apply Mode")
     table.add_column("Option")
     table.add_column("Mode")
@@ -110,15 +160,19 @@ def _apply_menu() -> None:
 
 
 def _release_menu() -> None:
+    from .github_publisher import ReleaseOptions, publish  # noqa: PLC0415
+
     version = console.input("Tag version (e.g., v1.0.0): ").strip()
     if not version:
         console.print("[red]Version is required[/red]")
         return
     push = console.input("Push to remote as well? [y/N]: ").strip().lower().startswith("y")
-    publish(version=version, push_changes=push)
+    publish(version, ReleaseOptions(push_changes=push))
 
 
 def _restore_menu() -> None:
+    from rich.table import Table  # noqa: PLC0415
+
     root = Path.home() / "wt-portable" / "backups"
     if not root.exists():
         console.print("[yellow]No backups recorded yet[/yellow]")
@@ -149,6 +203,8 @@ def _restore_menu() -> None:
 
 def _detect_backup_target(filename: str) -> Path | None:
     if filename.startswith("settings.json"):
+        from .validators import resolve_windows_terminal_path  # noqa: PLC0415
+
         return resolve_windows_terminal_path()
     if filename.startswith(".zshrc"):
         return Path.home() / ".zshrc"
@@ -157,6 +213,8 @@ def _detect_backup_target(filename: str) -> Path | None:
 
 @app.command()
 def menu() -> None:
+    from rich.table import Table  # noqa: PLC0415
+
     console.print("[bold magenta]Windows Terminal Portable Profile Toolkit[/bold magenta]")
     items = _menu_items()
     while True:
@@ -182,14 +240,22 @@ def menu() -> None:
 
 
 @app.command()
-def export() -> None:
+def export(
+    library: bool = typer.Option(
+        False, "--library", help="Store schemes, themes and profile defaults in artifacts/library by hash"
+    ),
+) -> None:
     """Export Windows Terminal settings."""
-    export_windows_terminal_settings()
+    from .exporter import export_windows_terminal_settings  # noqa: PLC0415
+
+    export_windows_terminal_settings(library=library)
 
 
 @app.command()
 def sanitize() -> None:
     """Sanitize WSL .zshrc and update artifacts."""
+    from .sanitizer import sanitize_zshrc  # noqa: PLC0415
+
     sanitize_zshrc()
 
 
@@ -197,9 +263,31 @@ def sanitize() -> None:
 def install(
     non_interactive: bool = typer.Option(False, "--non-interactive", help="Suppress prompts"),
     include_wsl: bool = typer.Option(True, "--include-wsl", help="Install WSL if missing"),
+    offline: bool = typer.Option(False, "--offline", help="Install only from the local vendor cache"),
 ) -> None:
     """Install prerequisites such as Windows Terminal, WSL, and required plugins."""
-    install_prerequisites(non_interactive=non_interactive, include_wsl=include_wsl)
+    from .installer import install_prerequisites  # noqa: PLC0415
+    from .vendor_cache import VendorCacheError  # noqa: PLC0415
+
+    try:
+        install_prerequisites(non_interactive=non_interactive, include_wsl=include_wsl, offline=offline)
+    except VendorCacheError as exc:
+        console.print(f"[red]{exc}[/red]")
+        raise typer.Exit(code=1) from exc
+
+
+@cache_app.command("sync")
+def cache_sync(
+    root: Path = typer.Option(Path("vendor/cache"), "--root", help="Vendor cache directory"),
+) -> None:
+    """Mirror Oh My Zsh, plugins, and font archives into the vendor cache."""
+    from .vendor_cache import VendorCacheError, sync_cache  # noqa: PLC0415
+
+    try:
+        sync_cache(root=root)
+    except VendorCacheError as exc:
+        console.print(f"[red]{exc}[/red]")
+        raise typer.Exit(code=1) from exc
 
 
 @app.command()
@@ -208,22 +296,156 @@ def apply(
     dry_run: bool = typer.Option(False, "--dry-run", help="Preview changes"),
 ) -> None:
     """Apply the portable profile in the selected mode."""
+    from .applier import apply_profile  # noqa: PLC0415
+
     apply_profile(mode=mode, dry_run=dry_run)
 
 
 @app.command()
-def package(
+def merge(
+    sources: list[Path] = typer.Argument(..., exists=True, dir_okay=False, help="Settings fragments to merge"),
+    into: Path = typer.Option(Path("artifacts/settings.json"), "--into", help="Settings file to update"),
+    policy: MergePolicy = typer.Option(MergePolicy.FIELD, "--policy", case_sensitive=False),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Report changes without writing"),
+) -> None:
+    """Merge team profiles, color schemes, themes and actions into a settings file."""
+    from .merge import MergeError, merge_files  # noqa: PLC0415
+
+    try:
+        merge_files(sources, target=into, policy=policy, dry_run=dry_run)
+    except MergeError as exc:
+        console.print(f"[red]{exc}[/red]")
+        raise typer.Exit(code=1) from exc
+
+
+@app.command()
+def package(  # noqa: PLR0913, PLR0917 - Typer maps each parameter to one command-line option
     version: str = typer.Option("v1.0.0", "--version", help="Release version tag"),
     push_changes: bool = typer.Option(False, "--push", help="Push git changes to remote"),
+    offline: bool = typer.Option(False, "--offline", help="Bundle the vendor cache and skip remote access"),
+    tar_xz: bool = typer.Option(False, "--tar-xz", help="Also write release/portable-profile.tar.xz"),
+    delta_from: str | None = typer.Option(None, "--delta-from", help="Also build a delta bundle against this tag"),
+    scan: bool = typer.Option(False, "--scan", help="Abort before staging if the leak scan finds anything"),
 ) -> None:
     """Create release assets and optionally push to GitHub."""
-    publish(version=version, push_changes=push_changes)
+    from .github_publisher import ReleaseOptions, publish  # noqa: PLC0415
+    from .scanner import ScanError  # noqa: PLC0415
+
+    options = ReleaseOptions(push_changes=push_changes, offline=offline, tar_xz=tar_xz, delta_from=delta_from, scan=scan)
+    try:
+        publish(version, options)
+    except ScanError as exc:
+        console.print(f"[red]{exc}[/red]")
+        raise typer.Exit(code=1) from exc
+
+
+@app.command("apply-delta")
+def apply_delta_command(
+    bundle: Path = typer.Argument(..., exists=True, dir_okay=False, help="Delta bundle to apply"),
+    root: Path = typer.Option(Path("."), "--root", help="Unpacked release to update in place"),
+) -> None:
+    """Apply a delta release bundle after verifying base hashes."""
+    from .delta import apply_delta  # noqa: PLC0415
+
+    apply_delta(bundle, root=root)
 
 
 @app.command()
-def diagnostics() -> None:
+def diagnostics(
+    output_format: OutputFormat = typer.Option(OutputFormat.TABLE, "--format", case_sensitive=False),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Re-run every check"),
+) -> None:
     """Run diagnostic checks."""
-    run_diagnostics()
+    from .validators import run_diagnostics  # noqa: PLC0415
+
+    run_diagnostics(output_format=output_format.value, use_cache=not no_cache)
+
+
+@app.command("run")
+def run_command(
+    version: str = typer.Option("v1.0.0", "--version", help="Release version tag"),
+    push_changes: bool = typer.Option(False, "--push", help="Push git changes to remote"),
+    offline: bool = typer.Option(False, "--offline", help="Bundle the vendor cache and skip remote access"),
+    skip: list[str] = typer.Option([], "--skip", help="Leave a stage out of this run (repeatable)"),
+    force: bool = typer.Option(False, "--force", help="Re-run every stage even if inputs are unchanged"),
+) -> None:
+    """Run export → sanitize → diagnostics/verify → package, skipping stages whose inputs are unchanged."""
+    from .pipeline import PipelineError, release_stages, run_pipeline  # noqa: PLC0415
+
+    try:
+        run_pipeline(release_stages(version, push_changes=push_changes, offline=offline), skip=skip, force=force)
+    except PipelineError as exc:
+        console.print(f"[red]{exc}[/red]")
+        raise typer.Exit(code=1) from exc
+
+
+@app.command()
+def verify(
+    manifest: Path = typer.Option(Path("artifacts/manifest.json"), "--manifest", help="Manifest to check"),
+) -> None:
+    """Check artifact hashes against the manifest; exits non-zero on any mismatch."""
+    from .validators import verify_manifest  # noqa: PLC0415
+
+    results = verify_manifest(manifest)
+    failed = [result for result in results if result.status != "ok"]
+    for result in failed:
+        console.print(f"[red]{result.status}[/red] {result.name}: {result.details}")
+    if failed:
+        raise typer.Exit(code=1)
+    console.print(f"[green]{len(results)} artifacts match {manifest}[/green]")
+
+
+@app.command()
+def scan(
+    paths: list[Path] = typer.Argument(None, help="Files or directories to scan (default artifacts, docs, scripts, tool)"),
+    workers: int | None = typer.Option(None, "--workers", help="Worker processes (default: one per CPU)"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Rescan files that were clean last time"),
+    output_format: OutputFormat = typer.Option(OutputFormat.TABLE, "--format", case_sensitive=False),
+) -> None:
+    """Scan the tree read-only with the sanitizer rules; exits non-zero on any finding."""
+    from .scanner import SCAN_ROOTS, print_report, scan_repository  # noqa: PLC0415
+
+    report = scan_repository(paths or SCAN_ROOTS, workers=workers, use_cache=not no_cache)
+    if output_format == OutputFormat.JSON:
+        import json  # noqa: PLC0415
+        from dataclasses import asdict  # noqa: PLC0415
+
+        sys.stdout.write(json.dumps(asdict(report), indent=2) + "\n")
+    else:
+        print_report(report)
+    if report.findings:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def serve(
+    socket: Path | None = typer.Option(None, "--socket", help="Socket path (default tmp/cache/daemon.sock)"),
+    warm: bool = typer.Option(True, "--warm/--no-warm", help="Preload rules, schemas and the environment probe"),
+) -> None:
+    """Run a long-lived daemon that serves sanitize/export/verify/apply over a Unix socket."""
+    from . import daemon  # noqa: PLC0415
+
+    try:
+        daemon.serve(socket, warm=warm)
+    except daemon.DaemonError as exc:
+        console.print(f"[red]{exc}[/red]")
+        raise typer.Exit(code=1) from exc
+
+
+@app.command("git-filter")
+def git_filter() -> None:
+    """Serve git's long-running clean/smudge filter protocol on stdin/stdout (filter.<driver>.process)."""
+    from .git_filter import GitFilterError, run_filter_process  # noqa: PLC0415
+    from .reporting import configure, get_reporter  # noqa: PLC0415
+
+    # stdout carries the protocol, so event summaries must never print; a --report-jsonl sink still fills.
+    configure(ReportLevel.QUIET, get_reporter().sink)
+    try:
+        run_filter_process(sys.stdin.buffer, sys.stdout.buffer)
+    except GitFilterError as exc:
+        # stdout carries the protocol, so errors go to stderr where git shows them.
+        typer.echo(f"omniforge git-filter: {exc}", err=True)
+        raise typer.Exit(code=1) from exc
 
 
 def main() -> None:
@@ -0,0 +1,148 @@
+"""Thin client that forwards quick commands to a running daemon before loading the full CLI."""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sys
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import Any
+
+from .cache import cache_dir
+
+SOCKET_NAME = "daemon.sock"
+DEFAULT_TIMEOUT = 300.0
+
+
+class DaemonError(RuntimeError):
+    """Raised when the daemon rejects a request or cannot start."""
+
+
+class DaemonUnavailableError(DaemonError):
+    """Raised when no daemon is listening on the socket, or it serves another checkout."""
+
+
+def socket_path() -> Path:
+    override = os.environ.get("OMNIFORGE_SOCKET")
+    return Path(override) if override else cache_dir() / SOCKET_NAME
+
+
+def request(
+    command: str,
+    args: dict[str, Any] | None = None,
+    path: Path | None = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> dict[str, Any]:
+    """Send one JSON-line request and return the daemon's `result` payload."""
+    path = path or socket_path()
+    if not hasattr(socket, "AF_UNIX"):
+        raise DaemonUnavailableError("Unix domain sockets are not available on this platform")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(str(path))
+        except OSError as exc:
+            raise DaemonUnavailableError(f"No daemon listening on {path}") from exc
+        # The daemon resolves artifacts/ and the manifest against its own working directory.
+        message = {"id": 1, "command": command, "args": args or {}, "cwd": os.getcwd()}
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as stream:
+            line = stream.readline()
+    if not line:
+        raise DaemonError("Daemon closed the connection without replying")
+    reply = json.loads(line)
+    if not reply.get("ok"):
+        error = reply.get("error", "Daemon request failed")
+        raise DaemonUnavailableError(error) if reply.get("unavailable") else DaemonError(error)
+    result: dict[str, Any] = reply["result"]
+    return result
+
+
+def _sanitize_args(rest: list[str]) -> dict[str, Any] | None:
+    return None if rest else {}
+
+
+def _export_args(rest: list[str]) -> dict[str, Any] | None:
+    if rest == ["--library"]:
+        return {"library": True}
+    return None if rest else {}
+
+
+def _verify_args(rest: list[str]) -> dict[str, Any] | None:
+    match rest:
+        case []:
+            return {}
+        case ["--manifest", manifest]:
+            return {"manifest": str(Path(manifest).absolute())}
+    return None
+
+
+def _apply_args(rest: list[str]) -> dict[str, Any] | None:
+    args: dict[str, Any] = {}
+    options = iter(rest)
+    for option in options:
+        if option == "--dry-run":
+            args["dry_run"] = True
+        elif option == "--mode" and (mode := next(options, None)) is not None:
+            args["mode"] = mode.lower()
+        else:
+            return None
+    return args
+
+
+FORWARDABLE: dict[str, Callable[[list[str]], dict[str, Any] | None]] = {
+    "sanitize": _sanitize_args,
+    "export": _export_args,
+    "verify": _verify_args,
+    "apply": _apply_args,
+}
+
+
+def parse_forwardable(argv: Sequence[str]) -> tuple[str, dict[str, Any]] | None:
+    """Map simple invocations onto daemon requests; anything else runs locally."""
+    if not argv or argv[0] not in FORWARDABLE:
+        return None
+    args = FORWARDABLE[argv[0]](list(argv[1:]))
+    return None if args is None else (argv[0], args)
+
+
+def _render(command: str, result: dict[str, Any]) -> int:
+    if command == "verify":
+        failed = [item for item in result["results"] if item["status"] != "ok"]
+        for item in failed:
+            print(f"{item['status']} {item['name']}: {item['details']}")
+        if not failed:
+            print(f"{len(result['results'])} artifacts match the manifest")
+        return 1 if failed else 0
+    for key, value in result.items():
+        print(f"{key}: {value}")
+    return 0
+
+
+def forward(argv: Sequence[str]) -> int | None:
+    """Return the exit code if a daemon handled `argv`, or None to fall back to the local CLI."""
+    if os.environ.get("OMNIFORGE_NO_DAEMON"):
+        return None
+    parsed = parse_forwardable(argv)
+    if parsed is None or not socket_path().exists():
+        return None
+    command, args = parsed
+    try:
+        result = request(command, args)
+    except DaemonUnavailableError:
+        return None
+    except DaemonError as exc:
+        print(f"omniforge daemon: {exc}", file=sys.stderr)
+        return 1
+    return _render(command, result)
+
+
+def main() -> None:
+    code = forward(sys.argv[1:])
+    if code is not None:
+        sys.exit(code)
+    from .cli import main as cli_main  # noqa: PLC0415
+
+    cli_main()
@@ -0,0 +1,32 @@
+"""Shared Rich console for every module, created on first use."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from rich.console import Console
+
+
+class _LazyConsole:
+    """Defer importing Rich until something is actually printed."""
+
+    def __init__(self) -> None:
+        self._console: Console | None = None
+
+    def get(self) -> Console:
+        if self._console is None:
+            try:
+                from rich.console import Console  # noqa: PLC0415
+            except ImportError as exc:  # pragma: no cover - dependency guard
+                raise RuntimeError(
+                    "The 'rich' package is required. Install dependencies with `pip install -r requirements.txt`."
+                ) from exc
+            self._console = Console()
+        return self._console
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+
+console: Console = _LazyConsole()  # type: ignore[assignment]
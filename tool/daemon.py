@@ -0,0 +1,187 @@
+"""Long-lived asyncio daemon that serves sanitize/export/verify/apply over a Unix socket."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import socket
+import time
+from collections.abc import Callable
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+from .client import DaemonError, DaemonUnavailableError, request, socket_path
+from .console import console
+
+# Requests are single JSON lines; this bounds one request, not the connection.
+LINE_LIMIT = 1 << 20
+# Only the owner may connect; requests run with the owner's files and home directory.
+SOCKET_MODE = 0o600
+
+
+def _sanitize(args: dict[str, Any]) -> dict[str, Any]:
+    from .sanitizer import sanitize_zshrc  # noqa: PLC0415
+
+    source = args.get("source")
+    destination = sanitize_zshrc(source=Path(source) if source else None)
+    return {"path": destination.as_posix()}
+
+
+def _export(args: dict[str, Any]) -> dict[str, Any]:
+    from .exporter import export_windows_terminal_settings  # noqa: PLC0415
+
+    result = export_windows_terminal_settings(library=bool(args.get("library", False)))
+    return {
+        "source": str(result.source),
+        "destination": result.destination.as_posix(),
+        "checksum": result.checksum,
+        "canonical_checksum": result.canonical_checksum,
+    }
+
+
+def _verify(args: dict[str, Any]) -> dict[str, Any]:
+    from .validators import verify_manifest  # noqa: PLC0415
+
+    results = verify_manifest(Path(args.get("manifest", "artifacts/manifest.json")))
+    return {"results": [asdict(result) for result in results]}
+
+
+def _apply(args: dict[str, Any]) -> dict[str, Any]:
+    from .applier import apply_profile  # noqa: PLC0415
+    from .modes import ApplyMode  # noqa: PLC0415
+
+    result = apply_profile(mode=ApplyMode(args.get("mode", "copy")), dry_run=bool(args.get("dry_run", False)))
+    return {
+        "settings_path": str(result.settings_path),
+        "zsh_path": str(result.zsh_path),
+        "backups": [str(path) for path in result.backups],
+    }
+
+
+def _scoped(handler: Callable[[dict[str, Any]], dict[str, Any]], args: dict[str, Any]) -> dict[str, Any]:
+    from .reporting import scoped_reporter  # noqa: PLC0415
+
+    # Each request's events are summarized on their own, not mixed with a concurrent request's.
+    with scoped_reporter():
+        return handler(args)
+
+
+# Commands that rewrite artifacts or manifest entries run one at a time; reads run concurrently.
+HANDLERS: dict[str, tuple[Callable[[dict[str, Any]], dict[str, Any]], bool]] = {
+    "sanitize": (_sanitize, True),
+    "export": (_export, True),
+    "apply": (_apply, True),
+    "verify": (_verify, False),
+}
+
+
+def warm_up() -> None:
+    """Load everything a request would otherwise pay for on first use."""
+    from . import applier, exporter, sanitizer, validators  # noqa: F401, PLC0415
+    from .environment import probe_environment  # noqa: PLC0415
+    from .schema import load_validator  # noqa: PLC0415
+
+    sanitizer.compiled_rules()
+    load_validator("settings")
+    load_validator("manifest")
+    probe_environment()
+    console.get()  # type: ignore[attr-defined]
+
+
+class Daemon:
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or socket_path()
+        # Handlers use relative paths and the home directory, so requests must come from here.
+        self.cwd = os.path.realpath(os.getcwd())
+        self.started = time.time()
+        self.requests = 0
+        self.write_lock = asyncio.Lock()
+        self.server: asyncio.AbstractServer | None = None
+        self.stopping = asyncio.Event()
+
+    async def dispatch(self, message: dict[str, Any]) -> dict[str, Any]:
+        command = message.get("command")
+        args = message.get("args") or {}
+        if command == "ping":
+            return {"pid": os.getpid(), "uptime": time.time() - self.started, "requests": self.requests}
+        if command == "shutdown":
+            self.stopping.set()
+            return {"stopping": True}
+        if command not in HANDLERS or not isinstance(args, dict):
+            raise DaemonError(f"Unknown command {command!r}")
+        cwd = message.get("cwd")
+        if not isinstance(cwd, str) or os.path.realpath(cwd) != self.cwd:
+            raise DaemonUnavailableError(f"Daemon serves {self.cwd}, not {cwd}")
+        handler, mutates = HANDLERS[command]
+        if mutates:
+            async with self.write_lock:
+                return await asyncio.to_thread(_scoped, handler, args)
+        return await asyncio.to_thread(_scoped, handler, args)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                self.requests += 1
+                request_id = None
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise DaemonError("Request must be a JSON object")
+                    request_id = message.get("id")
+                    reply = {"id": request_id, "ok": True, "result": await self.dispatch(message)}
+                except Exception as exc:
+                    reply = {"id": request_id, "ok": False, "error": f"{type(exc).__name__}: {exc}"}
+                    if isinstance(exc, DaemonUnavailableError):
+                        # The client then runs the command locally instead of failing.
+                        reply["unavailable"] = True
+                writer.write(json.dumps(reply).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        _claim_socket(self.path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Bind under a private umask so the socket is never connectable by other users, even briefly.
+        umask = os.umask(0o077)
+        try:
+            self.server = await asyncio.start_unix_server(self.handle, path=str(self.path), limit=LINE_LIMIT)
+        finally:
+            os.umask(umask)
+        os.chmod(self.path, SOCKET_MODE)
+        console.print(f"[green]omniforge daemon listening[/green] on {self.path} (pid {os.getpid()})")
+        try:
+            async with self.server:
+                await self.stopping.wait()
+        finally:
+            self.path.unlink(missing_ok=True)
+            console.print("[yellow]omniforge daemon stopped[/yellow]")
+
+
+def _claim_socket(path: Path) -> None:
+    if not path.exists():
+        return
+    try:
+        request("ping", path=path, timeout=1.0)
+    except DaemonUnavailableError:
+        # Left behind by a daemon that did not shut down cleanly.
+        path.unlink(missing_ok=True)
+        return
+    raise DaemonError(f"A daemon is already listening on {path}")
+
+
+def serve(path: Path | None = None, warm: bool = True) -> None:
+    if not hasattr(socket, "AF_UNIX"):
+        raise DaemonError("Unix domain sockets are not available on this platform")
+    if warm:
+        warm_up()
+    daemon = Daemon(path)
+    try:
+        asyncio.run(daemon.serve())
+    except KeyboardInterrupt:
+        pass
+
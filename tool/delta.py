@@ -0,0 +1,236 @@
+"""Delta release bundles computed from manifest hashes between tags."""
+
+from __future__ import annotations
+
+import json
+import zipfile
+from dataclasses import asdict, dataclass, field
+from hashlib import sha256
+from pathlib import Path, PurePosixPath
+from typing import Any
+
+from .archive import ArchiveMember, build_zip
+from .console import console
+from .git_session import GitSession
+from .library import LibraryError, library_for, references
+
+MANIFEST_PATH = Path("artifacts/manifest.json")
+SETTINGS_PATH = Path("artifacts/settings.json")
+PATCH_MANIFEST = "patch-manifest.json"
+
+
+class DeltaError(RuntimeError):
+    """Raised when a delta cannot be built or does not match its base."""
+
+
+@dataclass
+class DeltaEntry:
+    path: str
+    action: str
+    base_sha256: str | None
+    sha256: str | None
+
+
+@dataclass
+class DeltaPlan:
+    base_version: str
+    target_version: str
+    entries: list[DeltaEntry] = field(default_factory=list)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=2, sort_keys=True) + "\n"
+
+    @classmethod
+    def from_json(cls, payload: str) -> DeltaPlan:
+        data = json.loads(payload)
+        entries = [DeltaEntry(**entry) for entry in data.get("entries", [])]
+        return cls(data["base_version"], data["target_version"], entries)
+
+
+def _digest(data: bytes) -> str:
+    return sha256(data).hexdigest()
+
+
+def _hash_path(path: Path) -> str | None:
+    return _digest(path.read_bytes()) if path.exists() else None
+
+
+def _artifact_records(manifest: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    return {
+        item["path"]: item
+        for item in manifest.get("artifacts", [])
+        if isinstance(item, dict) and "path" in item and "sha256" in item
+    }
+
+
+def _content_key(record: dict[str, Any] | None) -> str | None:
+    # JSON artifacts compare by canonical digest so a reformat alone never becomes a delta entry.
+    if record is None:
+        return None
+    key = record.get("canonical_sha256") or record["sha256"]
+    return str(key)
+
+
+def read_file_at(ref: str, path: Path, session: GitSession | None = None) -> bytes:
+    if session is None:
+        with GitSession() as owned:
+            return read_file_at(ref, path, owned)
+    data = session.read_object(f"{ref}:{path.as_posix()}")
+    if data is None:
+        raise DeltaError(f"Cannot read {path} at {ref}")
+    return data
+
+
+def plan_delta(
+    base_manifest: bytes,
+    target_manifest: bytes,
+    base_version: str,
+    target_version: str,
+    manifest_path: Path = MANIFEST_PATH,
+) -> DeltaPlan:
+    base = _artifact_records(json.loads(base_manifest))
+    target = _artifact_records(json.loads(target_manifest))
+    plan = DeltaPlan(base_version=base_version, target_version=target_version)
+    for path in sorted(base.keys() | target.keys()):
+        before, after = base.get(path), target.get(path)
+        if _content_key(before) == _content_key(after):
+            continue
+        action = "add" if before is None else "remove" if after is None else "modify"
+        plan.entries.append(
+            DeltaEntry(path, action, before["sha256"] if before else None, after["sha256"] if after else None)
+        )
+    if plan.entries:
+        # The manifest is not listed in itself, so it rides along whenever anything changed.
+        plan.entries.append(
+            DeltaEntry(
+                manifest_path.as_posix(),
+                "modify",
+                _digest(base_manifest),
+                _digest(target_manifest),
+            )
+        )
+    return plan
+
+
+def _library_entries(base_version: str, session: GitSession | None) -> list[DeltaEntry]:
+    # Library objects are not listed in the manifest. Ship the ones the new settings reference
+    # that the base release's settings did not; their file hash is their name.
+    if not SETTINGS_PATH.exists():
+        return []
+    library = library_for(SETTINGS_PATH)
+    wanted = library.closure(references(json.loads(SETTINGS_PATH.read_bytes())))
+    try:
+        base = json.loads(read_file_at(base_version, SETTINGS_PATH, session))
+        present = library.closure(references(base)) if isinstance(base, dict) else set()
+    except (DeltaError, LibraryError, ValueError):
+        present = set()
+    return [
+        DeltaEntry(library.object_path(digest).as_posix(), "add", None, digest)
+        for digest in sorted(wanted - present)
+    ]
+
+
+def build_delta(
+    base_version: str,
+    target_version: str,
+    output: Path = Path("release"),
+    manifest_path: Path = MANIFEST_PATH,
+    session: GitSession | None = None,
+) -> Path:
+    base_manifest = read_file_at(base_version, manifest_path, session)
+    target_manifest = manifest_path.read_bytes()
+    plan = plan_delta(base_manifest, target_manifest, base_version, target_version, manifest_path)
+    if plan.entries:
+        plan.entries[-1:-1] = _library_entries(base_version, session)
+
+    members: list[ArchiveMember] = []
+    for entry in plan.entries:
+        if entry.action == "remove":
+            continue
+        path = Path(entry.path)
+        if _hash_path(path) != entry.sha256:
+            raise DeltaError(f"{entry.path} on disk does not match {manifest_path}; re-run export/sanitize")
+        members.append(ArchiveMember(entry.path, path=path))
+    members.append(ArchiveMember(PATCH_MANIFEST, data=plan.to_json().encode("utf-8")))
+
+    bundle = output / f"portable-profile-delta-{base_version}-{target_version}.zip"
+    build_zip(members, bundle)
+    console.print(
+        f"[green]Delta bundle written[/green] → {bundle} ({len(plan.entries)} changes since {base_version})"
+    )
+    return bundle
+
+
+def _target_path(root: Path, name: str) -> Path:
+    """Resolve a bundle entry under `root`, refusing anything that would land outside it."""
+    relative = PurePosixPath(name)
+    if not name or "\\" in name or relative.is_absolute() or ".." in relative.parts:
+        raise DeltaError(f"Unsafe path in delta bundle: {name!r}")
+    target = root / relative
+    # Symlinks inside the release tree must not redirect writes either.
+    if not target.resolve().is_relative_to(root.resolve()):
+        raise DeltaError(f"Unsafe path in delta bundle: {name!r}")
+    return target
+
+
+def _write_staged(contents: dict[Path, bytes]) -> None:
+    # Every file is staged before any is replaced, so a failed write leaves the release untouched.
+    staged: list[tuple[Path, Path]] = []
+    try:
+        for target, data in contents.items():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            partial = target.with_name(target.name + ".part")
+            partial.write_bytes(data)
+            staged.append((partial, target))
+    except OSError:
+        for partial, _ in staged:
+            partial.unlink(missing_ok=True)
+        raise
+    for partial, target in staged:
+        partial.replace(target)
+
+
+def apply_delta(bundle: Path, root: Path = Path(".")) -> list[Path]:
+    """Apply `bundle` to `root` only after every path and member digest has been checked."""
+    with zipfile.ZipFile(bundle) as zf:
+        plan = DeltaPlan.from_json(zf.read(PATCH_MANIFEST).decode("utf-8"))
+        targets = {entry.path: _target_path(root, entry.path) for entry in plan.entries}
+
+        pending: list[DeltaEntry] = []
+        conflicts: list[str] = []
+        for entry in plan.entries:
+            current = _hash_path(targets[entry.path])
+            if current == entry.sha256:
+                continue
+            if current != entry.base_sha256:
+                conflicts.append(entry.path)
+            pending.append(entry)
+        if conflicts:
+            raise DeltaError(
+                f"Base mismatch for {', '.join(conflicts)}; expected release {plan.base_version}"
+            )
+
+        contents: dict[str, bytes] = {}
+        for entry in pending:
+            if entry.action == "remove":
+                continue
+            try:
+                data = zf.read(entry.path)
+            except KeyError as exc:
+                raise DeltaError(f"Delta bundle is missing {entry.path}") from exc
+            if _digest(data) != entry.sha256:
+                raise DeltaError(f"Corrupt delta member {entry.path}")
+            contents[entry.path] = data
+
+    _write_staged({targets[path]: data for path, data in contents.items()})
+    changed: list[Path] = []
+    for entry in pending:
+        if entry.action == "remove":
+            targets[entry.path].unlink(missing_ok=True)
+        changed.append(targets[entry.path])
+
+    console.print(
+        f"[green]Applied delta[/green] {plan.base_version} → {plan.target_version} ({len(changed)} files)"
+    )
+    return changed
+
@@ -0,0 +1,192 @@
+"""Pluggable diagnostics engine with concurrent checks and input-keyed caching."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from .cache import load_state, stat_key, store_state
+from .git_session import GitSession
+from .library import LIBRARY_DIR, LibraryError, library_for, materialize, references
+from .schema import SCHEMA_DIR, validate_document
+from .validators import DiagnosticResult, detect_environment, validate_json, validate_manifest
+
+CACHE_NAME = "diagnostics"
+WT_SETTINGS = Path("artifacts/settings.json")
+ZSH_PORTABLE = Path("artifacts/zshrc.portable")
+MANIFEST = Path("artifacts/manifest.json")
+
+
+@dataclass(frozen=True)
+class DiagnosticCheck:
+    name: str
+    run: Callable[[], list[DiagnosticResult]]
+    inputs: tuple[Path, ...] = ()
+    timeout: float = 10.0
+    cacheable: bool = True
+
+
+CHECKS: list[DiagnosticCheck] = []
+
+
+def diagnostic_check(
+    name: str,
+    inputs: Sequence[Path] = (),
+    timeout: float = 10.0,
+    cacheable: bool = True,
+) -> Callable[[Callable[[], list[DiagnosticResult]]], Callable[[], list[DiagnosticResult]]]:
+    """Register a check; cacheable checks are reused until the stat of their inputs changes.
+
+    A directory input stands for every file beneath it.
+    """
+
+    def register(func: Callable[[], list[DiagnosticResult]]) -> Callable[[], list[DiagnosticResult]]:
+        CHECKS.append(DiagnosticCheck(name, func, tuple(inputs), timeout, cacheable))
+        return func
+
+    return register
+
+
+@diagnostic_check("environment", cacheable=False, timeout=2.0)
+def _environment() -> list[DiagnosticResult]:
+    return [DiagnosticResult("Environment", "ok", detect_environment())]
+
+
+def _readable(path: Path) -> list[DiagnosticResult]:
+    if not path.exists():
+        return [DiagnosticResult(path.name, "missing", "File not found")]
+    try:
+        if path.suffix == ".json":
+            validate_json(path)
+    except ValueError as exc:
+        return [DiagnosticResult(path.name, "error", str(exc))]
+    return [DiagnosticResult(path.name, "ok", "Readable")]
+
+
+# The verdict also depends on the schemas it is validated against and the library it materializes from.
+@diagnostic_check("settings", inputs=[WT_SETTINGS, SCHEMA_DIR, LIBRARY_DIR])
+def _settings() -> list[DiagnosticResult]:
+    if not WT_SETTINGS.exists():
+        return _readable(WT_SETTINGS)
+    try:
+        with WT_SETTINGS.open("r", encoding="utf-8") as fp:
+            data = json.load(fp)
+    except json.JSONDecodeError as exc:
+        return [DiagnosticResult(WT_SETTINGS.name, "error", f"Invalid JSON in {WT_SETTINGS}: {exc}")]
+    results = [DiagnosticResult(WT_SETTINGS.name, "ok", "Readable")]
+    if isinstance(data, dict) and references(data):
+        try:
+            data = materialize(data, library_for(WT_SETTINGS))
+        except LibraryError as exc:
+            return [*results, DiagnosticResult("settings.json library", "error", str(exc))]
+    results.extend(
+        DiagnosticResult("settings.json schema", "error", str(violation))
+        for violation in validate_document(data, "settings")
+    )
+    return results
+
+
+@diagnostic_check("zshrc", inputs=[ZSH_PORTABLE])
+def _zshrc() -> list[DiagnosticResult]:
+    return _readable(ZSH_PORTABLE)
+
+
+@diagnostic_check("manifest", inputs=[MANIFEST])
+def _manifest() -> list[DiagnosticResult]:
+    return validate_manifest([WT_SETTINGS, ZSH_PORTABLE])
+
+
+@diagnostic_check("git", cacheable=False, timeout=15.0)
+def _git_status() -> list[DiagnosticResult]:
+    with GitSession(echo=False) as session:
+        status = session.status()
+    if status.clean:
+        return [DiagnosticResult("Git status", "ok", "Working tree clean")]
+    return [DiagnosticResult("Git status", "dirty", "\n".join(entry.short for entry in status.entries))]
+
+
+def _input_files(inputs: Iterable[Path]) -> Iterator[Path]:
+    for path in inputs:
+        if path.is_dir():
+            yield path
+            yield from sorted(child for child in path.rglob("*") if child.is_file())
+        else:
+            yield path
+
+
+def _start(check: DiagnosticCheck, slots: threading.BoundedSemaphore) -> Future[list[DiagnosticResult]]:
+    """Run `check` on a daemon thread, so one that overruns its timeout cannot hold up exit."""
+    future: Future[list[DiagnosticResult]] = Future()
+
+    def target() -> None:
+        with slots:
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(check.run())
+            except BaseException as exc:
+                future.set_exception(exc)
+
+    threading.Thread(target=target, name=f"diagnostic-{check.name}", daemon=True).start()
+    return future
+
+
+class DiagnosticsEngine:
+    def __init__(
+        self,
+        checks: Sequence[DiagnosticCheck] | None = None,
+        use_cache: bool = True,
+        workers: int | None = None,
+    ) -> None:
+        self.checks = list(CHECKS if checks is None else checks)
+        self.use_cache = use_cache
+        self.workers = workers or max(len(self.checks), 1)
+        self.cache_hits: list[str] = []
+
+    def run(self) -> list[DiagnosticResult]:
+        cache = load_state(CACHE_NAME) if self.use_cache else {}
+        keys = {check.name: stat_key(_input_files(check.inputs)) for check in self.checks if check.cacheable}
+        results: dict[str, list[DiagnosticResult]] = {}
+        futures: dict[str, tuple[Future[list[DiagnosticResult]], float]] = {}
+        self.cache_hits = []
+
+        slots = threading.BoundedSemaphore(self.workers)
+        for check in self.checks:
+            cached = cache.get(check.name)
+            if check.cacheable and cached and cached.get("key") == keys[check.name]:
+                results[check.name] = [DiagnosticResult(**item) for item in cached["results"]]
+                self.cache_hits.append(check.name)
+                continue
+            futures[check.name] = (_start(check, slots), time.monotonic() + check.timeout)
+
+        for check in self.checks:
+            if check.name not in futures:
+                continue
+            future, deadline = futures[check.name]
+            try:
+                results[check.name] = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeoutError:
+                # A check still waiting for a slot never starts; one already running is abandoned.
+                future.cancel()
+                results[check.name] = [
+                    DiagnosticResult(check.name, "timeout", f"Exceeded {check.timeout:g}s budget")
+                ]
+                continue
+            except Exception as exc:
+                results[check.name] = [DiagnosticResult(check.name, "error", str(exc))]
+                continue
+            if check.cacheable:
+                cache[check.name] = {
+                    "key": keys[check.name],
+                    "results": [asdict(result) for result in results[check.name]],
+                }
+
+        if self.use_cache and futures:
+            store_state(CACHE_NAME, cache)
+        return [result for check in self.checks for result in results[check.name]]
@@ -0,0 +1,191 @@
+"""Cached, resumable downloads and selective archive extraction."""
+
+from __future__ import annotations
+
+import json
+import shutil
+import urllib.error
+import urllib.parse
+import urllib.request
+import zipfile
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from hashlib import sha256
+from http import HTTPStatus
+from pathlib import Path, PurePosixPath
+from typing import Any
+
+from .console import console
+from .library import library_for, materialize
+from .tracing import traced
+
+CHUNK_SIZE = 1 << 20
+FONT_SUFFIXES = (".ttf", ".otf")
+# Windows Terminal face names use the short Nerd Font suffixes; archive files spell them out.
+NERD_FONT_SUFFIXES = {
+    "NFM": "NerdFontMono",
+    "NFP": "NerdFontPropo",
+    "NF": "NerdFont",
+}
+
+
+class DownloadError(RuntimeError):
+    """Raised when a download cannot be completed or fails verification."""
+
+
+@traced()
+def _hash_file(path: Path) -> str:
+    digest = sha256()
+    with path.open("rb") as fp:
+        for chunk in iter(lambda: fp.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _digest_path(path: Path) -> Path:
+    return path.with_name(path.name + ".sha256")
+
+
+@dataclass
+class DownloadCache:
+    root: Path
+
+    def path_for(self, url: str, checksum: str | None = None) -> Path:
+        key = sha256(f"{url}\0{checksum or ''}".encode()).hexdigest()[:16]
+        name = PurePosixPath(urllib.parse.urlparse(url).path).name or "download"
+        return self.root / f"{key}-{name}"
+
+    def lookup(self, url: str, checksum: str | None = None) -> Path | None:
+        cached = self.path_for(url, checksum)
+        if not cached.exists():
+            return None
+        if checksum is None or self._verified(cached) == checksum:
+            return cached
+        if _hash_file(cached) == checksum:
+            self._record_digest(cached, checksum)
+            return cached
+        return None
+
+    def _verified(self, path: Path) -> str | None:
+        """Digest recorded when `path` was last verified, if its size and mtime are unchanged."""
+        try:
+            record = json.loads(_digest_path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        stat = path.stat()
+        if isinstance(record, dict) and record.get("size") == stat.st_size and record.get("mtime_ns") == stat.st_mtime_ns:
+            digest = record.get("sha256")
+            return digest if isinstance(digest, str) else None
+        return None
+
+    def _record_digest(self, path: Path, checksum: str) -> None:
+        stat = path.stat()
+        record = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": checksum}
+        _digest_path(path).write_text(json.dumps(record), encoding="utf-8")
+
+    def fetch(self, url: str, checksum: str | None = None) -> Path:
+        cached = self.lookup(url, checksum)
+        if cached:
+            console.print(f"[green]Using cached download[/green] {cached}")
+            return cached
+
+        destination = self.path_for(url, checksum)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        destination.unlink(missing_ok=True)
+        _digest_path(destination).unlink(missing_ok=True)
+        partial = destination.with_name(destination.name + ".part")
+        self._download(url, partial)
+
+        if checksum and _hash_file(partial) != checksum:
+            partial.unlink()
+            raise DownloadError(f"sha256 mismatch for {url}")
+        partial.replace(destination)
+        if checksum:
+            # Later lookups trust this record instead of rehashing the whole archive.
+            self._record_digest(destination, checksum)
+        return destination
+
+    def _download(self, url: str, partial: Path) -> None:
+        offset = partial.stat().st_size if partial.exists() else 0
+        request = urllib.request.Request(url)
+        if offset:
+            request.add_header("Range", f"bytes={offset}-")
+            console.print(f"[cyan]Resuming[/cyan] {url} at byte {offset}")
+        else:
+            console.print(f"[cyan]Downloading[/cyan] {url}")
+        try:
+            response = urllib.request.urlopen(request)
+        except urllib.error.HTTPError as exc:
+            if exc.code == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE and offset:
+                # The partial file already holds the full body.
+                return
+            raise DownloadError(f"Download of {url} failed: HTTP {exc.code}") from exc
+        with response:
+            # Servers that ignore Range answer 200 with the full body, so start over.
+            mode = "ab" if offset and response.status == HTTPStatus.PARTIAL_CONTENT else "wb"
+            with partial.open(mode) as fp:
+                shutil.copyfileobj(response, fp, CHUNK_SIZE)
+
+
+def font_file_prefix(face: str) -> str:
+    family, _, suffix = face.rpartition(" ")
+    if family and suffix in NERD_FONT_SUFFIXES:
+        return family.replace(" ", "") + NERD_FONT_SUFFIXES[suffix]
+    return face.replace(" ", "")
+
+
+def required_font_faces(settings: dict[str, Any]) -> set[str]:
+    profiles = settings.get("profiles", {})
+    if not isinstance(profiles, dict):
+        return set()
+    entries = [profiles.get("defaults", {}), *profiles.get("list", [])]
+    faces: set[str] = set()
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        font = entry.get("font")
+        if isinstance(font, dict) and isinstance(font.get("face"), str):
+            faces.add(font["face"])
+        elif isinstance(entry.get("fontFace"), str):
+            faces.add(entry["fontFace"])
+    return faces
+
+
+def load_font_faces(settings_path: Path) -> set[str]:
+    """Faces the settings use; `export --library` references are resolved first, since they hold `font`."""
+    if not settings_path.exists():
+        return set()
+    with settings_path.open("r", encoding="utf-8") as fp:
+        data = json.load(fp)
+    if not isinstance(data, dict):
+        return set()
+    return required_font_faces(materialize(data, library_for(settings_path)))
+
+
+def font_selector(faces: Iterable[str]) -> Callable[[str], bool]:
+    prefixes = tuple(f"{font_file_prefix(face)}-" for face in faces)
+
+    def select(member: str) -> bool:
+        name = PurePosixPath(member).name
+        return name.endswith(FONT_SUFFIXES) and name.startswith(prefixes)
+
+    return select
+
+
+def extract_members(archive: Path, destination: Path, select: Callable[[str], bool]) -> list[Path]:
+    destination.mkdir(parents=True, exist_ok=True)
+    extracted: list[Path] = []
+    with zipfile.ZipFile(archive) as zf:
+        for info in zf.infolist():
+            if info.is_dir() or not select(info.filename):
+                continue
+            # Flatten member paths so archive entries can never escape the destination.
+            target = destination / PurePosixPath(info.filename).name
+            if target.exists() and target.stat().st_size == info.file_size:
+                continue
+            partial = target.with_name(target.name + ".part")
+            with zf.open(info) as src, partial.open("wb") as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            partial.replace(target)
+            extracted.append(target)
+    return extracted
@@ -0,0 +1,166 @@
+"""Cached probe of Windows Terminal installs, WSL distros, and external tools."""
+
+from __future__ import annotations
+
+import os
+import platform
+import shutil
+import subprocess
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .cache import load_state, stat_key, store_state
+from .tracing import span
+
+CACHE_NAME = "environment"
+DEFAULT_TTL = 3600.0
+TERMINAL_CANDIDATES = (
+    ("stable", ("Packages", "Microsoft.WindowsTerminal_8wekyb3d8bbwe", "LocalState", "settings.json")),
+    ("preview", ("Packages", "Microsoft.WindowsTerminalPreview_8wekyb3d8bbwe", "LocalState", "settings.json")),
+    ("unpackaged", ("Microsoft", "Windows Terminal", "settings.json")),
+)
+TOOLS = ("wt.exe", "winget", "wsl.exe", "git")
+# `wsl.exe` can hang while the WSL service starts; a stuck probe must not stall every command.
+WSL_TIMEOUT = 10.0
+
+_memo: dict[str, EnvironmentSnapshot] = {}
+
+
+@dataclass
+class EnvironmentSnapshot:
+    environment: str
+    root: str | None
+    terminal_installs: dict[str, str] = field(default_factory=dict)
+    tools: dict[str, str | None] = field(default_factory=dict)
+    wsl_available: bool = False
+    distros: list[str] = field(default_factory=list)
+    probed_at: float = 0.0
+    fingerprint: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def windows_terminal_settings(self) -> Path | None:
+        for channel, _ in TERMINAL_CANDIDATES:
+            if channel in self.terminal_installs:
+                return Path(self.terminal_installs[channel])
+        return None
+
+
+def detect_environment() -> str:
+    system = platform.system().lower()
+    if system == "windows":
+        return "windows"
+    if "microsoft" in platform.release().lower():
+        return "wsl"
+    return system
+
+
+def _fingerprint(root: Path | None) -> dict[str, Any]:
+    # Installing or removing a terminal package changes these directory mtimes, and tool
+    # discovery depends on PATH, so either invalidates a persisted probe before its TTL.
+    watched = [root / "Packages", root / "Microsoft"] if root is not None else []
+    return {"dirs": stat_key(watched), "PATH": os.environ.get("PATH", "")}
+
+
+def _run_wsl(wsl: str, *args: str) -> subprocess.CompletedProcess[bytes] | None:
+    with span("subprocess", argv=" ".join([wsl, *args])):
+        try:
+            return subprocess.run([wsl, *args], capture_output=True, check=False, timeout=WSL_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            return None
+
+
+def _list_distros(wsl: str) -> list[str]:
+    result = _run_wsl(wsl, "-l", "-q")
+    if result is None or result.returncode != 0:
+        return []
+    # wsl.exe writes UTF-16LE on Windows hosts.
+    encoding = "utf-16-le" if b"\x00" in result.stdout else "utf-8"
+    text = result.stdout.decode(encoding, errors="ignore")
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def _terminal_installs(root: Path | None) -> dict[str, str]:
+    if root is None:
+        return {}
+    candidates = ((channel, root.joinpath(*parts)) for channel, parts in TERMINAL_CANDIDATES)
+    return {channel: str(candidate) for channel, candidate in candidates if candidate.exists()}
+
+
+def _probe(root: Path | None) -> EnvironmentSnapshot:
+    snapshot = EnvironmentSnapshot(
+        environment=detect_environment(),
+        root=root.as_posix() if root else None,
+        probed_at=time.time(),
+        fingerprint=_fingerprint(root),
+        terminal_installs=_terminal_installs(root),
+    )
+    snapshot.tools = {tool: shutil.which(tool) for tool in TOOLS}
+    wsl = snapshot.tools.get("wsl.exe")
+    if wsl:
+        status = _run_wsl(wsl, "--status")
+        snapshot.wsl_available = status is not None and status.returncode == 0
+        if snapshot.wsl_available:
+            snapshot.distros = _list_distros(wsl)
+    return snapshot
+
+
+def _default_root() -> Path | None:
+    local_app_data = os.environ.get("LOCALAPPDATA")
+    return Path(local_app_data) if local_app_data else None
+
+
+def _is_fresh(snapshot: EnvironmentSnapshot, root: Path | None, ttl: float) -> bool:
+    return time.time() - snapshot.probed_at < ttl and snapshot.fingerprint == _fingerprint(root)
+
+
+def probe_environment(
+    root: Path | None = None,
+    ttl: float = DEFAULT_TTL,
+    refresh: bool = False,
+) -> EnvironmentSnapshot:
+    """Return the environment snapshot for `root` (defaults to LOCALAPPDATA), probing at most once per TTL."""
+    root = root if root is not None else _default_root()
+    key = root.as_posix() if root else ""
+
+    if not refresh:
+        memo = _memo.get(key)
+        # Long-lived processes (the daemon) must notice installs just like a fresh CLI run.
+        if memo and _is_fresh(memo, root, ttl):
+            return memo
+        stored = load_state(CACHE_NAME).get(key)
+        try:
+            cached = EnvironmentSnapshot(**stored) if isinstance(stored, dict) else None
+        except TypeError:
+            cached = None
+        if cached and _is_fresh(cached, root, ttl):
+            _memo[key] = cached
+            return cached
+
+    snapshot = _probe(root)
+    _remember(key, snapshot)
+    return snapshot
+
+
+def _remember(key: str, snapshot: EnvironmentSnapshot) -> None:
+    _memo[key] = snapshot
+    state = load_state(CACHE_NAME)
+    state[key] = asdict(snapshot)
+    store_state(CACHE_NAME, state)
+
+
+def refresh_terminal_installs(root: Path | None = None) -> EnvironmentSnapshot:
+    """Re-stat only the Windows Terminal candidates, leaving the tool and WSL probes cached."""
+    root = root if root is not None else _default_root()
+    snapshot = probe_environment(root)
+    installs = _terminal_installs(root)
+    if installs != snapshot.terminal_installs:
+        snapshot.terminal_installs = installs
+        _remember(root.as_posix() if root else "", snapshot)
+    return snapshot
+
+
+def invalidate_probe() -> None:
+    _memo.clear()
+    store_state(CACHE_NAME, {})
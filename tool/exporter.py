@@ -10,25 +10,31 @@ from hashlib import sha256
 from pathlib import Path
 from typing import Any
 
-from rich.console import Console
-
+from .canonical import canonical_digest, canonical_file_digest
+from .console import console
+from .library import dehydrate, library_for
+from .patches import read_head, record_export, record_head
+from .reporting import record, reporting_stage
+from .schema import validate_document
+from .tracing import traced
 from .validators import ensure_directory, resolve_windows_terminal_path
 
-console = Console()
-
 
 @dataclass
 class ExportResult:
     source: Path
     destination: Path
     checksum: str
+    canonical_checksum: str | None = None
 
 
 ASSETS_DIR = Path("artifacts/assets")
 ARTIFACTS_DIR = Path("artifacts")
 MANIFEST_PATH = ARTIFACTS_DIR / "manifest.json"
+SETTINGS_PATH = ARTIFACTS_DIR / "settings.json"
 
 
+@traced()
 def _load_settings(path: Path) -> dict[str, Any]:
     with path.open("r", encoding="utf-8") as fp:
         data = json.load(fp)
@@ -38,11 +44,14 @@ def _load_settings(path: Path) -> dict[str, Any]:
 
 
 def _write_settings(data: dict[str, Any], destination: Path) -> None:
-    with destination.open("w", encoding="utf-8") as fp:
+    partial = destination.with_name(destination.name + ".part")
+    with partial.open("w", encoding="utf-8") as fp:
         json.dump(data, fp, indent=2)
         fp.write("\n")
+    partial.replace(destination)
 
 
+@traced()
 def _hash_file(path: Path) -> str:
     digest = sha256()
     with path.open("rb") as fp:
@@ -51,6 +60,13 @@ def _hash_file(path: Path) -> str:
     return digest.hexdigest()
 
 
+def _canonical_matches(path: Path, digest: str) -> bool:
+    try:
+        return path.exists() and canonical_file_digest(path) == digest
+    except ValueError:
+        return False
+
+
 def sanitize_settings(data: dict[str, Any]) -> dict[str, Any]:
     profile_list = data.get("profiles", {}).get("list", [])
     if not isinstance(profile_list, list):
@@ -70,6 +86,7 @@ def sanitize_settings(data: dict[str, Any]) -> dict[str, Any]:
     return data
 
 
+@traced()
 def copy_assets(settings: dict[str, Any]) -> list[Path]:
     ensure_directory(ASSETS_DIR)
     copied: list[Path] = []
@@ -87,6 +104,7 @@ def copy_assets(settings: dict[str, Any]) -> list[Path]:
                 shutil.copy2(icon_path, destination)
                 profile["icon"] = f"artifacts/assets/{icon_path.name}"
                 copied.append(destination)
+                record("assets copied", icon_path.name)
     return copied
 
 
@@ -104,18 +122,20 @@ def update_manifest(entry: ExportResult) -> None:
         if isinstance(loaded, dict):
             manifest_data.update(loaded)
 
+    artifact = {
+        "name": "Windows Terminal settings",
+        "path": entry.destination.as_posix(),
+        "sha256": entry.checksum,
+    }
+    if entry.canonical_checksum:
+        artifact["canonical_sha256"] = entry.canonical_checksum
+    current = manifest_data.get("artifacts", [])
+    if artifact in current:
+        return
     artifacts = [
-        item
-        for item in manifest_data.get("artifacts", [])
-        if isinstance(item, dict) and item.get("path") != entry.destination.as_posix()
+        item for item in current if isinstance(item, dict) and item.get("path") != entry.destination.as_posix()
     ]
-    artifacts.append(
-        {
-            "name": "Windows Terminal settings",
-            "path": entry.destination.as_posix(),
-            "sha256": entry.checksum,
-        }
-    )
+    artifacts.append(artifact)
     manifest_data["artifacts"] = artifacts
 
     with MANIFEST_PATH.open("w", encoding="utf-8") as fp:
@@ -123,19 +143,45 @@ def update_manifest(entry: ExportResult) -> None:
         fp.write("\n")
 
 
-def export_windows_terminal_settings(destination: Path | None = None) -> ExportResult:
-    destination = destination or ARTIFACTS_DIR / "settings.json"
+@traced()
+def export_windows_terminal_settings(destination: Path | None = None, library: bool = False) -> ExportResult:
+    destination = destination or SETTINGS_PATH
     ensure_directory(destination.parent)
 
     source = resolve_windows_terminal_path()
     console.print(f"[cyan]Reading Windows Terminal settings from[/cyan] {source}")
     data = sanitize_settings(_load_settings(source))
-    assets = copy_assets(data)
-    if assets:
-        console.print(f"[cyan]Copied assets:[/cyan] {[asset.name for asset in assets]}")
-    _write_settings(data, destination)
-
-    checksum = _hash_file(destination)
-    update_manifest(ExportResult(source=source, destination=destination, checksum=checksum))
-    console.print(f"[green]Exported settings[/green] → {destination} (sha256={checksum})")
-    return ExportResult(source=source, destination=destination, checksum=checksum)
+    for violation in validate_document(data, "settings"):
+        console.print(f"[yellow]Schema warning[/yellow] {violation}")
+    with reporting_stage("export"):
+        copy_assets(data)
+    if library:
+        store = library_for(destination)
+        data = dehydrate(data, store)
+        console.print(f"[cyan]Schemes, themes and defaults stored in[/cyan] {store.root}")
+    result = store_settings(data, destination, source)
+    console.print(f"[green]Exported settings[/green] → {destination} (sha256={result.checksum})")
+    return result
+
+
+def store_settings(data: dict[str, Any], destination: Path, source: Path) -> ExportResult:
+    """Write an exported snapshot, recording its patch and manifest entry; shared with `merge`."""
+    canonical = canonical_digest(data)
+    if _canonical_matches(destination, canonical):
+        # Same document modulo key order and whitespace: keep the bytes so nothing downstream churns.
+        console.print(f"[green]Settings unchanged[/green] → {destination} (canonical sha256={canonical})")
+        if read_head(destination) is None:
+            record_head(destination, data)
+    else:
+        record_export(destination, data)
+        _write_settings(data, destination)
+        record_head(destination, data)
+
+    result = ExportResult(
+        source=source,
+        destination=destination,
+        checksum=_hash_file(destination),
+        canonical_checksum=canonical,
+    )
+    update_manifest(result)
+    return result
@@ -0,0 +1,242 @@
+"""Long-running git `filter-process` driver that runs the sanitizer rules when files are staged."""
+
+from __future__ import annotations
+
+import tempfile
+from collections.abc import Iterator
+from dataclasses import dataclass
+from hashlib import sha1
+from pathlib import Path
+from typing import IO
+
+from .cache import cache_dir
+from .sanitizer import rules_fingerprint, scrub_text
+from .tracing import span
+
+PKT_MAX_DATA = 65516
+# Every pkt-line starts with four hex digits giving its length, header included.
+PKT_HEADER_SIZE = 4
+FLUSH = b"0000"
+CHUNK_SIZE = 64 * 1024
+# Blobs larger than this spool to a temporary file instead of memory.
+SPOOL_LIMIT = 1024 * 1024
+CAPABILITIES = ("clean", "smudge")
+
+
+class GitFilterError(RuntimeError):
+    """Raised when git speaks the filter protocol in a way the driver does not understand."""
+
+
+class PacketReader:
+    def __init__(self, stream: IO[bytes]) -> None:
+        self._stream = stream
+
+    def _read_exact(self, size: int) -> bytes:
+        data = self._stream.read(size)
+        while data and len(data) < size:
+            more = self._stream.read(size - len(data))
+            if not more:
+                break
+            data += more
+        return data
+
+    def read(self) -> bytes | None:
+        """Return the next packet's payload, or None for a flush packet. Raises EOFError when git hangs up."""
+        header = self._read_exact(PKT_HEADER_SIZE)
+        if not header:
+            raise EOFError
+        try:
+            length = int(header, 16)
+        except ValueError as exc:
+            raise GitFilterError(f"Malformed pkt-line header {header!r}") from exc
+        if length == 0:
+            return None
+        if length <= PKT_HEADER_SIZE:
+            raise GitFilterError(f"Unsupported pkt-line length {length}")
+        payload = self._read_exact(length - PKT_HEADER_SIZE)
+        if len(payload) != length - PKT_HEADER_SIZE:
+            raise GitFilterError("Truncated pkt-line")
+        return payload
+
+    def lines(self) -> list[str]:
+        """Read text packets up to the next flush."""
+        lines = []
+        while (packet := self.read()) is not None:
+            lines.append(packet.decode("utf-8").rstrip("\n"))
+        return lines
+
+    def content(self) -> Iterator[bytes]:
+        while (packet := self.read()) is not None:
+            yield packet
+
+
+class PacketWriter:
+    """Writes pkt-lines, coalescing content into maximum-size packets."""
+
+    def __init__(self, stream: IO[bytes]) -> None:
+        self._stream = stream
+        self._pending = bytearray()
+
+    def packet(self, payload: bytes) -> None:
+        self._stream.write(b"%04x" % (len(payload) + PKT_HEADER_SIZE))
+        self._stream.write(payload)
+
+    def flush(self) -> None:
+        self._stream.write(FLUSH)
+        self._stream.flush()
+
+    def lines(self, *lines: str) -> None:
+        for line in lines:
+            self.packet(line.encode("utf-8") + b"\n")
+        self.flush()
+
+    def data(self, chunk: bytes) -> None:
+        self._pending += chunk
+        while len(self._pending) >= PKT_MAX_DATA:
+            self.packet(bytes(self._pending[:PKT_MAX_DATA]))
+            del self._pending[:PKT_MAX_DATA]
+
+    def end_data(self) -> None:
+        if self._pending:
+            self.packet(bytes(self._pending))
+            self._pending.clear()
+        self.flush()
+
+    def abort_data(self) -> None:
+        self._pending.clear()
+        self.flush()
+
+
+def handshake(reader: PacketReader, writer: PacketWriter) -> set[str]:
+    """Negotiate protocol version 2 and return the capabilities both sides support."""
+    welcome = reader.lines()
+    if welcome[:1] != ["git-filter-client"] or "version=2" not in welcome[1:]:
+        raise GitFilterError(f"Unexpected filter handshake: {welcome}")
+    writer.lines("git-filter-server", "version=2")
+    offered = {line.split("=", 1)[1] for line in reader.lines() if line.startswith("capability=")}
+    supported = [capability for capability in CAPABILITIES if capability in offered]
+    writer.lines(*(f"capability={capability}" for capability in supported))
+    return set(supported)
+
+
+def blob_id(stream: IO[bytes], size: int) -> str:
+    """The object id git gives the content (SHA-1 object format), leaving `stream` rewound."""
+    digest = sha1(b"blob %d\0" % size)
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def scrub_bytes(raw: bytes) -> bytes:
+    """Sanitize a batch of whole raw lines; bytes that are not UTF-8 pass through untouched."""
+    return scrub_text(raw.decode("utf-8", "surrogateescape")).encode("utf-8", "surrogateescape")
+
+
+@dataclass
+class FilterStats:
+    cleaned: int = 0
+    cached: int = 0
+    passed: int = 0
+    failed: int = 0
+
+
+class SanitizingFilter:
+    """Serves clean/smudge requests; clean results are cached per blob id and rule set."""
+
+    def __init__(self, cache_root: Path | None = None) -> None:
+        root = cache_root or cache_dir() / "git-filter"
+        self.cache_root = root / rules_fingerprint()[:16]
+        self.stats = FilterStats()
+
+    def _cached(self, oid: str) -> tuple[Path, Path]:
+        # `<oid>` holds the sanitized bytes; an empty `<oid>.same` marks blobs the rules leave unchanged.
+        base = self.cache_root / oid[:2] / oid[2:]
+        return base, base.with_name(base.name + ".same")
+
+    def handle(self, headers: dict[str, str], reader: PacketReader, writer: PacketWriter) -> None:
+        command = headers.get("command", "")
+        with span(f"git-filter {command}", path=headers.get("pathname", "")):
+            # Git writes the whole blob before reading a reply, so the input must be drained first or
+            # both sides can block on full pipes. Spooling keeps large blobs out of memory.
+            with tempfile.SpooledTemporaryFile(max_size=SPOOL_LIMIT) as spool:
+                size = 0
+                for packet in reader.content():
+                    spool.write(packet)
+                    size += len(packet)
+                if command == "clean":
+                    self._clean(spool, size, headers.get("blob"), writer)
+                elif command == "smudge":
+                    self._send(spool, writer)
+                    self.stats.passed += 1
+                else:
+                    self.stats.failed += 1
+                    writer.lines("status=error")
+
+    def _send(self, stream: IO[bytes], writer: PacketWriter) -> None:
+        stream.seek(0)
+        writer.lines("status=success")
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            writer.data(chunk)
+        writer.end_data()
+        writer.flush()
+
+    def _clean(self, spool: IO[bytes], size: int, oid: str | None, writer: PacketWriter) -> None:
+        oid = oid or blob_id(spool, size)
+        cached, same = self._cached(oid)
+        if same.exists():
+            self.stats.cached += 1
+            self._send(spool, writer)
+            return
+        if cached.exists():
+            self.stats.cached += 1
+            with cached.open("rb") as fp:
+                self._send(fp, writer)
+            return
+
+        spool.seek(0)
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        partial = cached.with_name(cached.name + ".part")
+        writer.lines("status=success")
+        changed = False
+        try:
+            with partial.open("wb") as out:
+                # Whole lines, up to SPOOL_LIMIT bytes at a time: the entire blob for any real dotfile.
+                for lines in iter(lambda: spool.readlines(SPOOL_LIMIT), []):
+                    raw = b"".join(lines)
+                    scrubbed = scrub_bytes(raw)
+                    changed = changed or scrubbed != raw
+                    writer.data(scrubbed)
+                    out.write(scrubbed)
+        except OSError:
+            # Content was already streamed; an empty list plus status=error tells git to discard it.
+            partial.unlink(missing_ok=True)
+            self.stats.failed += 1
+            writer.abort_data()
+            writer.lines("status=error")
+            return
+        writer.end_data()
+        writer.flush()
+        self.stats.cleaned += 1
+        if changed:
+            partial.replace(cached)
+        else:
+            partial.unlink()
+            same.touch()
+
+
+def run_filter_process(
+    stdin: IO[bytes], stdout: IO[bytes], cache_root: Path | None = None
+) -> FilterStats:
+    """Serve git until it closes the pipe. Nothing but protocol traffic may reach `stdout`."""
+    reader, writer = PacketReader(stdin), PacketWriter(stdout)
+    handshake(reader, writer)
+    driver = SanitizingFilter(cache_root)
+    while True:
+        try:
+            lines = reader.lines()
+        except EOFError:
+            return driver.stats
+        headers = dict(line.split("=", 1) for line in lines if "=" in line)
+        driver.handle(headers, reader, writer)
@@ -0,0 +1,211 @@
+"""Persistent git session that batches object reads and parses porcelain output."""
+
+from __future__ import annotations
+
+import subprocess
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import TracebackType
+from typing import IO
+
+from .console import console
+from .tracing import span
+
+
+class GitSessionError(RuntimeError):
+    """Raised when a git command issued by the session fails."""
+
+
+@dataclass
+class StatusEntry:
+    kind: str
+    path: str
+    index: str = "."
+    worktree: str = "."
+    original_path: str | None = None
+
+    @property
+    def staged(self) -> bool:
+        return self.kind in {"changed", "renamed"} and self.index != "."
+
+    @property
+    def short(self) -> str:
+        if self.kind == "untracked":
+            return f"?? {self.path}"
+        if self.kind == "ignored":
+            return f"!! {self.path}"
+        code = f"{self.index}{self.worktree}".replace(".", " ")
+        if self.original_path:
+            return f"{code} {self.original_path} -> {self.path}"
+        return f"{code} {self.path}"
+
+
+@dataclass
+class RepositoryStatus:
+    head: str | None = None
+    branch: str | None = None
+    upstream: str | None = None
+    ahead: int = 0
+    behind: int = 0
+    entries: list[StatusEntry] = field(default_factory=list)
+
+    @property
+    def clean(self) -> bool:
+        return not self.entries
+
+    @property
+    def has_staged(self) -> bool:
+        return any(entry.staged for entry in self.entries)
+
+
+def parse_status_v2(payload: bytes) -> RepositoryStatus:
+    status = RepositoryStatus()
+    records = iter(payload.decode("utf-8", errors="surrogateescape").split("\0"))
+    for record in records:
+        if not record:
+            continue
+        if record.startswith("# "):
+            key, _, value = record[2:].partition(" ")
+            if key == "branch.oid":
+                status.head = None if value == "(initial)" else value
+            elif key == "branch.head":
+                status.branch = None if value == "(detached)" else value
+            elif key == "branch.upstream":
+                status.upstream = value
+            elif key == "branch.ab":
+                ahead, behind = value.split()
+                status.ahead, status.behind = int(ahead), abs(int(behind))
+            continue
+        tag = record[0]
+        if tag == "1":
+            fields = record.split(" ", 8)
+            status.entries.append(StatusEntry("changed", fields[8], fields[1][0], fields[1][1]))
+        elif tag == "2":
+            fields = record.split(" ", 9)
+            # Renames carry their original path in the following NUL-separated record.
+            status.entries.append(
+                StatusEntry("renamed", fields[9], fields[1][0], fields[1][1], next(records, None))
+            )
+        elif tag == "u":
+            fields = record.split(" ", 10)
+            status.entries.append(StatusEntry("unmerged", fields[10], fields[1][0], fields[1][1]))
+        elif tag == "?":
+            status.entries.append(StatusEntry("untracked", record[2:]))
+        elif tag == "!":
+            status.entries.append(StatusEntry("ignored", record[2:]))
+    return status
+
+
+class GitSession:
+    """Reuse one `git cat-file --batch` process and keep spawns for mutations to one each."""
+
+    def __init__(self, root: Path = Path("."), echo: bool = True) -> None:
+        self.root = root
+        self.echo = echo
+        self.spawns = 0
+        self._batch: subprocess.Popen[bytes] | None = None
+
+    def __enter__(self) -> GitSession:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._batch is None:
+            return
+        if self._batch.stdin:
+            self._batch.stdin.close()
+        self._batch.wait()
+        if self._batch.stdout:
+            self._batch.stdout.close()
+        self._batch = None
+
+    def run(
+        self,
+        args: Sequence[str],
+        input: bytes | None = None,
+        check: bool = True,
+        echo: bool | None = None,
+    ) -> subprocess.CompletedProcess[bytes]:
+        if self.echo if echo is None else echo:
+            console.print(f"[cyan]$ git {' '.join(args)}")
+        self.spawns += 1
+        with span(f"git {args[0]}", argv=" ".join(args)):
+            result = subprocess.run(["git", *args], cwd=self.root, input=input, capture_output=True, check=False)
+        if check and result.returncode != 0:
+            message = result.stderr.decode("utf-8", errors="replace").strip()
+            raise GitSessionError(f"git {' '.join(args)} failed: {message}")
+        return result
+
+    def _batch_process(self) -> subprocess.Popen[bytes]:
+        if self._batch is None:
+            self.spawns += 1
+            with span("git cat-file --batch (spawn)"):
+                self._batch = subprocess.Popen(
+                    ["git", "cat-file", "--batch"],
+                    cwd=self.root,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                )
+        return self._batch
+
+    def read_object(self, spec: str) -> bytes | None:
+        """Return the contents of `spec` (e.g. `v1.0.0:artifacts/manifest.json`) or None if missing."""
+        process = self._batch_process()
+        stdin: IO[bytes] = process.stdin  # type: ignore[assignment]
+        stdout: IO[bytes] = process.stdout  # type: ignore[assignment]
+        stdin.write(spec.encode("utf-8") + b"\n")
+        stdin.flush()
+        header = stdout.readline().decode("utf-8").rstrip("\n")
+        if not header or header.endswith(" missing") or header.endswith(" ambiguous"):
+            return None
+        size = int(header.rsplit(" ", 1)[1])
+        data = stdout.read(size)
+        stdout.read(1)
+        return data
+
+    def status(self, paths: Iterable[str] = (), untracked: bool = True) -> RepositoryStatus:
+        args = ["status", "--porcelain=v2", "-z", "--branch"]
+        args.append("--untracked-files=all" if untracked else "--untracked-files=no")
+        pathspec = list(paths)
+        if pathspec:
+            args.extend(["--", *pathspec])
+        return parse_status_v2(self.run(args, echo=False).stdout)
+
+    def stage(self, paths: Iterable[str]) -> list[str]:
+        """Stage `paths`, including deletions of tracked files; returns the paths staged."""
+        # `git add` fails on a pathspec that matches nothing, so a missing path is kept only
+        # while the index still has it (`:path` reads the index entry through the batch process).
+        selected = sorted(
+            {path for path in paths if (self.root / path).exists() or self.read_object(f":{path}") is not None}
+        )
+        if selected:
+            self.run(
+                ["add", "-A", "--pathspec-from-file=-", "--pathspec-file-nul"],
+                input="\0".join(selected).encode("utf-8"),
+            )
+        return selected
+
+    def commit(self, message: str, paths: Sequence[str] | None = None) -> None:
+        """Commit the index, or with `paths` only those paths, leaving other staged changes alone."""
+        if paths is None:
+            self.run(["commit", "-m", message])
+            return
+        self.run(
+            ["commit", "-m", message, "--only", "--pathspec-from-file=-", "--pathspec-file-nul"],
+            input="\0".join(paths).encode("utf-8"),
+        )
+
+    def tag(self, name: str, force: bool = True) -> None:
+        self.run(["tag", "-f", name] if force else ["tag", name])
+
+    def push(self, remote: str, refs: Sequence[str]) -> None:
+        self.run(["push", remote, *refs])
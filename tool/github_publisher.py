@@ -3,13 +3,30 @@
 from __future__ import annotations
 
 import json
-import subprocess
 from dataclasses import dataclass
 from pathlib import Path
 
-from rich.console import Console
-
-console = Console()
+from .archive import build_tar_xz, build_zip, collect_members
+from .console import console
+from .delta import build_delta
+from .git_session import GitSession
+from .library import INDEX_NAME, LIBRARY_DIR, library_files, library_for, library_members
+from .patches import patch_dir_for
+from .scanner import ensure_clean
+from .tracing import traced
+
+MANIFEST_PATH = Path("artifacts/manifest.json")
+SETTINGS_PATH = Path("artifacts/settings.json")
+RELEASE_INPUTS = (
+    Path("artifacts"),
+    Path("docs"),
+    Path("tool"),
+    Path("scripts"),
+    Path("pyproject.toml"),
+    Path("requirements.txt"),
+    Path("README.md"),
+    Path("LICENSE"),
+)
 
 
 @dataclass
@@ -18,59 +35,100 @@ class GitConfig:
     branch: str = "main"
 
 
-class GitError(RuntimeError):
-    """Raised when Git interaction fails."""
+@dataclass(frozen=True)
+class ReleaseOptions:
+    push_changes: bool = False
+    offline: bool = False
+    tar_xz: bool = False
+    delta_from: str | None = None
+    scan: bool = False
 
 
-def _run_git(args: list[str], check: bool = True) -> subprocess.CompletedProcess[str]:
-    console.print(f"[cyan]$ git {' '.join(args)}")
-    return subprocess.run(["git", *args], check=check, text=True)
+class GitError(RuntimeError):
+    """Raised when Git interaction fails."""
 
 
-def initialize_repository(config: GitConfig = GitConfig()) -> None:
+def release_paths(manifest: Path = MANIFEST_PATH, settings: Path = SETTINGS_PATH) -> list[str]:
+    """Paths publish is allowed to stage: the manifest and every artifact it tracks.
+
+    The library index and the objects the exported settings reference ride along, so a tagged
+    checkout can materialize its settings, and so does the patch directory, so apply can
+    fast-forward from it.
+    """
+    paths = [manifest.as_posix()]
+    if manifest.exists():
+        with manifest.open("r", encoding="utf-8") as fp:
+            data = json.load(fp)
+        paths.extend(
+            item["path"]
+            for item in data.get("artifacts", [])
+            if isinstance(item, dict) and isinstance(item.get("path"), str)
+        )
+    objects = library_files([settings])
+    if objects:
+        paths.append((library_for(settings).root / INDEX_NAME).as_posix())
+        paths.extend(path.as_posix() for path in objects)
+    patches = patch_dir_for(settings)
+    if patches.is_dir():
+        # Staged as a directory so patches pruned from the chain are deleted in the commit too.
+        paths.append(patches.as_posix())
+    return paths
+
+
+def initialize_repository(
+    config: GitConfig = GitConfig(),
+    check_remote: bool = True,
+    session: GitSession | None = None,
+) -> None:
+    session = session or GitSession()
     if Path(".git").exists():
         console.print("[green]Git repository already initialized[/green]")
     else:
-        _run_git(["init", "-b", config.branch])
-    _run_git(["remote", "show", config.remote], check=False)
-
-
-def stage_and_commit(message: str = "chore: update portable profile") -> None:
-    _run_git(["add", "."])
-    status = subprocess.run(["git", "status", "--short"], check=False, capture_output=True, text=True)
-    if not status.stdout.strip():
+        session.run(["init", "-b", config.branch])
+    if check_remote:
+        session.run(["remote", "show", config.remote], check=False)
+
+
+def stage_and_commit(
+    message: str = "chore: update portable profile",
+    session: GitSession | None = None,
+) -> None:
+    session = session or GitSession()
+    staged = session.stage(release_paths())
+    # Without a pathspec, status would report the whole tree, including unrelated staged edits.
+    if not staged or not session.status(staged, untracked=False).has_staged:
         console.print("[yellow]Nothing to commit[/yellow]")
         return
-    _run_git(["commit", "-m", message])
+    session.commit(message, staged)
 
 
-def tag_release(version: str) -> None:
-    _run_git(["tag", "-f", version])
+def tag_release(version: str, session: GitSession | None = None) -> None:
+    (session or GitSession()).tag(version)
 
 
-def push(config: GitConfig = GitConfig(), tags: bool = True) -> None:
-    args = ["push", config.remote, config.branch]
-    _run_git(args)
-    if tags:
-        _run_git(["push", config.remote, "--tags"])
+def push(config: GitConfig = GitConfig(), tags: bool = True, session: GitSession | None = None) -> None:
+    refs = [config.branch, "--tags"] if tags else [config.branch]
+    (session or GitSession()).push(config.remote, refs)
 
 
-def build_release_manifest(output: Path = Path("release")) -> Path:
-    output.mkdir(parents=True, exist_ok=True)
+@traced()
+def build_release_manifest(
+    output: Path = Path("release"),
+    include_vendor: bool = False,
+    tar_xz: bool = False,
+) -> Path:
+    inputs = [*RELEASE_INPUTS, Path("vendor")] if include_vendor else list(RELEASE_INPUTS)
+    # The library accumulates objects from every export; ship only those this release references.
+    library_prefix = LIBRARY_DIR.as_posix() + "/"
+    members = [member for member in collect_members(inputs) if not member.arcname.startswith(library_prefix)]
+    members.extend(library_members([SETTINGS_PATH]))
+    members.sort(key=lambda member: member.arcname)
     archive = output / "portable-profile.zip"
-    console.print(f"[cyan]Creating release archive at[/cyan] {archive}")
-    subprocess.run(
-        [
-            "powershell",
-            "-Command",
-            (
-                "Compress-Archive -Path artifacts,docs,tool,scripts,pyproject.toml,requirements.txt,"
-                "README.md,LICENSE -DestinationPath release/portable-profile.zip -Force"
-            ),
-        ],
-        check=True,
-        text=True,
-    )
+    console.print(f"[cyan]Creating release archive at[/cyan] {archive} ({len(members)} files)")
+    build_zip(members, archive)
+    if tar_xz:
+        tarball = build_tar_xz(members, output / "portable-profile.tar.xz")
+        console.print(f"[cyan]Created tarball[/cyan] {tarball}")
     return archive
 
 
@@ -86,14 +144,23 @@ def create_release_json(version: str, archive: Path) -> Path:
     return json_path
 
 
-def publish(version: str, push_changes: bool = False) -> None:
-    initialize_repository()
-    stage_and_commit(f"chore: release {version}")
-    tag_release(version)
-    archive = build_release_manifest()
-    create_release_json(version, archive)
-    if push_changes:
-        push()
-        console.print("[green]Changes pushed to remote. Create GitHub release manually or via workflow.[/green]")
-    else:
-        console.print("[yellow]Push disabled. Upload archive and JSON manually or via workflow.[/yellow]")
+@traced()
+def publish(version: str, options: ReleaseOptions = ReleaseOptions()) -> None:
+    if options.scan:
+        # Runs before anything is staged or tagged, so a finding leaves the repository untouched.
+        ensure_clean()
+    with GitSession() as session:
+        initialize_repository(check_remote=not options.offline, session=session)
+        stage_and_commit(f"chore: release {version}", session=session)
+        tag_release(version, session=session)
+        archive = build_release_manifest(include_vendor=options.offline, tar_xz=options.tar_xz)
+        create_release_json(version, archive)
+        if options.delta_from:
+            build_delta(options.delta_from, version, session=session)
+        if options.offline:
+            console.print("[yellow]Offline build: vendor cache bundled, push skipped.[/yellow]")
+        elif options.push_changes:
+            push(session=session)
+            console.print("[green]Changes pushed to remote. Create GitHub release manually or via workflow.[/green]")
+        else:
+            console.print("[yellow]Push disabled. Upload archive and JSON manually or via workflow.[/yellow]")
@@ -3,29 +3,35 @@
 from __future__ import annotations
 
 import platform
-import shutil
 import subprocess
 from collections.abc import Sequence
 from pathlib import Path
 
-from rich.console import Console
+from .console import console
+from .downloads import DownloadError, extract_members, font_selector, load_font_faces
+from .environment import invalidate_probe, probe_environment
+from .library import LibraryError
+from .tracing import span
+from .vendor_cache import FONT_SOURCES, clone_command, font_cache, font_checksum
 
-console = Console()
-
-NERD_FONT_URL = "https://github.com/ryanoasis/nerd-fonts/releases/download/v3.1.1/CascadiaCode.zip"
+NERD_FONT = FONT_SOURCES[0]
 FONT_NAME = "Cascadia Code"  # sanitized base font
+DEFAULT_FONT_FACE = "CaskaydiaCove NF"
+PORTABLE_SETTINGS = Path("artifacts/settings.json")
 
 
 def _run(command: Sequence[str], check: bool = True) -> subprocess.CompletedProcess[str]:
     console.print(f"[cyan]$ {' '.join(command)}")
-    return subprocess.run(command, check=check, text=True)
+    with span("subprocess", argv=" ".join(command)):
+        return subprocess.run(command, check=check, text=True)
 
 
 def install_windows_terminal() -> None:
-    if shutil.which("wt.exe"):
+    tools = probe_environment().tools
+    if tools.get("wt.exe"):
         console.print("[green]Windows Terminal already installed[/green]")
         return
-    if shutil.which("winget"):
+    if tools.get("winget"):
         _run(
             [
                 "winget",
@@ -39,6 +45,7 @@ def install_windows_terminal() -> None:
                 "--accept-source-agreements",
             ]
         )
+        invalidate_probe()
     else:
         console.print(
             "[red]winget not available[/red]. Please install Windows Terminal from the Microsoft Store.",
@@ -49,59 +56,71 @@ def install_wsl(distro: str = "Ubuntu-22.04") -> None:
     if platform.system().lower() != "windows":
         console.print("[yellow]Skipping WSL install on non-Windows host[/yellow]")
         return
-    status = subprocess.run(["wsl.exe", "--status"], check=False, capture_output=True, text=True)
-    if status.returncode == 0:
+    if probe_environment().wsl_available:
         console.print("[green]WSL already installed[/green]")
         return
     _run(["wsl.exe", "--install", "-d", distro])
+    invalidate_probe()
 
 
-def install_oh_my_zsh(target_dir: Path) -> None:
+def install_oh_my_zsh(target_dir: Path, offline: bool = False) -> None:
     if target_dir.exists():
         console.print("[green]Oh My Zsh already vendored[/green]")
         return
     target_dir.parent.mkdir(parents=True, exist_ok=True)
-    _run(
-        [
-            "git",
-            "clone",
-            "https://github.com/ohmyzsh/ohmyzsh",
-            str(target_dir),
-            "--depth",
-            "1",
-        ]
-    )
-
-
-def install_plugin(name: str, repo: str, destination: Path) -> None:
+    _run(clone_command("oh-my-zsh", "https://github.com/ohmyzsh/ohmyzsh", target_dir, offline=offline))
+
+
+def install_plugin(name: str, repo: str, destination: Path, offline: bool = False) -> None:
     if (destination / name).exists():
         console.print(f"[green]{name} already present[/green]")
         return
     destination.mkdir(parents=True, exist_ok=True)
-    _run(["git", "clone", repo, str(destination / name), "--depth", "1"])
-
-
-def install_font() -> None:
-    if platform.system().lower() != "windows":
-        console.print("[yellow]Skipping font install on non-Windows host[/yellow]")
-        return
-    fonts_dir = Path.home() / "AppData" / "Local" / "Microsoft" / "Windows" / "Fonts"
-    fonts_dir.mkdir(parents=True, exist_ok=True)
-    tmp_zip = Path("./fonts.zip")
-    _run(["powershell", "-Command", f"Invoke-WebRequest -Uri {NERD_FONT_URL} -OutFile {tmp_zip}"])
-    _run(["powershell", "-Command", f"Expand-Archive -LiteralPath {tmp_zip} -DestinationPath {fonts_dir}"], check=False)
-    tmp_zip.unlink(missing_ok=True)
-    console.print(f"[green]Installed {FONT_NAME} Nerd Font[/green]")
-
-
-def install_prerequisites(non_interactive: bool = False, include_wsl: bool = True) -> None:
-    install_windows_terminal()
-    if include_wsl:
-        install_wsl()
+    _run(clone_command(name, repo, destination / name, offline=offline))
+
+
+def install_font(offline: bool = False, fonts_dir: Path | None = None) -> None:
+    if fonts_dir is None:
+        if platform.system().lower() != "windows":
+            console.print("[yellow]Skipping font install on non-Windows host[/yellow]")
+            return
+        fonts_dir = Path.home() / "AppData" / "Local" / "Microsoft" / "Windows" / "Fonts"
+    # Raises VendorCacheError when no digest is known: an unverified font is an error, not a skip.
+    checksum = font_checksum(NERD_FONT, offline=offline)
+    cache = font_cache()
+    if offline:
+        archive = cache.lookup(NERD_FONT.url, checksum)
+        if archive is None:
+            console.print("[red]Font archive not cached[/red]; run `omniforge cache sync` first")
+            return
+    else:
+        try:
+            archive = cache.fetch(NERD_FONT.url, checksum)
+        except DownloadError as exc:
+            console.print(f"[red]Font download failed:[/red] {exc}")
+            return
+    try:
+        faces = load_font_faces(PORTABLE_SETTINGS) or {DEFAULT_FONT_FACE}
+    except LibraryError as exc:
+        console.print(f"[yellow]Cannot read font faces from {PORTABLE_SETTINGS}[/yellow] ({exc}); installing {DEFAULT_FONT_FACE}")
+        faces = {DEFAULT_FONT_FACE}
+    installed = extract_members(archive, fonts_dir, font_selector(faces))
+    console.print(f"[green]Installed {FONT_NAME} Nerd Font[/green] ({len(installed)} new files for {sorted(faces)})")
+
+
+def install_prerequisites(
+    non_interactive: bool = False,
+    include_wsl: bool = True,
+    offline: bool = False,
+) -> None:
+    if not offline:
+        install_windows_terminal()
+        if include_wsl:
+            install_wsl()
     vendor_dir = Path("vendor")
-    install_oh_my_zsh(vendor_dir / "oh-my-zsh")
-    install_plugin("zsh-syntax-highlighting", "https://github.com/zsh-users/zsh-syntax-highlighting", vendor_dir / "plugins")
-    install_plugin("zsh-autosuggestions", "https://github.com/zsh-users/zsh-autosuggestions", vendor_dir / "plugins")
-    install_font()
+    install_oh_my_zsh(vendor_dir / "oh-my-zsh", offline=offline)
+    install_plugin("zsh-syntax-highlighting", "https://github.com/zsh-users/zsh-syntax-highlighting", vendor_dir / "plugins", offline=offline)
+    install_plugin("zsh-autosuggestions", "https://github.com/zsh-users/zsh-autosuggestions", vendor_dir / "plugins", offline=offline)
+    install_font(offline=offline)
     if not non_interactive:
         console.print("[green]Prerequisites installed. You can now run export and sanitize steps.[/green]")
@@ -0,0 +1,203 @@
+"""Content-addressed store for color schemes, themes and profile defaults shared across exports."""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Iterable
+from hashlib import sha256
+from pathlib import Path
+from typing import Any
+
+from .archive import ArchiveMember
+from .canonical import canonical_bytes
+
+LIBRARY_DIR = Path("artifacts/library")
+INDEX_NAME = "index.json"
+REF_KEY = "$library"
+# Top-level list sections whose entries are stored as library objects, keyed by their `name`.
+NAMED_SECTIONS = {"schemes": "scheme", "themes": "theme"}
+
+
+class LibraryError(RuntimeError):
+    """Raised when a library object is missing or does not match its hash."""
+
+
+def _is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and isinstance(value.get(REF_KEY), str)
+
+
+class Library:
+    """Objects live at `objects/<2>/<62>.json`; nested objects are stored once and shared by hash."""
+
+    def __init__(self, root: Path = LIBRARY_DIR) -> None:
+        self.root = root
+        self._index: dict[str, Any] | None = None
+        self._loaded: dict[str, dict[str, Any]] = {}
+        self._dirty = False
+
+    @property
+    def index(self) -> dict[str, Any]:
+        if self._index is None:
+            try:
+                with (self.root / INDEX_NAME).open("r", encoding="utf-8") as fp:
+                    self._index = json.load(fp)
+            except (OSError, ValueError):
+                self._index = {"objects": {}, "names": {}}
+        return self._index
+
+    def object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest[2:]}.json"
+
+    def put(self, value: dict[str, Any], kind: str = "node") -> str:
+        """Store `value`, replacing nested objects with references, and return its hash."""
+        refs: list[str] = []
+        stored: dict[str, Any] = {}
+        for key, child in value.items():
+            if isinstance(child, dict) and child and not _is_ref(child):
+                child_digest = self.put(child)
+                refs.append(child_digest)
+                stored[key] = {REF_KEY: child_digest}
+            else:
+                stored[key] = child
+        payload = canonical_bytes(stored)
+        digest = sha256(payload).hexdigest()
+
+        path = self.object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            partial = path.with_name(path.name + ".part")
+            partial.write_bytes(payload)
+            partial.replace(path)
+        objects = self.index["objects"]
+        if digest not in objects:
+            objects[digest] = {"kind": kind, "refs": sorted(set(refs))}
+            name = value.get("name")
+            if kind != "node" and isinstance(name, str):
+                self.index["names"].setdefault(kind, {}).setdefault(name, []).append(digest)
+            self._dirty = True
+        self._loaded[digest] = stored
+        return digest
+
+    def get(self, digest: str) -> dict[str, Any]:
+        """Return the stored object (nested references left in place)."""
+        if digest not in self._loaded:
+            try:
+                payload = self.object_path(digest).read_bytes()
+            except OSError as exc:
+                raise LibraryError(f"Library object {digest} not found under {self.root}") from exc
+            value = json.loads(payload) if sha256(payload).hexdigest() == digest else None
+            if not isinstance(value, dict):
+                raise LibraryError(f"Library object {digest} is corrupt")
+            self._loaded[digest] = value
+        return self._loaded[digest]
+
+    def resolve(self, value: Any) -> Any:
+        """Materialize every reference inside `value`."""
+        if _is_ref(value):
+            return self.resolve(self.get(value[REF_KEY]))
+        if isinstance(value, dict):
+            return {key: self.resolve(child) for key, child in value.items()}
+        if isinstance(value, list):
+            return [self.resolve(child) for child in value]
+        return value
+
+    def find(self, kind: str, name: str) -> list[str]:
+        return list(self.index["names"].get(kind, {}).get(name, []))
+
+    def closure(self, digests: Iterable[str]) -> set[str]:
+        """Every object reachable from `digests`, walked through the index without reading objects."""
+        objects = self.index["objects"]
+        seen: set[str] = set()
+        stack = list(digests)
+        while stack:
+            digest = stack.pop()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            entry = objects.get(digest)
+            if entry is None:
+                # Not indexed (e.g. written by a concurrent export); fall back to the object itself.
+                entry = {"refs": [child[REF_KEY] for child in self.get(digest).values() if _is_ref(child)]}
+            stack.extend(entry["refs"])
+        return seen
+
+    def flush(self) -> None:
+        if not self._dirty:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.root / INDEX_NAME
+        partial = path.with_name(path.name + ".part")
+        with partial.open("w", encoding="utf-8") as fp:
+            json.dump(self.index, fp, indent=1, sort_keys=True)
+            fp.write("\n")
+        partial.replace(path)
+        self._dirty = False
+
+
+def dehydrate(settings: dict[str, Any], library: Library) -> dict[str, Any]:
+    """Return a copy of `settings` whose schemes, themes and profile defaults are library references."""
+    result = dict(settings)
+    for section, kind in NAMED_SECTIONS.items():
+        entries = settings.get(section)
+        if not isinstance(entries, list):
+            continue
+        result[section] = [
+            {"name": entry.get("name"), REF_KEY: library.put(entry, kind)}
+            if isinstance(entry, dict) and not _is_ref(entry)
+            else entry
+            for entry in entries
+        ]
+    profiles = settings.get("profiles")
+    if isinstance(profiles, dict) and isinstance(profiles.get("defaults"), dict) and profiles["defaults"]:
+        if not _is_ref(profiles["defaults"]):
+            result["profiles"] = {**profiles, "defaults": {REF_KEY: library.put(profiles["defaults"], "defaults")}}
+    library.flush()
+    return result
+
+
+def references(settings: dict[str, Any]) -> set[str]:
+    found: set[str] = set()
+    for section in NAMED_SECTIONS:
+        entries = settings.get(section)
+        if isinstance(entries, list):
+            found.update(entry[REF_KEY] for entry in entries if _is_ref(entry))
+    profiles = settings.get("profiles")
+    if isinstance(profiles, dict) and _is_ref(profiles.get("defaults")):
+        found.add(profiles["defaults"][REF_KEY])
+    return found
+
+
+def materialize(settings: dict[str, Any], library: Library) -> dict[str, Any]:
+    """Inline every referenced object; settings without references are returned unchanged."""
+    if not references(settings):
+        return settings
+    result = dict(settings)
+    for section in NAMED_SECTIONS:
+        if isinstance(settings.get(section), list):
+            result[section] = [library.resolve(entry) for entry in settings[section]]
+    profiles = settings.get("profiles")
+    if isinstance(profiles, dict) and _is_ref(profiles.get("defaults")):
+        result["profiles"] = {**profiles, "defaults": library.resolve(profiles["defaults"])}
+    return result
+
+
+def library_for(settings_path: Path) -> Library:
+    return Library(settings_path.parent / "library")
+
+
+def library_files(settings_paths: Iterable[Path], library: Library | None = None) -> list[Path]:
+    """Object files for just the objects the given settings files reference."""
+    files: list[Path] = []
+    for settings_path in settings_paths:
+        if not settings_path.exists():
+            continue
+        with settings_path.open("r", encoding="utf-8") as fp:
+            settings = json.load(fp)
+        owner = library or library_for(settings_path)
+        files.extend(owner.object_path(digest) for digest in sorted(owner.closure(references(settings))))
+    return files
+
+
+def library_members(settings_paths: Iterable[Path], library: Library | None = None) -> list[ArchiveMember]:
+    """Archive members for just the objects the given settings files reference."""
+    return [ArchiveMember(path.as_posix(), path=path) for path in library_files(settings_paths, library)]
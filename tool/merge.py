@@ -0,0 +1,259 @@
+"""Key-indexed merge of profiles, color schemes, themes and actions into Windows Terminal settings."""
+
+from __future__ import annotations
+
+import copy
+import json
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .console import console
+from .exporter import SETTINGS_PATH, store_settings
+from .library import dehydrate, library_for, materialize, references
+from .modes import MergePolicy
+from .schema import validate_document
+from .tracing import traced
+
+Entry = dict[str, Any]
+
+
+class MergeError(ValueError):
+    """Raised when a settings document does not have the shape a merge needs."""
+
+
+def _profile_keys(entry: Entry) -> list[str]:
+    # Windows Terminal compares GUIDs case-insensitively. Only the first key is used for lookups,
+    # so a profile with a GUID never merges into a same-named profile that has a different GUID.
+    keys = []
+    if isinstance(entry.get("guid"), str):
+        keys.append("guid:" + entry["guid"].lower())
+    if isinstance(entry.get("name"), str):
+        keys.append("name:" + entry["name"])
+    return keys
+
+
+def _name_key(entry: Entry) -> list[str]:
+    return [entry["name"]] if isinstance(entry.get("name"), str) else []
+
+
+def _action_keys(entry: Entry) -> list[str]:
+    if isinstance(entry.get("id"), str):
+        return ["id:" + entry["id"]]
+    if "keys" in entry:
+        return ["keys:" + json.dumps(entry["keys"], sort_keys=True)]
+    if "command" in entry:
+        return ["command:" + json.dumps(entry["command"], sort_keys=True)]
+    return []
+
+
+@dataclass(frozen=True)
+class Section:
+    name: str
+    path: tuple[str, ...]
+    # Every key indexes a target entry; incoming entries look up by the first key only.
+    keys: Callable[[Entry], list[str]]
+
+
+SECTIONS = (
+    Section("profiles", ("profiles", "list"), _profile_keys),
+    Section("schemes", ("schemes",), _name_key),
+    Section("themes", ("themes",), _name_key),
+    Section("actions", ("actions",), _action_keys),
+    Section("keybindings", ("keybindings",), _action_keys),
+)
+
+
+@dataclass
+class MergeChange:
+    section: str
+    key: str
+    action: str
+    fields: list[str] = field(default_factory=list)
+
+
+@dataclass
+class MergeReport:
+    changes: list[MergeChange] = field(default_factory=list)
+
+    def count(self, action: str) -> int:
+        return sum(1 for change in self.changes if change.action == action)
+
+    @property
+    def changed(self) -> bool:
+        return any(change.action in {"added", "updated", "replaced"} for change in self.changes)
+
+    def summary(self) -> str:
+        parts = [
+            f"{self.count(action)} {action}"
+            for action in ("added", "updated", "replaced", "kept", "unchanged")
+            if self.count(action)
+        ]
+        return ", ".join(parts) or "nothing to merge"
+
+
+def _entries(document: dict[str, Any], section: Section, create: bool) -> list[Any]:
+    node = document
+    for part in section.path[:-1]:
+        child = node.get(part)
+        if child is None:
+            if not create:
+                return []
+            child = node[part] = {}
+        if not isinstance(child, dict):
+            raise MergeError(f"{part} section must be a mapping")
+        node = child
+    leaf = section.path[-1]
+    if leaf not in node:
+        if not create:
+            return []
+        node[leaf] = []
+    entries = node[leaf]
+    if not isinstance(entries, list):
+        raise MergeError(f"{'.'.join(section.path)} must be a list")
+    return entries
+
+
+def _merge_fields(ours: Entry, theirs: Entry, preserve: frozenset[str]) -> Entry:
+    merged = dict(ours)
+    for key, value in theirs.items():
+        if key in preserve and key in ours:
+            continue
+        if isinstance(value, dict) and isinstance(ours.get(key), dict):
+            merged[key] = _merge_fields(ours[key], value, frozenset())
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def _changed_fields(before: Entry, after: Entry) -> list[str]:
+    return sorted(key for key in before.keys() | after.keys() if before.get(key) != after.get(key))
+
+
+@dataclass
+class _IndexedSection:
+    """A target section with every entry key mapped to its position."""
+
+    section: Section
+    entries: list[Any]
+    index: dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, section: Section, entries: list[Any]) -> _IndexedSection:
+        indexed = cls(section, entries)
+        for position, entry in enumerate(entries):
+            if isinstance(entry, dict):
+                indexed.remember(entry, position)
+        return indexed
+
+    def remember(self, entry: Entry, position: int) -> None:
+        for key in self.section.keys(entry):
+            self.index.setdefault(key, position)
+
+    def upsert(self, entry: Any, policy: MergePolicy, kept: frozenset[str]) -> MergeChange:
+        where = ".".join(self.section.path)
+        if not isinstance(entry, dict):
+            raise MergeError(f"{where} entries must be objects")
+        keys = self.section.keys(entry)
+        if not keys:
+            raise MergeError(f"{where} entry has no identifying key: {entry}")
+        label = str(entry.get("name") or keys[0].split(":", 1)[-1])
+        found = self.index.get(keys[0])
+        if found is None:
+            self.entries.append(copy.deepcopy(entry))
+            self.remember(entry, len(self.entries) - 1)
+            return MergeChange(self.section.name, label, "added", sorted(entry))
+
+        current = self.entries[found]
+        if policy == MergePolicy.OURS:
+            merged, action = current, "kept"
+            # Report what the incoming entry would have changed had it won.
+            fields = _changed_fields(current, _merge_fields(current, entry, kept))
+        else:
+            if policy == MergePolicy.THEIRS:
+                merged, action = copy.deepcopy(entry), "replaced"
+            else:
+                merged, action = _merge_fields(current, entry, kept), "updated"
+            fields = _changed_fields(current, merged)
+        self.entries[found] = merged
+        self.remember(merged, found)
+        return MergeChange(self.section.name, label, action if fields else "unchanged", fields)
+
+
+@traced()
+def merge_settings(
+    target: dict[str, Any],
+    incoming: dict[str, Any],
+    policy: MergePolicy = MergePolicy.FIELD,
+    preserve: Iterable[str] = (),
+    sections: Sequence[Section] = SECTIONS,
+) -> MergeReport:
+    """Upsert incoming entries into `target` in place.
+
+    Each target section is indexed once, so merging N entries costs O(N) lookups rather than a
+    scan per entry. `ours` keeps conflicting target entries, `theirs` replaces them, and `field`
+    overlays incoming fields (recursively for nested objects) except those named in `preserve`.
+    """
+    report = MergeReport()
+    kept = frozenset(preserve)
+    for section in sections:
+        additions = _entries(incoming, section, create=False)
+        if not additions:
+            continue
+        indexed = _IndexedSection.build(section, _entries(target, section, create=True))
+        report.changes.extend(indexed.upsert(entry, policy, kept) for entry in additions)
+    return report
+
+
+def _load(path: Path) -> dict[str, Any]:
+    with path.open("r", encoding="utf-8") as fp:
+        data = json.load(fp)
+    if not isinstance(data, dict):
+        raise MergeError(f"Expected a settings object in {path}, got {type(data).__name__}")
+    return data
+
+
+def merge_files(
+    sources: Sequence[Path],
+    target: Path = SETTINGS_PATH,
+    policy: MergePolicy = MergePolicy.FIELD,
+    dry_run: bool = False,
+) -> MergeReport:
+    """Merge team settings fragments into `target`, printing what changed."""
+    settings = _load(target)
+    library = library_for(target) if references(settings) else None
+    if library is not None:
+        # Merge against inlined objects, then store the result back into the library.
+        settings = materialize(settings, library)
+    report = MergeReport()
+    for source in sources:
+        report.changes.extend(merge_settings(settings, _load(source), policy).changes)
+
+    for change in report.changes:
+        if change.action in {"added", "updated", "replaced"}:
+            details = f" ({', '.join(change.fields)})" if change.action != "added" else ""
+            console.print(f"[green]{change.action}[/green] {change.section} {change.key}{details}")
+        elif change.action == "kept":
+            console.print(f"[yellow]kept[/yellow] {change.section} {change.key} (ours wins)")
+    for violation in validate_document(settings, "settings"):
+        console.print(f"[yellow]Schema warning[/yellow] {violation}")
+    console.print(f"[cyan]Merge into {target}:[/cyan] {report.summary()}")
+
+    if report.changed and not dry_run:
+        if library is not None:
+            settings = dehydrate(settings, library)
+        _write(settings, target)
+    return report
+
+
+def _write(settings: dict[str, Any], target: Path) -> None:
+    if target.resolve() == SETTINGS_PATH.resolve():
+        # The exported snapshot is tracked: update its manifest hashes and patch chain with it.
+        store_settings(settings, SETTINGS_PATH, source=target)
+        return
+    partial = target.with_name(target.name + ".part")
+    with partial.open("w", encoding="utf-8") as fp:
+        json.dump(settings, fp, indent=2)
+        fp.write("\n")
+    partial.replace(target)
@@ -0,0 +1,28 @@
+"""Option enums shared by the CLI and the modules it dispatches to."""
+
+from __future__ import annotations
+
+from enum import Enum
+
+
+class ApplyMode(str, Enum):
+    DEFAULT = "default"
+    COPY = "copy"
+    PROMOTE = "promote"
+
+
+class OutputFormat(str, Enum):
+    TABLE = "table"
+    JSON = "json"
+
+
+class MergePolicy(str, Enum):
+    OURS = "ours"
+    THEIRS = "theirs"
+    FIELD = "field"
+
+
+class ReportLevel(str, Enum):
+    QUIET = "quiet"
+    SUMMARY = "summary"
+    VERBOSE = "verbose"
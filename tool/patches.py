@@ -0,0 +1,283 @@
+"""RFC 6902 JSON Patch chain between exported settings snapshots, keyed by canonical hash."""
+
+from __future__ import annotations
+
+import copy
+import json
+from datetime import datetime, timezone
+from hashlib import sha256
+from pathlib import Path
+from typing import Any
+
+from .canonical import canonical_digest
+from .console import console
+from .library import LibraryError, library_for, materialize, references
+from .tracing import traced
+
+PATCH_DIRNAME = "patches"
+# Older patches are pruned; targets further behind than this fall back to a full apply.
+PATCH_HISTORY = 50
+# No .json suffix, so pruning and patch globs never pick it up.
+HEAD_NAME = "HEAD"
+
+Operation = dict[str, Any]
+
+
+class PatchError(ValueError):
+    """Raised when a patch does not apply or the chain does not lead to the requested document."""
+
+
+def _escape(token: str) -> str:
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+def _tokens(pointer: str) -> list[str]:
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer {pointer!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def diff(base: Any, target: Any, pointer: str = "") -> list[Operation]:
+    """Operations turning `base` into `target`: objects by key, lists by index with tail adds/removes."""
+    if isinstance(base, dict) and isinstance(target, dict):
+        ops: list[Operation] = []
+        for key in base:
+            if key not in target:
+                ops.append({"op": "remove", "path": f"{pointer}/{_escape(key)}"})
+        for key, value in target.items():
+            child = f"{pointer}/{_escape(key)}"
+            if key in base:
+                ops.extend(diff(base[key], value, child))
+            else:
+                ops.append({"op": "add", "path": child, "value": copy.deepcopy(value)})
+        return ops
+    if isinstance(base, list) and isinstance(target, list):
+        ops = []
+        shared = min(len(base), len(target))
+        for index in range(shared):
+            ops.extend(diff(base[index], target[index], f"{pointer}/{index}"))
+        # Remove from the end so earlier indices stay valid.
+        for index in range(len(base) - 1, shared - 1, -1):
+            ops.append({"op": "remove", "path": f"{pointer}/{index}"})
+        for value in target[shared:]:
+            ops.append({"op": "add", "path": f"{pointer}/-", "value": copy.deepcopy(value)})
+        return ops
+    if type(base) is not type(target) or base != target:
+        return [{"op": "replace", "path": pointer, "value": copy.deepcopy(target)}]
+    return []
+
+
+def _parent(document: Any, tokens: list[str], path: str) -> Any:
+    node = document
+    for token in tokens[:-1]:
+        node = _child(node, token, path)
+    return node
+
+
+def _child(node: Any, token: str, path: str) -> Any:
+    if isinstance(node, dict):
+        if token not in node:
+            raise PatchError(f"{path}: member {token!r} does not exist")
+        return node[token]
+    if isinstance(node, list):
+        return node[_index(node, token, path)]
+    raise PatchError(f"{path}: cannot descend into a scalar")
+
+
+def _index(node: list[Any], token: str, path: str, allow_end: bool = False) -> int:
+    if allow_end and token == "-":
+        return len(node)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise PatchError(f"{path}: invalid array index {token!r}")
+    index = int(token)
+    if index > len(node) or (index == len(node) and not allow_end):
+        raise PatchError(f"{path}: index {index} out of range")
+    return index
+
+
+def _get(document: Any, path: str) -> Any:
+    node = document
+    for token in _tokens(path):
+        node = _child(node, token, path)
+    return node
+
+
+def _remove(document: Any, path: str) -> tuple[Any, Any]:
+    tokens = _tokens(path)
+    if not tokens:
+        raise PatchError("Cannot remove the document root")
+    parent = _parent(document, tokens, path)
+    if isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise PatchError(f"{path}: member {tokens[-1]!r} does not exist")
+        return document, parent.pop(tokens[-1])
+    if isinstance(parent, list):
+        return document, parent.pop(_index(parent, tokens[-1], path))
+    raise PatchError(f"{path}: cannot remove from a scalar")
+
+
+def _add(document: Any, path: str, value: Any, replace: bool = False) -> Any:
+    tokens = _tokens(path)
+    if not tokens:
+        return value
+    parent = _parent(document, tokens, path)
+    if isinstance(parent, dict):
+        if replace and tokens[-1] not in parent:
+            raise PatchError(f"{path}: member {tokens[-1]!r} does not exist")
+        parent[tokens[-1]] = value
+    elif isinstance(parent, list):
+        index = _index(parent, tokens[-1], path, allow_end=not replace)
+        if replace:
+            parent[index] = value
+        else:
+            parent.insert(index, value)
+    else:
+        raise PatchError(f"{path}: cannot add to a scalar")
+    return document
+
+
+def apply_patch(document: Any, operations: list[Operation]) -> Any:
+    """Apply RFC 6902 operations to a copy of `document`."""
+    result = copy.deepcopy(document)
+    for operation in operations:
+        op, path = operation.get("op"), operation.get("path")
+        if not isinstance(path, str):
+            raise PatchError(f"Operation without a path: {operation}")
+        if op == "add":
+            result = _add(result, path, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            result, _ = _remove(result, path)
+        elif op == "replace":
+            result = _add(result, path, copy.deepcopy(operation["value"]), replace=True)
+        elif op == "move":
+            result, value = _remove(result, operation["from"])
+            result = _add(result, path, value)
+        elif op == "copy":
+            result = _add(result, path, copy.deepcopy(_get(result, operation["from"])))
+        elif op == "test":
+            if _get(result, path) != operation["value"]:
+                raise PatchError(f"{path}: test failed")
+        else:
+            raise PatchError(f"Unsupported patch operation {op!r}")
+    return result
+
+
+def patch_dir_for(settings_path: Path) -> Path:
+    return settings_path.parent / PATCH_DIRNAME
+
+
+def _materialized(settings: dict[str, Any], settings_path: Path) -> dict[str, Any]:
+    return materialize(settings, library_for(settings_path)) if references(settings) else settings
+
+
+@traced()
+def record_export(destination: Path, exported: dict[str, Any]) -> Path | None:
+    """Write the patch from the snapshot at `destination` to `exported`, before it is overwritten.
+
+    Both sides are compared with library references inlined, so a patch always applies to the
+    settings Windows Terminal actually reads.
+    """
+    if not destination.exists():
+        return None
+    try:
+        with destination.open("r", encoding="utf-8") as fp:
+            previous = json.load(fp)
+        base_doc = _materialized(previous, destination)
+        target_doc = _materialized(exported, destination)
+    except (OSError, ValueError, LibraryError) as exc:
+        console.print(f"[yellow]Skipping settings patch[/yellow]: {exc}")
+        return None
+    base, target = canonical_digest(base_doc), canonical_digest(target_doc)
+    if base == target:
+        return None
+
+    directory = patch_dir_for(destination)
+    directory.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "base": base,
+        "target": target,
+        "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "patch": diff(base_doc, target_doc),
+    }
+    # One patch per base hash: if history revisits a snapshot, the newest way forward wins.
+    path = directory / f"{base}.json"
+    _write_atomic(path, payload)
+    _prune(directory)
+    console.print(f"[cyan]Recorded settings patch[/cyan] → {path} ({len(payload['patch'])} operations)")
+    return path
+
+
+def _write_atomic(path: Path, payload: dict[str, Any]) -> None:
+    partial = path.with_name(path.name + ".part")
+    with partial.open("w", encoding="utf-8") as fp:
+        json.dump(payload, fp, indent=2)
+        fp.write("\n")
+    partial.replace(path)
+
+
+def record_head(destination: Path, exported: dict[str, Any]) -> None:
+    """Note which materialized hash the bytes now at `destination` stand for.
+
+    Apply reads this instead of loading and materializing the snapshot to find the chain's head.
+    """
+    head = patch_dir_for(destination) / HEAD_NAME
+    try:
+        target = canonical_digest(_materialized(exported, destination))
+        settings_sha256 = sha256(destination.read_bytes()).hexdigest()
+    except (OSError, ValueError, LibraryError):
+        head.unlink(missing_ok=True)
+        return
+    head.parent.mkdir(parents=True, exist_ok=True)
+    _write_atomic(head, {"settings_sha256": settings_sha256, "target": target})
+
+
+def read_head(settings_path: Path) -> str | None:
+    """Materialized hash of the snapshot at `settings_path`, or None when HEAD is missing or stale."""
+    try:
+        with (patch_dir_for(settings_path) / HEAD_NAME).open("r", encoding="utf-8") as fp:
+            payload = json.load(fp)
+        current = sha256(settings_path.read_bytes()).hexdigest()
+    except (OSError, ValueError):
+        return None
+    if not isinstance(payload, dict) or payload.get("settings_sha256") != current:
+        return None
+    target = payload.get("target")
+    return target if isinstance(target, str) else None
+
+
+def _prune(directory: Path) -> None:
+    patches = sorted(directory.glob("*.json"), key=lambda path: path.stat().st_mtime_ns, reverse=True)
+    for stale in patches[PATCH_HISTORY:]:
+        stale.unlink(missing_ok=True)
+
+
+@traced()
+def fast_forward(document: dict[str, Any], head: str, directory: Path) -> tuple[dict[str, Any], int]:
+    """Follow the chain from `document`'s hash to `head`, verifying every intermediate hash."""
+    current = canonical_digest(document)
+    seen = {current}
+    steps = 0
+    while current != head:
+        path = directory / f"{current}.json"
+        try:
+            with path.open("r", encoding="utf-8") as fp:
+                payload = json.load(fp)
+        except (OSError, ValueError) as exc:
+            raise PatchError(f"no patch from {current[:12]}") from exc
+        if not isinstance(payload, dict) or payload.get("base") != current:
+            raise PatchError(f"{path.name} does not start at {current[:12]}")
+        try:
+            document = apply_patch(document, payload["patch"])
+        except (KeyError, TypeError, AttributeError, IndexError) as exc:
+            # Hand-edited or truncated patch files: an op missing "path", a non-dict entry, ...
+            raise PatchError(f"{path.name} is malformed: {exc!r}") from exc
+        current = canonical_digest(document)
+        if current != payload.get("target"):
+            raise PatchError(f"{path.name} produced {current[:12]}, expected {str(payload.get('target'))[:12]}")
+        if current in seen:
+            raise PatchError(f"patch chain loops at {current[:12]}")
+        seen.add(current)
+        steps += 1
+    return document, steps
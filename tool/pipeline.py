@@ -0,0 +1,340 @@
+"""Stage runner that skips work whose input content is unchanged and runs independent stages in parallel."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from hashlib import sha256
+from pathlib import Path
+from typing import Any
+
+from .archive import walk_files
+from .cache import load_state, store_state
+from .canonical import canonical_file_digest
+from .console import console
+from .tracing import span
+
+CACHE_NAME = "pipeline"
+MANIFEST_PATH = Path("artifacts/manifest.json")
+# Diagnostic statuses that stop a release; a dirty git tree is expected before packaging.
+FAILING_STATUSES = {"error", "missing", "mismatch", "timeout"}
+
+
+class PipelineError(RuntimeError):
+    """Raised when a pipeline is malformed or one of its stages fails."""
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    run: Callable[[], object]
+    inputs: tuple[Path, ...] = ()
+    outputs: tuple[Path, ...] = ()
+    after: tuple[str, ...] = ()
+    params: tuple[str, ...] = ()
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str
+    duration: float = 0.0
+    details: str = ""
+    fingerprint: str | None = field(default=None, repr=False)
+
+
+def _overlaps(left: Path, right: Path) -> bool:
+    return left == right or left in right.parents or right in left.parents
+
+
+def stage_dependencies(stages: Sequence[Stage]) -> dict[str, set[str]]:
+    """A stage waits for producers of its inputs, earlier writers of its outputs, and its `after` list."""
+    names = {stage.name for stage in stages}
+    if len(names) != len(stages):
+        raise PipelineError("Stage names must be unique")
+    deps: dict[str, set[str]] = {}
+    for index, stage in enumerate(stages):
+        unknown = set(stage.after) - names
+        if unknown:
+            raise PipelineError(f"{stage.name} runs after unknown stage(s): {', '.join(sorted(unknown))}")
+        deps[stage.name] = set(stage.after)
+        for position, other in enumerate(stages):
+            if other is stage:
+                continue
+            feeds = any(_overlaps(out, src) for out in other.outputs for src in stage.inputs)
+            shares = position < index and any(
+                _overlaps(out, mine) for out in other.outputs for mine in stage.outputs
+            )
+            if feeds or shares:
+                deps[stage.name].add(other.name)
+
+    visiting: set[str] = set()
+    finished: set[str] = set()
+
+    def visit(name: str) -> None:
+        if name in finished:
+            return
+        if name in visiting:
+            raise PipelineError(f"Stage dependency cycle through {name}")
+        visiting.add(name)
+        for dep in deps[name]:
+            visit(dep)
+        visiting.discard(name)
+        finished.add(name)
+
+    for name in deps:
+        visit(name)
+    return deps
+
+
+class _FileDigests:
+    """Content digests reused while a file's mtime and size are unchanged."""
+
+    def __init__(self, known: dict[str, Any]) -> None:
+        # Persisted as JSON lists; entries of any other shape are simply re-hashed.
+        self.known: dict[str, tuple[int, int, str]] = {}
+        for key, entry in known.items():
+            match entry:
+                case [int() as mtime_ns, int() as size, str() as digest]:
+                    self.known[key] = (mtime_ns, size, digest)
+        self.lock = threading.Lock()
+
+    def digest(self, path: Path) -> str | None:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        key = path.as_posix()
+        with self.lock:
+            cached = self.known.get(key)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        digest = self._content_digest(path)
+        with self.lock:
+            self.known[key] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    @staticmethod
+    def _content_digest(path: Path) -> str:
+        # JSON inputs hash canonically so a reformatted settings file does not re-run downstream stages.
+        if path.suffix == ".json":
+            try:
+                return "json:" + canonical_file_digest(path)
+            except ValueError:
+                pass
+        hasher = sha256()
+        with path.open("rb") as fp:
+            for chunk in iter(lambda: fp.read(1 << 20), b""):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+
+class PipelineRunner:
+    def __init__(self, stages: Sequence[Stage], force: bool = False, workers: int | None = None) -> None:
+        self.stages = {stage.name: stage for stage in stages}
+        self.deps = stage_dependencies(stages)
+        self.force = force
+        self.workers = workers or max(len(stages), 1)
+        self.results: dict[str, StageResult] = {}
+
+    def fingerprint(self, stage: Stage, digests: _FileDigests) -> str:
+        files: list[tuple[str, str | None]] = []
+        for source in stage.inputs:
+            if source.is_dir():
+                files.extend((path.as_posix(), digests.digest(path)) for path in walk_files(source))
+            else:
+                files.append((source.as_posix(), digests.digest(source)))
+        payload = {"stage": stage.name, "params": list(stage.params), "inputs": sorted(files, key=lambda f: f[0])}
+        return sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _execute(self, stage: Stage, previous: dict[str, Any], digests: _FileDigests) -> StageResult:
+        started = time.monotonic()
+        fingerprint = self.fingerprint(stage, digests)
+        if (
+            not self.force
+            and previous.get("fingerprint") == fingerprint
+            and all(output.exists() for output in stage.outputs)
+        ):
+            return StageResult(stage.name, "cached", time.monotonic() - started, "inputs unchanged", fingerprint)
+        with span(f"stage {stage.name}"):
+            stage.run()
+        return StageResult(stage.name, "ran", time.monotonic() - started, fingerprint=fingerprint)
+
+    def run(self) -> list[StageResult]:
+        state = load_state(CACHE_NAME)
+        recorded: dict[str, Any] = state.get("stages", {})
+        digests = _FileDigests(state.get("files", {}))
+        waiting = dict(self.deps)
+        running: dict[Future[StageResult], str] = {}
+        self.results = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while waiting or running:
+                for name in list(waiting):
+                    deps = waiting[name]
+                    stopped = [dep for dep in deps if self._status(dep) in {"failed", "blocked"}]
+                    if stopped:
+                        self._finish(StageResult(name, "blocked", details=f"after {', '.join(sorted(stopped))}"))
+                        del waiting[name]
+                    elif all(dep in self.results for dep in deps):
+                        future = pool.submit(self._execute, self.stages[name], recorded.get(name, {}), digests)
+                        running[future] = name
+                        del waiting[name]
+                if not running:
+                    continue
+                completed, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    name = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as exc:
+                        result = StageResult(name, "failed", details=str(exc))
+                    self._finish(result)
+
+        for result in self.results.values():
+            if result.status in {"ran", "cached"}:
+                recorded[result.name] = {"fingerprint": result.fingerprint, "duration": round(result.duration, 6)}
+            elif result.status == "failed":
+                recorded.pop(result.name, None)
+        store_state(CACHE_NAME, {"stages": recorded, "files": digests.known})
+        return [self.results[name] for name in self.stages]
+
+    def _status(self, name: str) -> str | None:
+        result = self.results.get(name)
+        return result.status if result else None
+
+    def _finish(self, result: StageResult) -> None:
+        self.results[result.name] = result
+        label = {
+            "ran": "[green]ran[/green]",
+            "cached": "[dim]cached[/dim]",
+            "failed": "[red]failed[/red]",
+            "blocked": "[yellow]blocked[/yellow]",
+        }[result.status]
+        details = f" — {result.details}" if result.details else ""
+        console.print(f"{label} {result.name} ({result.duration:.2f}s){details}")
+
+    def critical_path(self) -> list[StageResult]:
+        """Longest chain of dependent stages by this run's durations."""
+        finish: dict[str, float] = {}
+        via: dict[str, str | None] = {}
+
+        def end(name: str) -> float:
+            if name not in finish:
+                parent = max(self.deps[name], key=end, default=None)
+                via[name] = parent
+                finish[name] = self.results[name].duration + (end(parent) if parent else 0.0)
+            return finish[name]
+
+        if not self.results:
+            return []
+        name: str | None = max(self.results, key=end)
+        path: list[StageResult] = []
+        while name is not None:
+            path.append(self.results[name])
+            name = via[name]
+        return list(reversed(path))
+
+
+def release_stages(
+    version: str = "v1.0.0",
+    push_changes: bool = False,
+    offline: bool = False,
+) -> list[Stage]:
+    """The export → sanitize → diagnostics/verify → package release flow as pipeline stages."""
+    from .validators import resolve_windows_terminal_path  # noqa: PLC0415
+
+    try:
+        terminal_settings: tuple[Path, ...] = (resolve_windows_terminal_path(),)
+    except FileNotFoundError:
+        terminal_settings = ()
+
+    def export() -> None:
+        from .exporter import export_windows_terminal_settings  # noqa: PLC0415
+
+        export_windows_terminal_settings()
+
+    def sanitize() -> None:
+        from .sanitizer import sanitize_zshrc  # noqa: PLC0415
+
+        sanitize_zshrc()
+
+    def diagnostics() -> None:
+        from .validators import run_diagnostics  # noqa: PLC0415
+
+        failed = [result for result in run_diagnostics() if result.status in FAILING_STATUSES]
+        if failed:
+            raise PipelineError("; ".join(f"{result.name}: {result.status}" for result in failed))
+
+    def verify() -> None:
+        from .validators import verify_manifest  # noqa: PLC0415
+
+        failed = [result for result in verify_manifest(MANIFEST_PATH) if result.status != "ok"]
+        if failed:
+            raise PipelineError("; ".join(f"{result.name}: {result.status}" for result in failed))
+
+    def package() -> None:
+        from .github_publisher import ReleaseOptions, publish  # noqa: PLC0415
+
+        publish(version, ReleaseOptions(push_changes=push_changes, offline=offline))
+
+    from .github_publisher import RELEASE_INPUTS  # noqa: PLC0415
+    from .sanitizer import rules_fingerprint  # noqa: PLC0415
+
+    settings = Path("artifacts/settings.json")
+    zshrc = Path("artifacts/zshrc.portable")
+    release_inputs = [*RELEASE_INPUTS, Path("vendor")] if offline else list(RELEASE_INPUTS)
+    return [
+        Stage("export", export, (*terminal_settings, Path("tool/exporter.py")), (settings, MANIFEST_PATH)),
+        Stage(
+            "sanitize",
+            sanitize,
+            (Path.home() / ".zshrc", Path("tool/sanitizer.py")),
+            (zshrc, MANIFEST_PATH),
+            # A rule pack or denylist change must re-run the stage even when tool/sanitizer.py has not.
+            params=(rules_fingerprint(),),
+        ),
+        Stage("diagnostics", diagnostics, (settings, zshrc, MANIFEST_PATH)),
+        Stage("verify", verify, (settings, zshrc, MANIFEST_PATH)),
+        Stage(
+            "package",
+            package,
+            tuple(release_inputs),
+            (Path("release/portable-profile.zip"), Path("release/portable-profile.json")),
+            after=("diagnostics", "verify"),
+            params=(version, str(push_changes), str(offline)),
+        ),
+    ]
+
+
+def run_pipeline(
+    stages: Iterable[Stage],
+    skip: Sequence[str] = (),
+    force: bool = False,
+) -> list[StageResult]:
+    selected = list(stages)
+    unknown = set(skip) - {stage.name for stage in selected}
+    if unknown:
+        raise PipelineError(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+    selected = [
+        replace(stage, after=tuple(name for name in stage.after if name not in skip))
+        for stage in selected
+        if stage.name not in skip
+    ]
+
+    started = time.monotonic()
+    runner = PipelineRunner(selected, force=force)
+    results = runner.run()
+    path = runner.critical_path()
+    if path:
+        chain = " → ".join(f"{result.name} ({result.duration:.2f}s)" for result in path)
+        total = sum(result.duration for result in path)
+        console.print(f"[cyan]Critical path[/cyan] {chain} = {total:.2f}s of {time.monotonic() - started:.2f}s wall")
+    failed = [result.name for result in results if result.status in {"failed", "blocked"}]
+    if failed:
+        raise PipelineError(f"Pipeline stopped: {', '.join(failed)} did not complete")
+    return results
@@ -0,0 +1,556 @@
+"""Static backtracking analysis and hardening for sanitizer rule patterns, plus runtime budgets."""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from multiprocessing.pool import Pool
+
+try:  # Python 3.11+
+    from re import _constants as sre_constants  # type: ignore[attr-defined]
+    from re import _parser as sre_parse  # type: ignore[attr-defined]
+except ImportError:  # pragma: no cover - Python 3.10
+    import sre_constants
+    import sre_parse
+
+EXPONENTIAL = "exponential"
+POLYNOMIAL = "polynomial"
+# Bounded repeats above this count backtrack like unbounded ones.
+LARGE_REPEAT = 10
+REDACTED_LINE = "<redacted: rule budget exceeded>"
+
+_C = sre_constants
+_REPEATS = {_C.MAX_REPEAT, _C.MIN_REPEAT}
+_SINGLE = {_C.LITERAL, _C.NOT_LITERAL, _C.ANY, _C.IN}
+_ZERO_WIDTH = {_C.AT, _C.ASSERT, _C.ASSERT_NOT}
+_POSSESSIVE = getattr(_C, "POSSESSIVE_REPEAT", None)
+_ATOMIC = getattr(_C, "ATOMIC_GROUP", None)
+
+# Characters used to decide whether two character sets can overlap: ASCII plus a few non-ASCII
+# representatives (letter, space, CJK) so negated classes and \w/\s are not misjudged.
+_PROBES = [chr(code) for code in range(128)] + ["é", "\u2003", "中"]
+_CATEGORIES = {
+    _C.CATEGORY_DIGIT: r"\d",
+    _C.CATEGORY_NOT_DIGIT: r"\D",
+    _C.CATEGORY_SPACE: r"\s",
+    _C.CATEGORY_NOT_SPACE: r"\S",
+    _C.CATEGORY_WORD: r"\w",
+    _C.CATEGORY_NOT_WORD: r"\W",
+}
+_ANCHORS = {
+    _C.AT_BEGINNING: "^",
+    _C.AT_BEGINNING_STRING: r"\A",
+    _C.AT_END: "$",
+    _C.AT_END_STRING: r"\Z",
+    _C.AT_BOUNDARY: r"\b",
+    _C.AT_NON_BOUNDARY: r"\B",
+}
+_FLAG_LETTERS = (("a", re.ASCII), ("i", re.IGNORECASE), ("L", re.LOCALE), ("m", re.MULTILINE), ("s", re.DOTALL))
+
+Item = tuple[Any, Any]
+T = TypeVar("T")
+
+
+class UnsupportedPatternError(ValueError):
+    """Raised for constructs the rewriter does not reproduce (conditionals, verbose layouts)."""
+
+
+@dataclass
+class PatternIssue:
+    kind: str
+    severity: str
+    detail: str
+
+    def __str__(self) -> str:
+        return f"{self.kind} ({self.severity}): {self.detail}"
+
+
+@dataclass
+class HardenedPattern:
+    source: str
+    pattern: str
+    rewrites: list[str] = field(default_factory=list)
+    issues: list[PatternIssue] = field(default_factory=list)
+
+    @property
+    def exponential(self) -> bool:
+        return any(issue.severity == EXPONENTIAL for issue in self.issues)
+
+    @property
+    def guarded(self) -> bool:
+        """Super-linear but not catastrophic: safe to run only under a budget."""
+        return bool(self.issues)
+
+
+# -- unparsing -------------------------------------------------------------------------------
+
+
+def _class_char(code: int) -> str:
+    return re.escape(chr(code))
+
+
+def _unparse_in(items: Sequence[Item]) -> str:
+    negate = bool(items) and items[0][0] == _C.NEGATE
+    parts = []
+    for op, av in items[1:] if negate else items:
+        if op == _C.LITERAL:
+            parts.append(_class_char(av))
+        elif op == _C.RANGE:
+            parts.append(f"{_class_char(av[0])}-{_class_char(av[1])}")
+        elif op == _C.CATEGORY and av in _CATEGORIES:
+            parts.append(_CATEGORIES[av])
+        else:
+            raise UnsupportedPatternError(f"character class item {op}")
+    return "[" + ("^" if negate else "") + "".join(parts) + "]"
+
+
+def _quantifier(low: int, high: int) -> str:
+    if high == _C.MAXREPEAT:
+        return {0: "*", 1: "+"}.get(low, f"{{{low},}}")
+    if low == high:
+        return f"{{{low}}}"
+    if (low, high) == (0, 1):
+        return "?"
+    return f"{{{low},{high}}}"
+
+
+def _atom(items: Sequence[Item], names: dict[int, str]) -> str:
+    """Pattern text for a repeat body, grouped unless it is already a single atom."""
+    text = _unparse(items, names)
+    if len(items) == 1 and items[0][0] in _SINGLE | {_C.SUBPATTERN}:
+        return text
+    return f"(?:{text})"
+
+
+def _flag_text(flags: int) -> str:
+    return "".join(letter for letter, value in _FLAG_LETTERS if flags & value)
+
+
+def _unparse_leaf(op: Any, av: Any) -> str | None:
+    """Text for a single-character item or anchor; None for everything else."""
+    if op == _C.LITERAL:
+        return re.escape(chr(av))
+    if op == _C.NOT_LITERAL:
+        return f"[^{_class_char(av)}]"
+    if op == _C.ANY:
+        return "."
+    if op == _C.IN:
+        return _unparse_in(av)
+    if op == _C.AT and av in _ANCHORS:
+        return _ANCHORS[av]
+    return None
+
+
+def _unparse_group(av: Any, names: dict[int, str]) -> str:
+    group, add_flags, del_flags, body = av
+    inner = _unparse(body, names)
+    if group is None:
+        flags = _flag_text(add_flags) + ("-" + _flag_text(del_flags) if del_flags else "")
+        return f"(?{flags}:{inner})"
+    if group in names:
+        return f"(?P<{names[group]}>{inner})"
+    return f"({inner})"
+
+
+def _unparse(items: Sequence[Item], names: dict[int, str]) -> str:
+    out = []
+    for op, av in items:
+        leaf = _unparse_leaf(op, av)
+        if leaf is not None:
+            out.append(leaf)
+        elif op in _REPEATS or op == _POSSESSIVE:
+            low, high, body = av
+            suffix = "?" if op == _C.MIN_REPEAT else "+" if op == _POSSESSIVE else ""
+            out.append(_atom(body, names) + _quantifier(low, high) + suffix)
+        elif op == _C.SUBPATTERN:
+            out.append(_unparse_group(av, names))
+        elif op == _C.BRANCH:
+            alternatives = "|".join(_unparse(branch, names) for branch in av[1])
+            out.append(alternatives if len(items) == 1 else f"(?:{alternatives})")
+        elif op in (_C.ASSERT, _C.ASSERT_NOT):
+            direction, body = av
+            kind = ("=" if op == _C.ASSERT else "!") if direction == 1 else ("<=" if op == _C.ASSERT else "<!")
+            out.append(f"(?{kind}{_unparse(body, names)})")
+        elif op == _C.GROUPREF:
+            out.append(f"(?P={names[av]})" if av in names else f"(?:\\{av})")
+        elif op == _ATOMIC:
+            out.append(f"(?>{_unparse(av, names)})")
+        else:
+            raise UnsupportedPatternError(f"{op} is not supported by the rewriter")
+    return "".join(out)
+
+
+def unparse(parsed: Any) -> str:
+    """Regenerate pattern text from a parse tree (only the constructs rule patterns use)."""
+    names = {number: name for name, number in parsed.state.groupdict.items()}
+    prefix = _flag_text(parsed.state.flags & ~re.UNICODE)
+    return (f"(?{prefix})" if prefix else "") + _unparse(list(parsed), names)
+
+
+# -- analysis -------------------------------------------------------------------------------
+
+
+@lru_cache(maxsize=512)
+def _probe(single: str, flags: int) -> frozenset[str]:
+    compiled = re.compile(single, flags)
+    return frozenset(char for char in _PROBES if compiled.fullmatch(char))
+
+
+def _charset(item: Item, flags: int) -> frozenset[str] | None:
+    if item[0] not in _SINGLE:
+        return None
+    return _probe(_unparse([item], {}), flags)
+
+
+def _body_charset(body: Sequence[Item], flags: int) -> frozenset[str] | None:
+    """Character set of a repeat whose body is a single character (possibly in a group)."""
+    items = list(body)
+    while len(items) == 1 and items[0][0] == _C.SUBPATTERN:
+        items = list(items[0][1][3])
+    return _charset(items[0], flags) if len(items) == 1 else None
+
+
+def _first_composite(op: Any, av: Any, flags: int) -> tuple[frozenset[str], bool] | None:
+    """`_first` for one repeat, group, branch or assertion; None for items the analysis cannot see into."""
+    if op in _REPEATS or op == _POSSESSIVE:
+        inner, nullable = _first(av[2], flags)
+        return inner, nullable or av[0] == 0
+    if op == _C.SUBPATTERN:
+        return _first(av[3], flags)
+    if op == _ATOMIC:
+        return _first(av, flags)
+    if op == _C.BRANCH:
+        branches = [_first(branch, flags) for branch in av[1]]
+        return frozenset().union(*(inner for inner, _ in branches)), any(nullable for _, nullable in branches)
+    if op in _ZERO_WIDTH:
+        return frozenset(), True
+    return None
+
+
+def _first(items: Sequence[Item], flags: int) -> tuple[frozenset[str], bool]:
+    """Characters a sequence can start with, and whether it can match the empty string."""
+    found: set[str] = set()
+    for item in items:
+        chars = _charset(item, flags)
+        if chars is not None:
+            return frozenset(found | chars), False
+        composite = _first_composite(*item, flags)
+        if composite is None:
+            return frozenset(_PROBES), True
+        inner, nullable = composite
+        found |= inner
+        if not nullable:
+            return frozenset(found), False
+    return frozenset(found), True
+
+
+def _unbounded(high: int) -> bool:
+    return high == _C.MAXREPEAT or high > LARGE_REPEAT
+
+
+def _terminated(items: Sequence[Item], index: int, flags: int) -> bool:
+    """True when the single-character repeat at `index` must be followed by a character it cannot match."""
+    chars = _body_charset(items[index][1][2], flags)
+    if chars is None:
+        return False
+    follow, nullable = _first(items[index + 1 :], flags)
+    return not nullable and not (chars & follow)
+
+
+def _ambiguous(items: Sequence[Item], flags: int) -> str | None:
+    """Describe a construct inside a repeated body that can split the same text more than one way."""
+    for index, (op, av) in enumerate(items):
+        if op in _REPEATS and _unbounded(av[1]) and not _terminated(items, index, flags):
+            return f"inner repeat {_unparse([(op, av)], {})}"
+        if op == _C.BRANCH:
+            firsts = [_first(branch, flags)[0] for branch in av[1]]
+            for position, chars in enumerate(firsts):
+                if any(chars & other for other in firsts[position + 1 :]):
+                    return "alternatives that start with the same characters"
+        for body in _children(op, av):
+            found = _ambiguous(body, flags)
+            if found:
+                return found
+    return None
+
+
+def _children(op: Any, av: Any) -> Iterator[Sequence[Item]]:
+    if op in _REPEATS or op == _POSSESSIVE:
+        yield av[2]
+    elif op == _C.SUBPATTERN:
+        yield av[3]
+    elif op == _C.BRANCH:
+        yield from av[1]
+    elif op in (_C.ASSERT, _C.ASSERT_NOT):
+        yield av[1]
+    elif op == _ATOMIC:
+        yield av
+
+
+def _issues(items: Sequence[Item], flags: int, top: bool) -> list[PatternIssue]:
+    issues = []
+    for index, (op, av) in enumerate(items):
+        if op in _REPEATS and _unbounded(av[1]):
+            text = _unparse([(op, av)], {})
+            nested = _ambiguous(av[2], flags)
+            if nested:
+                issues.append(PatternIssue("nested-quantifier", EXPONENTIAL, f"{text} repeats an {nested}"))
+            chars = _body_charset(av[2], flags)
+            follow, nullable = _first(items[index + 1 :], flags)
+            if chars is not None and chars & follow:
+                sample = "".join(sorted(chars & follow))[:8]
+                issues.append(
+                    PatternIssue("overlapping-quantifier", POLYNOMIAL, f"{text} and what follows both match {sample!r}")
+                )
+            elif top and index == _leading_index(items) and chars is not None and not nullable:
+                issues.append(
+                    PatternIssue(
+                        "unguarded-leading-repeat",
+                        POLYNOMIAL,
+                        f"{text} is retried from every offset inside a run; add a lookbehind guard",
+                    )
+                )
+        for body in _children(op, av):
+            issues.extend(_issues(body, flags, top=False))
+    return issues
+
+
+def _leading_index(items: Sequence[Item]) -> int | None:
+    """Index of the first consuming item, or None when the pattern is anchored or guarded."""
+    for index, (op, _) in enumerate(items):
+        if op in _ZERO_WIDTH:
+            return None
+        return index
+    return None
+
+
+def _parse(pattern: str, flags: int = 0) -> Any:
+    return sre_parse.parse(pattern, flags)
+
+
+def analyze(pattern: str, flags: int = 0) -> list[PatternIssue]:
+    """Report constructs that make backtracking super-linear in the input length."""
+    parsed = _parse(pattern, flags)
+    return _issues(list(parsed), parsed.state.flags, top=True)
+
+
+# -- hardening ------------------------------------------------------------------------------
+
+
+def _make_possessive(items: list[Item], flags: int, rewrites: list[str]) -> list[Item]:
+    result: list[Item] = []
+    for index, (op, av) in enumerate(items):
+        if op == _C.MAX_REPEAT and _unbounded(av[1]) and _terminated(items, index, flags):
+            rewrites.append(f"possessive {_unparse([(op, av)], {})}")
+            result.append((_POSSESSIVE, (av[0], av[1], _rewrite_children(av[2], flags, rewrites))))
+        elif op in _REPEATS or op == _POSSESSIVE:
+            result.append((op, (av[0], av[1], _rewrite_children(av[2], flags, rewrites))))
+        elif op == _C.SUBPATTERN:
+            result.append((op, (*av[:3], _rewrite_children(av[3], flags, rewrites))))
+        elif op == _C.BRANCH:
+            result.append((op, (av[0], [_rewrite_children(branch, flags, rewrites) for branch in av[1]])))
+        else:
+            result.append((op, av))
+    return result
+
+
+def _rewrite_children(body: Sequence[Item], flags: int, rewrites: list[str]) -> list[Item]:
+    return _make_possessive(list(body), flags, rewrites)
+
+
+def _guard_leading(items: list[Item], flags: int, rewrites: list[str]) -> list[Item]:
+    index = _leading_index(items)
+    if index is None:
+        return items
+    op, av = items[index]
+    if op not in _REPEATS and op != _POSSESSIVE:
+        return items
+    if not (_unbounded(av[1]) and _terminated(items, index, flags)):
+        return items
+    body = list(av[2])
+    while len(body) == 1 and body[0][0] == _C.SUBPATTERN:
+        body = list(body[0][1][3])
+    rewrites.append(f"lookbehind guard (?<!{_unparse(body, {})})")
+    return [(_C.ASSERT_NOT, (-1, body)), *items]
+
+
+def harden(pattern: str, flags: int = 0) -> HardenedPattern:
+    """Rewrite what can be rewritten without changing matches, then report what remains.
+
+    A repeat of one character class that must be followed by a character outside that class
+    never benefits from giving characters back, so it becomes possessive (Python 3.11+). If such
+    a repeat starts the pattern, a negative lookbehind for the same class stops the search from
+    re-running it from every offset inside a run.
+    """
+    parsed = _parse(pattern, flags)
+    items = list(parsed)
+    rewrites: list[str] = []
+    items = _guard_leading(items, parsed.state.flags, rewrites)
+    if _POSSESSIVE is not None:
+        items = _make_possessive(items, parsed.state.flags, rewrites)
+    candidate = pattern
+    if rewrites:
+        parsed.data = items
+        try:
+            candidate = unparse(parsed)
+            # Keep the rewrite only if it parses back to exactly the tree that was rewritten.
+            if repr(list(_parse(candidate, flags))) != repr(items):
+                raise UnsupportedPatternError("rewritten pattern does not round-trip")
+        except (UnsupportedPatternError, re.error):
+            candidate, rewrites = pattern, []
+    return HardenedPattern(pattern, candidate, rewrites, analyze(candidate, flags))
+
+
+# -- runtime budgets ------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class RuleBudget:
+    """Limits for rules that analysis could not make linear.
+
+    Such rules never run in process, where a short line can still take quadratic or worse time.
+    Each text goes to a worker process as one batch; if the batch overruns `timeout` seconds the
+    worker is killed and the lines are retried one by one, and a line that overruns on its own is
+    redacted (or reported by the scan) rather than passed through unscanned.
+    """
+
+    timeout: float = 2.0
+
+
+DEFAULT_BUDGET = RuleBudget()
+
+
+class _Worker:
+    """Process-wide slot for the budget worker, replaced whenever a timeout kills it."""
+
+    pool: Pool | None = None
+
+
+def _ready() -> None:
+    """Round trip that waits for a fresh worker to finish starting."""
+
+
+def _detach_stdout() -> None:
+    """Point the worker's stdout at stderr; under `git-filter` the inherited stdout is the protocol pipe."""
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+
+def _subn_lines(pattern: str, flags: int, replacement: str, lines: list[str]) -> list[tuple[str, int]]:
+    compiled = re.compile(pattern, flags)
+    return [compiled.subn(replacement, line) for line in lines]
+
+
+def _findall_lines(pattern: str, flags: int, lines: list[str]) -> list[list[str]]:
+    compiled = re.compile(pattern, flags)
+    return [[match.group(0) for match in compiled.finditer(line)] for line in lines]
+
+
+def _worker() -> Pool:
+    import multiprocessing  # noqa: PLC0415
+
+    if _Worker.pool is None:
+        # spawn: forking a process that runs threads (pipeline, daemon) is unsafe.
+        pool = multiprocessing.get_context("spawn").Pool(1, initializer=_detach_stdout)
+        # Process start-up is not the rule's time; only the match itself counts against the budget.
+        pool.apply(_ready)
+        _Worker.pool = pool
+    return _Worker.pool
+
+
+def _reset_worker() -> None:
+    pool, _Worker.pool = _Worker.pool, None
+    if pool is not None:
+        pool.terminate()
+        pool.join()
+
+
+def _call(task: Callable[..., list[T]], args: tuple[Any, ...], timeout: float) -> list[T] | None:
+    from multiprocessing import TimeoutError as WorkerTimeout  # noqa: PLC0415
+
+    pending = _worker().apply_async(task, args)
+    try:
+        return pending.get(timeout=timeout)
+    except WorkerTimeout:
+        _reset_worker()
+        return None
+
+
+def _budgeted(task: Callable[..., list[T]], args: tuple[Any, ...], lines: list[str], budget: RuleBudget) -> list[T | None]:
+    """`task(*args, lines)` in the worker; None marks each line that overran the budget on its own."""
+    if not lines:
+        return []
+    results = _call(task, (*args, lines), budget.timeout)
+    if results is not None:
+        return list(results)
+    if len(lines) == 1:
+        return [None]
+    retried: list[T | None] = []
+    for line in lines:
+        single = _call(task, (*args, [line]), budget.timeout)
+        retried.append(None if single is None else single[0])
+    return retried
+
+
+def budgeted_subn(
+    compiled: re.Pattern[str], replacement: str, content: str, budget: RuleBudget = DEFAULT_BUDGET
+) -> tuple[str, int, int]:
+    """Line-by-line `subn` under `budget`; returns the text, substitutions and lines redacted."""
+    lines = content.splitlines(keepends=True)
+    bodies = [line.rstrip("\r\n") for line in lines]
+    results = _budgeted(_subn_lines, (compiled.pattern, compiled.flags, replacement), bodies, budget)
+    pieces = []
+    total = timeouts = 0
+    for line, body, result in zip(lines, bodies, results):
+        if result is None:
+            timeouts += 1
+        text, count = result if result is not None else (REDACTED_LINE, 0)
+        pieces.append(text + line[len(body) :])
+        total += count
+    return "".join(pieces), total, timeouts
+
+
+def budgeted_findall(
+    compiled: re.Pattern[str], lines: list[str], budget: RuleBudget = DEFAULT_BUDGET
+) -> list[list[str] | None]:
+    """The matched text on each line under `budget`; None for lines the rule could not finish."""
+    return _budgeted(_findall_lines, (compiled.pattern, compiled.flags), lines, budget)
+
+
+# -- benchmark corpus -----------------------------------------------------------------------
+
+
+def pathological_corpus(size: int = 20_000) -> list[str]:
+    """Lines that make naive rule patterns backtrack: long runs with no terminator to anchor them."""
+    return [
+        "a." * (size // 2),
+        "x" * size + "@",
+        "user@" + "sub." * (size // 4),
+        "a@" + "b" * size + ".",
+        "Bearer " + "A" * size,
+        "/home/" + "u" * size,
+        "C:\\Users\\" + "n" * size,
+        "ghp_" + "z" * size,
+        "aaaa" * (size // 4),
+        " ".join(["tok." * 8] * (size // 40)),
+    ]
+
+
+def benchmark(patterns: Iterable[tuple[str, re.Pattern[str], str]], corpus: Sequence[str]) -> dict[str, float]:
+    """Seconds each (description, pattern, replacement) spends substituting over `corpus`."""
+    timings = {}
+    for description, compiled, replacement in patterns:
+        started = time.perf_counter()
+        for line in corpus:
+            compiled.subn(replacement, line)
+        timings[description] = time.perf_counter() - started
+    return timings
@@ -0,0 +1,157 @@
+"""Buffered event reporting: hot loops record events, stage boundaries print one summary."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from .console import console
+from .modes import ReportLevel
+
+DEFAULT_STAGE = "omniforge"
+# Summaries name at most this many details per event before collapsing the rest into "+N more".
+SUMMARY_DETAILS = 5
+
+_current_stage: ContextVar[str] = ContextVar("omniforge_report_stage", default=DEFAULT_STAGE)
+
+
+@dataclass
+class Event:
+    stage: str
+    event: str
+    detail: str
+    count: int
+    ts: float
+
+
+class Reporter:
+    """Collects counters per stage; events are kept only when something will show them."""
+
+    def __init__(self, level: ReportLevel = ReportLevel.SUMMARY, sink: Path | None = None) -> None:
+        self.level = level
+        self.sink = sink
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[str, Counter[str]]] = {}
+        self._events: dict[str, list[Event]] = {}
+
+    @property
+    def keeps_events(self) -> bool:
+        return self.level == ReportLevel.VERBOSE or self.sink is not None
+
+    def record(self, event: str, detail: str = "", count: int = 1, stage: str | None = None) -> None:
+        stage = stage or _current_stage.get()
+        with self._lock:
+            self._counters.setdefault(stage, {}).setdefault(event, Counter())[detail] += count
+            if self.keeps_events:
+                self._events.setdefault(stage, []).append(Event(stage, event, detail, count, time.time()))
+
+    def counts(self, stage: str) -> dict[str, int]:
+        with self._lock:
+            return {event: sum(details.values()) for event, details in self._counters.get(stage, {}).items()}
+
+    def flush(self, stage: str | None = None) -> None:
+        """Print and sink everything recorded for `stage` (every stage when None), then forget it."""
+        with self._lock:
+            stages = [stage] if stage is not None else list(self._counters)
+            drained = [(name, self._counters.pop(name, {}), self._events.pop(name, [])) for name in stages]
+        for name, counters, events in drained:
+            if not counters:
+                continue
+            if self.sink is not None:
+                _write_sink(self.sink, name, counters, events)
+            if self.level == ReportLevel.QUIET:
+                continue
+            lines: list[str] = []
+            if self.level == ReportLevel.VERBOSE:
+                lines.extend(_event_line(event) for event in events)
+            lines.append(_summary_line(name, counters))
+            # One print per stage: rendering cost no longer scales with the number of events.
+            console.print("\n".join(lines))
+
+
+def _write_sink(sink: Path, stage: str, counters: dict[str, Counter[str]], events: list[Event]) -> None:
+    sink.parent.mkdir(parents=True, exist_ok=True)
+    summary = {
+        "type": "summary",
+        "stage": stage,
+        "counts": {event: sum(details.values()) for event, details in counters.items()},
+        "details": {event: dict(details) for event, details in counters.items()},
+    }
+    with sink.open("a", encoding="utf-8") as fp:
+        for event in events:
+            fp.write(json.dumps({"type": "event", **asdict(event)}) + "\n")
+        fp.write(json.dumps(summary) + "\n")
+
+
+def _event_line(event: Event) -> str:
+    suffix = f" \N{MULTIPLICATION SIGN}{event.count}" if event.count != 1 else ""
+    return f"  [dim]{event.stage}[/dim] {event.event}: {event.detail}{suffix}"
+
+
+def _summary_line(stage: str, counters: dict[str, Counter[str]]) -> str:
+    parts = []
+    for event, details in counters.items():
+        named = [(detail, count) for detail, count in details.most_common() if detail]
+        shown = ", ".join(f"{detail} {count}" if count != 1 else detail for detail, count in named[:SUMMARY_DETAILS])
+        if len(named) > SUMMARY_DETAILS:
+            shown += f", +{len(named) - SUMMARY_DETAILS} more"
+        parts.append(f"{sum(details.values())} {event}" + (f" ({shown})" if shown else ""))
+    return f"[cyan]{stage}[/cyan]: " + "; ".join(parts)
+
+
+# Daemon requests each run under their own reporter, so concurrent requests never share counters.
+_reporter: ContextVar[Reporter] = ContextVar("omniforge_reporter", default=Reporter())
+
+
+def configure(level: ReportLevel = ReportLevel.SUMMARY, sink: Path | None = None) -> Reporter:
+    """Change the level and sink of the reporter in effect, flushing whatever it still held."""
+    reporter = _reporter.get()
+    reporter.flush()
+    reporter.level, reporter.sink = level, sink
+    return reporter
+
+
+def get_reporter() -> Reporter:
+    return _reporter.get()
+
+
+def record(event: str, detail: str = "", count: int = 1) -> None:
+    _reporter.get().record(event, detail, count)
+
+
+def flush(stage: str | None = None) -> None:
+    _reporter.get().flush(stage)
+
+
+@contextmanager
+def scoped_reporter(level: ReportLevel | None = None, sink: Path | None = None) -> Iterator[Reporter]:
+    """Send this context's events to a fresh reporter, flushed when the block exits.
+
+    Level and sink default to those of the reporter in effect.
+    """
+    parent = _reporter.get()
+    reporter = Reporter(parent.level if level is None else level, parent.sink if sink is None else sink)
+    token = _reporter.set(reporter)
+    try:
+        yield reporter
+    finally:
+        _reporter.reset(token)
+        reporter.flush()
+
+
+@contextmanager
+def reporting_stage(name: str) -> Iterator[None]:
+    """Attribute events to `name` and print its summary when the block exits, even on error."""
+    token = _current_stage.set(name)
+    try:
+        yield
+    finally:
+        _current_stage.reset(token)
+        _reporter.get().flush(name)
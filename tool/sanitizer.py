@@ -3,18 +3,25 @@
 from __future__ import annotations
 
 import json
+import os
 import re
+from collections.abc import Iterable
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import lru_cache
 from hashlib import sha256
 from pathlib import Path
 from re import Pattern
+from typing import Any
 
-from rich.console import Console
-
+from .console import console
+from .redos import DEFAULT_BUDGET, EXPONENTIAL, RuleBudget, budgeted_subn, harden
+from .reporting import record, reporting_stage
+from .tracing import traced
 from .validators import ensure_directory
 
-console = Console()
+# Splits after each newline, so every piece keeps its own ending (and only "\n" ends a line, as in git).
+_LINE_BREAK = re.compile(r"(?<=\n)")
 
 
 @dataclass
@@ -22,35 +29,104 @@ class SanitizationRule:
     description: str
     pattern: Pattern[str]
     replacement: str
+    # Set when analysis could not rule out super-linear backtracking; runs under a RuleBudget.
+    guarded: bool = False
 
+    def subn(self, text: str, budget: RuleBudget = DEFAULT_BUDGET) -> tuple[str, int]:
+        if not self.guarded:
+            return self.pattern.subn(self.replacement, text)
+        text, count, redacted = budgeted_subn(self.pattern, self.replacement, text, budget)
+        if redacted:
+            record("lines redacted over rule budget", self.description, redacted)
+        return text, count
 
-RULES = [
-    SanitizationRule(
-        "Normalize UNIX absolute paths",
-        re.compile(r"/home/[^/]+/"),
-        "$HOME/",
-    ),
-    SanitizationRule(
-        "Normalize Windows user paths",
-        re.compile(r"C:\\Users\\[^\\]+"),
-        "%USERPROFILE%",
-    ),
-    SanitizationRule(
+
+class RulePackError(ValueError):
+    """Raised when a rule pack is malformed or contains a pattern with catastrophic backtracking."""
+
+
+# Patterns stay as source strings until first use so importing the module compiles nothing.
+RULE_SOURCES = [
+    ("Normalize UNIX absolute paths", r"/home/[^/]+/", "$HOME/"),  # omniforge: allow-leak
+    ("Normalize Windows user paths", r"C:\\Users\\[^\\]+", "%USERPROFILE%"),
+    (
         "Drop tokens",
-        re.compile(r"(AKIA[A-Z0-9]{16}|ghp_[A-Za-z0-9]{36}|xox[pbar]-[A-Za-z0-9-]+)"),
+        r"(AKIA[A-Z0-9]{16}|ghp_[A-Za-z0-9]{36}|xox[pbar]-[A-Za-z0-9-]+)",
         "<redacted>",
     ),
-    SanitizationRule(
-        "Remove bearer tokens",
-        re.compile(r"Bearer\s+[A-Za-z0-9\-\._~+/]+=*"),
-        "Bearer <redacted>",
-    ),
-    SanitizationRule(
+    ("Remove bearer tokens", r"Bearer\s+[A-Za-z0-9\-\._~+/]+=*", "Bearer <redacted>"),
+    (
         "Scrub email addresses",
-        re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"),
+        # Dot-free domain labels keep the split between labels unambiguous; the old
+        # `[A-Za-z0-9.-]+\.` form backtracked quadratically on long dotted tokens.
+        r"[A-Za-z0-9._%+-]+@(?:[A-Za-z0-9-]+\.)+[A-Za-z]{2,}",
         "user@example.com",
     ),
 ]
+RULE_PACK_ENV = "OMNIFORGE_RULE_PACK"
+
+
+def build_rules(sources: Iterable[tuple[str, str, str]]) -> list[SanitizationRule]:
+    """Harden and compile rules, rejecting any whose backtracking stays exponential."""
+    rules = []
+    problems = []
+    for description, pattern, replacement in sources:
+        try:
+            hardened = harden(pattern)
+        except re.error as exc:
+            problems.append(f"{description}: invalid pattern ({exc})")
+            continue
+        if hardened.exponential:
+            issues = "; ".join(str(issue) for issue in hardened.issues if issue.severity == EXPONENTIAL)
+            problems.append(f"{description}: {issues}")
+            continue
+        rules.append(SanitizationRule(description, re.compile(hardened.pattern), replacement, hardened.guarded))
+    if problems:
+        raise RulePackError("Rejected rules: " + " | ".join(problems))
+    return rules
+
+
+def load_rule_pack(path: Path) -> list[SanitizationRule]:
+    """Load `{"rules": [{"description", "pattern", "replacement"}, ...]}` and vet every pattern."""
+    try:
+        with path.open("r", encoding="utf-8") as fp:
+            data = json.load(fp)
+    except (OSError, ValueError) as exc:
+        raise RulePackError(f"Cannot read rule pack {path}: {exc}") from exc
+    entries = data.get("rules") if isinstance(data, dict) else None
+    if not isinstance(entries, list):
+        raise RulePackError(f"{path} must contain a 'rules' list")
+    sources = []
+    for position, entry in enumerate(entries):
+        description, pattern, replacement = (
+            entry.get(key) if isinstance(entry, dict) else None for key in ("description", "pattern", "replacement")
+        )
+        if not (isinstance(description, str) and isinstance(pattern, str) and isinstance(replacement, str)):
+            raise RulePackError(f"{path}: rule {position} needs string description, pattern and replacement")
+        sources.append((description, pattern, replacement))
+    return build_rules(sources)
+
+
+def _rule_pack_path() -> Path | None:
+    configured = os.environ.get(RULE_PACK_ENV)
+    return Path(configured) if configured else None
+
+
+@lru_cache(maxsize=1)
+def compiled_rules() -> list[SanitizationRule]:
+    """Built-in rules plus the pack named by OMNIFORGE_RULE_PACK, if any."""
+    rules = build_rules(RULE_SOURCES)
+    pack = _rule_pack_path()
+    if pack is not None:
+        rules.extend(load_rule_pack(pack))
+    return rules
+
+
+def __getattr__(name: str) -> Any:
+    if name == "RULES":
+        return compiled_rules()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 DENYLIST_ALIASES = {
     "hashcat",
@@ -64,27 +140,55 @@ PORTABLE_OUTPUT = Path("artifacts/zshrc.portable")
 SANITIZATION_LOG = Path("docs/SANITIZATION_REPORT.md")
 
 
+@traced()
 def apply_rules(content: str) -> str:
     scrubbed = content
-    for rule in RULES:
-        scrubbed, count = re.subn(rule.pattern, rule.replacement, scrubbed)
+    for rule in compiled_rules():
+        scrubbed, count = rule.subn(scrubbed)
         if count:
-            console.print(f"[yellow]Applied rule[/yellow] {rule.description}: {count} substitutions")
+            record("rule substitutions", rule.description, count)
     return scrubbed
 
 
+def rules_fingerprint() -> str:
+    """Changes whenever a rule or the alias denylist does; keys caches of sanitizer results."""
+    rules = [(rule.description, rule.pattern.pattern, rule.replacement) for rule in compiled_rules()]
+    payload = json.dumps([rules, sorted(DENYLIST_ALIASES)], sort_keys=True)
+    return sha256(payload.encode("utf-8")).hexdigest()
+
+
+def denylisted_alias(line: str) -> str | None:
+    """Return the alias name when `line` defines a denylisted alias."""
+    if line.startswith("alias "):
+        alias_name = line.split("=", maxsplit=1)[0].replace("alias", "").strip()
+        if alias_name in DENYLIST_ALIASES:
+            return alias_name
+    return None
+
+
+def scrub_text(content: str) -> str:
+    """Sanitize whole lines silently, keeping their endings and dropping denylisted aliases. Used by the git filter.
+
+    Each rule sees the batch at once, so a guarded rule costs one worker round trip per batch, not per line.
+    """
+    for rule in compiled_rules():
+        content, _ = rule.subn(content)
+    lines = _LINE_BREAK.split(content)
+    return "".join(line for line in lines if denylisted_alias(line.rstrip("\r\n")) is None)
+
+
 def strip_denylisted_aliases(content: str) -> str:
     lines = []
     for line in content.splitlines():
-        if line.startswith("alias "):
-            alias_name = line.split("=", maxsplit=1)[0].replace("alias", "").strip()
-            if alias_name in DENYLIST_ALIASES:
-                console.print(f"[red]Removed sensitive alias[/red]: {alias_name}")
-                continue
+        alias_name = denylisted_alias(line)
+        if alias_name is not None:
+            record("aliases removed", alias_name)
+            continue
         lines.append(line)
     return "\n".join(lines) + "\n"
 
 
+@traced()
 def sanitize_zshrc(
     source: Path | None = None,
     destination: Path | None = None,
@@ -101,8 +205,9 @@ def sanitize_zshrc(
         raise FileNotFoundError(f"No .zshrc found at {source}")
 
     content = source.read_text(encoding="utf-8")
-    content = apply_rules(content)
-    content = strip_denylisted_aliases(content)
+    with reporting_stage("sanitize"):
+        content = apply_rules(content)
+        content = strip_denylisted_aliases(content)
 
     destination.write_text(content, encoding="utf-8")
     checksum = sha256(destination.read_bytes()).hexdigest()
@@ -0,0 +1,193 @@
+"""Read-only leak scan of the repository with the sanitizer rules, incremental by git blob id."""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from hashlib import sha1
+from pathlib import Path
+
+from .archive import walk_files
+from .cache import load_state, store_state
+from .console import console
+from .git_session import GitSession, GitSessionError
+from .redos import budgeted_findall
+from .sanitizer import compiled_rules, denylisted_alias, rules_fingerprint
+from .tracing import traced
+
+SCAN_ROOTS = (Path("artifacts"), Path("docs"), Path("scripts"), Path("tool"))
+# Lines carrying this marker are skipped, e.g. the rule patterns in sanitizer.py.
+ALLOW_MARKER = "omniforge: allow-leak"
+# Below this many changed files, starting worker processes costs more than it saves.
+POOL_THRESHOLD = 32
+BATCH_SIZE = 16
+# Matches longer than this are cut to a short prefix in reports.
+MASK_LIMIT = 6
+MASK_PREFIX = 4
+
+
+class ScanError(RuntimeError):
+    """Raised when a scan gate finds potential leaks."""
+
+
+@dataclass
+class Finding:
+    path: str
+    line: int
+    rule: str
+    excerpt: str
+
+
+@dataclass
+class ScanReport:
+    files: int = 0
+    scanned: int = 0
+    cached: int = 0
+    findings: list[Finding] = field(default_factory=list)
+
+
+def _mask(text: str) -> str:
+    # Never echo a full secret into terminals or CI logs.
+    return text if len(text) <= MASK_LIMIT else text[:MASK_PREFIX] + "…"
+
+
+def scan_text(path: str, text: str) -> list[Finding]:
+    findings = []
+    lines = ["" if ALLOW_MARKER in line else line for line in text.splitlines()]
+    rules = compiled_rules()
+    # Guarded rules only run in the budget worker, one batch per rule.
+    budgeted = {index: budgeted_findall(rule.pattern, lines) for index, rule in enumerate(rules) if rule.guarded}
+    for number, line in enumerate(lines, start=1):
+        if not line:
+            continue
+        for index, rule in enumerate(rules):
+            if rule.guarded:
+                matches = budgeted[index][number - 1]
+            else:
+                matches = [match.group(0) for match in rule.pattern.finditer(line)]
+            if matches is None:
+                # Fail closed: a line the rule cannot scan within budget is reported, not skipped.
+                findings.append(Finding(path, number, rule.description, "line exceeds rule budget"))
+                continue
+            # Text already in its sanitized form (e.g. user@example.com) is not a leak.
+            findings.extend(
+                Finding(path, number, rule.description, _mask(match)) for match in matches if match != rule.replacement
+            )
+        alias_name = denylisted_alias(line)
+        if alias_name is not None:
+            findings.append(Finding(path, number, "Denylisted alias", alias_name))
+    return findings
+
+
+def scan_file(path: str) -> list[Finding]:
+    try:
+        data = Path(path).read_bytes()
+    except OSError:
+        return []
+    if b"\0" in data[:8192]:
+        return []
+    return scan_text(path, data.decode("utf-8", errors="replace"))
+
+
+def _scan_batch(paths: Sequence[str]) -> list[tuple[str, list[Finding]]]:
+    return [(path, scan_file(path)) for path in paths]
+
+
+def _git_inventory(roots: Sequence[Path]) -> dict[str, str] | None:
+    """Map each non-ignored file under `roots` to its blob id, or None outside a git work tree."""
+    session = GitSession(echo=False)
+    pathspec = [root.as_posix() for root in roots]
+    try:
+        listed = session.run(["ls-files", "-z", "--cached", "--others", "--exclude-standard", "--", *pathspec])
+        # Deleted-but-tracked files are still listed; hash only what is on disk.
+        paths = sorted({path for path in listed.stdout.decode("utf-8").split("\0") if path and os.path.isfile(path)})
+        if not paths:
+            return {}
+        # --no-filters hashes the bytes on disk, which is what the scan reads.
+        hashed = session.run(["hash-object", "--no-filters", "--stdin-paths"], input="\n".join(paths).encode("utf-8"))
+    except (GitSessionError, OSError):
+        return None
+    return dict(zip(paths, hashed.stdout.decode("ascii").split()))
+
+
+def _walk_inventory(roots: Sequence[Path]) -> dict[str, str]:
+    inventory = {}
+    for root in roots:
+        if not root.exists():
+            continue
+        for path in walk_files(root):
+            data = path.read_bytes()
+            inventory[path.as_posix()] = sha1(b"blob %d\0" % len(data) + data).hexdigest()
+    return inventory
+
+
+@traced()
+def scan_repository(
+    roots: Iterable[Path] = SCAN_ROOTS,
+    workers: int | None = None,
+    use_cache: bool = True,
+) -> ScanReport:
+    """Scan files under `roots`, skipping blobs an earlier scan with the same rules found clean."""
+    roots = list(roots)
+    inventory = _git_inventory(roots)
+    if inventory is None:
+        inventory = _walk_inventory(roots)
+
+    fingerprint = rules_fingerprint()
+    state = load_state("scan") if use_cache else {}
+    clean = set(state.get("clean", [])) if state.get("rules") == fingerprint else set()
+
+    report = ScanReport(files=len(inventory))
+    pending = sorted(path for path, blob in inventory.items() if blob not in clean)
+    report.cached = report.files - len(pending)
+    report.scanned = len(pending)
+
+    if len(pending) < POOL_THRESHOLD or workers == 1:
+        results = _scan_batch(pending)
+    else:
+        batches = [pending[start : start + BATCH_SIZE] for start in range(0, len(pending), BATCH_SIZE)]
+        # Spawned workers import the rules afresh instead of forking a process that may hold threads.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            results = [item for batch in pool.map(_scan_batch, batches) for item in batch]
+
+    for path, findings in results:
+        if findings:
+            report.findings.extend(findings)
+        else:
+            clean.add(inventory[path])
+    # Blobs no longer in the tree are dropped so the cache tracks the current checkout.
+    current = set(inventory.values())
+    store_state("scan", {"rules": fingerprint, "clean": sorted(clean & current)})
+    return report
+
+
+def print_report(report: ScanReport) -> None:
+    if report.findings:
+        from rich.table import Table  # noqa: PLC0415
+
+        table = Table(title="Potential leaks")
+        table.add_column("File", style="cyan")
+        table.add_column("Line", justify="right")
+        table.add_column("Rule", style="magenta")
+        table.add_column("Match")
+        for finding in report.findings:
+            table.add_row(finding.path, str(finding.line), finding.rule, finding.excerpt)
+        console.print(table)
+    colour = "red" if report.findings else "green"
+    console.print(
+        f"[{colour}]{len(report.findings)} findings[/{colour}] in {report.files} files "
+        f"({report.scanned} scanned, {report.cached} unchanged since a clean scan)"
+    )
+
+
+def ensure_clean(roots: Iterable[Path] = SCAN_ROOTS) -> ScanReport:
+    """Gate for `publish`: print the report and raise ScanError if anything matched."""
+    report = scan_repository(roots)
+    print_report(report)
+    if report.findings:
+        raise ScanError(f"Leak scan found {len(report.findings)} potential leaks; release aborted")
+    return report
@@ -0,0 +1,282 @@
+"""JSON Schema validation compiled to Python functions and cached on disk."""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import marshal
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import cache
+from hashlib import sha256
+from pathlib import Path
+from types import CodeType
+from typing import Any
+
+from .cache import cache_dir
+
+SCHEMA_DIR = Path(__file__).parent / "schemas"
+SCHEMAS = {
+    "settings": SCHEMA_DIR / "terminal-profiles.schema.json",
+    "manifest": SCHEMA_DIR / "manifest.schema.json",
+}
+# Bump whenever the generated code changes shape so stale cache entries are ignored.
+GENERATOR_VERSION = "2"
+
+_TYPE_CHECKS = {
+    "object": "isinstance({v}, dict)",
+    "array": "isinstance({v}, list)",
+    "string": "isinstance({v}, str)",
+    "boolean": "isinstance({v}, bool)",
+    "null": "{v} is None",
+    "integer": "(isinstance({v}, int) and not isinstance({v}, bool)"
+    " or isinstance({v}, float) and {v}.is_integer())",
+    "number": "(isinstance({v}, (int, float)) and not isinstance({v}, bool))",
+}
+
+Validator = Callable[[Any], list["SchemaViolation"]]
+
+
+class SchemaError(ValueError):
+    """Raised when a schema cannot be compiled."""
+
+
+@dataclass(frozen=True)
+class SchemaViolation:
+    pointer: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.pointer or '/'}: {self.message}"
+
+
+def _escape(key: str) -> str:
+    return key.replace("~", "~0").replace("/", "~1")
+
+
+class _Generator:
+    """Emit one Python function per schema node; $ref targets share a function."""
+
+    def __init__(self, root: Any) -> None:
+        self.root = root
+        self.names: dict[int, str] = {}
+        self.pending: list[tuple[str, Any]] = []
+        self.header: list[str] = []
+        self.body: list[str] = []
+
+    def function_for(self, node: Any) -> str:
+        if isinstance(node, dict) and "$ref" in node and len(node) == 1:
+            node = self._resolve(node["$ref"])
+        if id(node) not in self.names:
+            name = f"_v{len(self.names)}"
+            self.names[id(node)] = name
+            self.pending.append((name, node))
+        return self.names[id(node)]
+
+    def literal(self, value: Any) -> str:
+        name = f"_k{len(self.header)}"
+        self.header.append(f"{name} = {value!r}")
+        return name
+
+    def _resolve(self, ref: str) -> Any:
+        if not ref.startswith("#"):
+            raise SchemaError(f"Only local $ref values are supported, got {ref!r}")
+        node = self.root
+        for token in filter(None, ref[1:].split("/")):
+            part = token.replace("~1", "/").replace("~0", "~")
+            try:
+                node = node[int(part)] if isinstance(node, list) else node[part]
+            except (KeyError, IndexError, ValueError) as exc:
+                raise SchemaError(f"Unresolvable $ref {ref!r}") from exc
+        return node
+
+    def generate(self) -> tuple[str, str]:
+        entry = self.function_for(self.root)
+        while self.pending:
+            name, node = self.pending.pop()
+            self.body.extend(self._function(name, node))
+        source = "\n".join(["import re", *self.header, "", *self.body])
+        return source, entry
+
+    def _function(self, name: str, node: Any) -> list[str]:
+        lines = [f"def {name}(d, p, e):"]
+        if node is False:
+            return [*lines, "    e.append((p, 'is not allowed'))", ""]
+        if not isinstance(node, dict):
+            return [*lines, "    return", ""]
+
+        body: list[str] = []
+        if "$ref" in node:
+            body.append(f"{self.function_for(self._resolve(node['$ref']))}(d, p, e)")
+        types = node.get("type")
+        if types is not None:
+            names = [types] if isinstance(types, str) else list(types)
+            condition = " or ".join(_TYPE_CHECKS[t].format(v="d") for t in names)
+            body += [f"if not ({condition}):", f"    e.append((p, {'expected ' + ' or '.join(names)!r}))", "    return"]
+        if "enum" in node:
+            body += [
+                f"if d not in {self.literal(node['enum'])}:",
+                f"    e.append((p, {'must be one of ' + json.dumps(node['enum'])!r}))",
+            ]
+        if "const" in node:
+            body += [f"if d != {self.literal(node['const'])}:", f"    e.append((p, {'must equal ' + json.dumps(node['const'])!r}))"]
+        body += self._object(node)
+        body += self._array(node)
+        body += self._string(node)
+        body += self._number(node)
+        for sub in node.get("allOf", []):
+            body.append(f"{self.function_for(sub)}(d, p, e)")
+        if "anyOf" in node:
+            funcs = ", ".join(self.function_for(sub) for sub in node["anyOf"])
+            body += [f"_b = _branches(({funcs},), d, p)", "if [] not in _b:", "    _closest(_b, p, e)"]
+        if "oneOf" in node:
+            funcs = ", ".join(self.function_for(sub) for sub in node["oneOf"])
+            body += [
+                f"_b = _branches(({funcs},), d, p)",
+                "_n = _b.count([])",
+                "if _n == 0:",
+                "    _closest(_b, p, e)",
+                "elif _n > 1:",
+                "    e.append((p, 'matches %d schemas, expected exactly one' % _n))",
+            ]
+        if "not" in node:
+            body += [f"if _ok({self.function_for(node['not'])}, d, p):", "    e.append((p, 'matches a disallowed schema'))"]
+        lines += [f"    {line}" for line in body or ["return"]]
+        return [*lines, ""]
+
+    def _object(self, node: dict[str, Any]) -> list[str]:
+        properties: dict[str, Any] = node.get("properties", {})
+        required: list[str] = node.get("required", [])
+        additional = node.get("additionalProperties", True)
+        if not properties and not required and additional is True and "minProperties" not in node:
+            return []
+        lines = ["if isinstance(d, dict):"]
+        for key in required:
+            lines += [f"    if {key!r} not in d:", f"        e.append((p, {'missing required property ' + repr(key)!r}))"]
+        for key, sub in properties.items():
+            lines += [
+                f"    if {key!r} in d:",
+                f"        {self.function_for(sub)}(d[{key!r}], p + {'/' + _escape(key)!r}, e)",
+            ]
+        if "minProperties" in node:
+            lines += [f"    if len(d) < {int(node['minProperties'])}:", "        e.append((p, 'too few properties'))"]
+        if additional is not True:
+            known = self.literal(frozenset(properties))
+            lines += ["    for _k, _x in d.items():", f"        if _k in {known}:", "            continue"]
+            if additional is False:
+                lines.append("        e.append((p + '/' + _esc(_k), 'unexpected property'))")
+            else:
+                lines.append(f"        {self.function_for(additional)}(_x, p + '/' + _esc(_k), e)")
+        return lines
+
+    def _array(self, node: dict[str, Any]) -> list[str]:
+        checks: list[str] = []
+        if "minItems" in node:
+            checks += [f"if len(d) < {int(node['minItems'])}:", f"    e.append((p, 'expected at least {int(node['minItems'])} items'))"]
+        if "maxItems" in node:
+            checks += [f"if len(d) > {int(node['maxItems'])}:", f"    e.append((p, 'expected at most {int(node['maxItems'])} items'))"]
+        if isinstance(node.get("items"), (dict, bool)):
+            func = self.function_for(node["items"])
+            checks += ["for _i, _x in enumerate(d):", f"    {func}(_x, p + '/' + str(_i), e)"]
+        if not checks:
+            return []
+        return ["if isinstance(d, list):", *(f"    {line}" for line in checks)]
+
+    def _string(self, node: dict[str, Any]) -> list[str]:
+        checks: list[str] = []
+        if "minLength" in node:
+            checks += [f"if len(d) < {int(node['minLength'])}:", f"    e.append((p, 'shorter than {int(node['minLength'])} characters'))"]
+        if "maxLength" in node:
+            checks += [f"if len(d) > {int(node['maxLength'])}:", f"    e.append((p, 'longer than {int(node['maxLength'])} characters'))"]
+        if "pattern" in node:
+            name = f"_r{len(self.header)}"
+            self.header.append(f"{name} = re.compile({node['pattern']!r})")
+            checks += [f"if not {name}.search(d):", f"    e.append((p, {'does not match ' + node['pattern']!r}))"]
+        if not checks:
+            return []
+        return ["if isinstance(d, str):", *(f"    {line}" for line in checks)]
+
+    def _number(self, node: dict[str, Any]) -> list[str]:
+        checks: list[str] = []
+        if "minimum" in node:
+            checks += [f"if d < {node['minimum']!r}:", f"    e.append((p, 'less than {node['minimum']}'))"]
+        if "maximum" in node:
+            checks += [f"if d > {node['maximum']!r}:", f"    e.append((p, 'greater than {node['maximum']}'))"]
+        if not checks:
+            return []
+        return ["if isinstance(d, (int, float)) and not isinstance(d, bool):", *(f"    {line}" for line in checks)]
+
+
+_Errors = list[tuple[str, str]]
+
+
+def _ok(func: Callable[[Any, str, _Errors], None], data: Any, pointer: str) -> bool:
+    errors: _Errors = []
+    func(data, pointer, errors)
+    return not errors
+
+
+def _branches(funcs: tuple[Callable[[Any, str, _Errors], None], ...], data: Any, pointer: str) -> list[_Errors]:
+    results: list[_Errors] = []
+    for func in funcs:
+        errors: _Errors = []
+        func(data, pointer, errors)
+        results.append(errors)
+    return results
+
+
+def _closest(branches: list[_Errors], pointer: str, errors: _Errors) -> None:
+    # Report the violations of the branch whose type matched, so nested problems stay visible.
+    candidates: list[_Errors] = [
+        branch
+        for branch in branches
+        if not any(where == pointer and message.startswith("expected ") for where, message in branch)
+    ]
+    if candidates:
+        closest: _Errors = min(candidates, key=len)
+        errors.extend(closest)
+    else:
+        errors.append((pointer, "does not match any allowed schema"))
+
+
+def _compile_code(schema: Any) -> tuple[CodeType, str]:
+    source, entry = _Generator(schema).generate()
+    return compile(source, "<omniforge-schema>", "exec"), entry
+
+
+def _bind(code: CodeType, entry: str) -> Validator:
+    namespace: dict[str, Any] = {"_ok": _ok, "_branches": _branches, "_closest": _closest, "_esc": _escape}
+    exec(code, namespace)
+    func = namespace[entry]
+
+    def validate(data: Any) -> list[SchemaViolation]:
+        errors: list[tuple[str, str]] = []
+        func(data, "", errors)
+        return [SchemaViolation(pointer, message) for pointer, message in errors]
+
+    return validate
+
+
+def compile_schema(schema: Any) -> Validator:
+    return _bind(*_compile_code(schema))
+
+
+@cache
+def load_validator(name: str) -> Validator:
+    """Return the validator for a bundled schema, reusing compiled code cached on disk."""
+    raw = SCHEMAS[name].read_bytes()
+    key = sha256(raw + GENERATOR_VERSION.encode() + importlib.util.MAGIC_NUMBER).hexdigest()[:16]
+    cached = cache_dir() / "schemas" / f"{name}-{key}.bin"
+    try:
+        entry, code = marshal.loads(cached.read_bytes())
+    except (OSError, ValueError, EOFError, TypeError):
+        code, entry = _compile_code(json.loads(raw))
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        partial = cached.with_name(cached.name + ".part")
+        partial.write_bytes(marshal.dumps((entry, code)))
+        partial.replace(cached)
+    return _bind(code, entry)
+
+
+def validate_document(data: Any, name: str) -> list[SchemaViolation]:
+    return load_validator(name)(data)
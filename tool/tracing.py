@@ -0,0 +1,128 @@
+"""Span-based tracing that writes Chrome trace-event JSON, and a cProfile wrapper."""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Tracer:
+    """Collects complete ("X") events; list.append keeps recording safe across worker threads."""
+
+    def __init__(self) -> None:
+        self.events: list[dict[str, Any]] = []
+        self.origin = time.perf_counter_ns()
+        self.pid = os.getpid()
+
+    def record(self, name: str, started: int, ended: int, args: dict[str, Any]) -> None:
+        event: dict[str, Any] = {
+            "name": name,
+            "ph": "X",
+            "ts": (started - self.origin) / 1000,
+            "dur": (ended - started) / 1000,
+            "pid": self.pid,
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = {key: str(value) for key, value in args.items()}
+        self.events.append(event)
+
+    def write(self, path: Path) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"traceEvents": sorted(self.events, key=lambda event: event["ts"]), "displayTimeUnit": "ms"}
+        path.write_text(json.dumps(payload, indent=1) + "\n", encoding="utf-8")
+        return path
+
+
+class _Active:
+    """Process-wide slot for the running tracer; worker threads read it too, so no ContextVar."""
+
+    tracer: Tracer | None = None
+
+
+def active_tracer() -> Tracer | None:
+    return _Active.tracer
+
+
+def start_tracing() -> Tracer:
+    _Active.tracer = Tracer()
+    return _Active.tracer
+
+
+def stop_tracing(path: Path | None = None) -> Tracer | None:
+    """Disable tracing and, when `path` is given, write the collected events there."""
+    tracer, _Active.tracer = _Active.tracer, None
+    if tracer is not None and path is not None:
+        tracer.write(path)
+    return tracer
+
+
+@contextmanager
+def tracing(destination: Path) -> Iterator[Tracer]:
+    tracer = start_tracing()
+    try:
+        yield tracer
+    finally:
+        stop_tracing(destination)
+
+
+@contextmanager
+def span(name: str, **args: Any) -> Iterator[None]:
+    tracer = _Active.tracer
+    if tracer is None:
+        yield
+        return
+    started = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        tracer.record(name, started, time.perf_counter_ns(), args)
+
+
+def traced(name: str | None = None) -> Callable[[F], F]:
+    """Decorator form of `span`; when tracing is off the wrapper only checks one global."""
+
+    def decorate(func: F) -> F:
+        label = name or f"{func.__module__.removeprefix('tool.')}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            tracer = _Active.tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                tracer.record(label, started, time.perf_counter_ns(), {})
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+@contextmanager
+def profiled(destination: Path, limit: int = 25) -> Iterator[None]:
+    """Run the body under cProfile, dump raw stats to `destination`, and print the top entries to stderr."""
+    import cProfile  # noqa: PLC0415
+    import pstats  # noqa: PLC0415
+    import sys  # noqa: PLC0415
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(destination)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(limit)
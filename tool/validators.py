@@ -5,20 +5,15 @@ from __future__ import annotations
 import json
 import os
 import platform
-import subprocess
+import sys
 from collections.abc import Iterable
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
+from hashlib import sha256
 from pathlib import Path
 
-try:
-    from rich.console import Console
-    from rich.table import Table
-except ImportError as exc:  # pragma: no cover - dependency guard
-    raise RuntimeError(
-        "The 'rich' package is required. Install dependencies with `pip install -r requirements.txt`."
-    ) from exc
-
-console = Console()
+from .console import console
+from .environment import probe_environment, refresh_terminal_installs
+from .schema import validate_document
 
 
 @dataclass
@@ -29,12 +24,7 @@ class DiagnosticResult:
 
 
 def detect_environment() -> str:
-    system = platform.system().lower()
-    if system == "windows":
-        return "windows"
-    if "microsoft" in platform.release().lower():
-        return "wsl"
-    return system
+    return probe_environment().environment
 
 
 def ensure_python_version(min_major: int = 3, min_minor: int = 10) -> None:
@@ -69,7 +59,14 @@ def validate_manifest(entries: Iterable[Path]) -> list[DiagnosticResult]:
     with manifest.open("r", encoding="utf-8") as fp:
         data = json.load(fp)
 
-    paths = {Path(item["path"]) for item in data.get("artifacts", [])}
+    for violation in validate_document(data, "manifest"):
+        diagnostics.append(DiagnosticResult(name="Manifest schema", status="error", details=str(violation)))
+    artifacts = data.get("artifacts", []) if isinstance(data, dict) else []
+    paths = {
+        Path(item["path"])
+        for item in artifacts
+        if isinstance(item, dict) and isinstance(item.get("path"), str)
+    }
     for entry in entries:
         status = "ok" if entry in paths else "missing"
         diagnostics.append(
@@ -82,44 +79,54 @@ def validate_manifest(entries: Iterable[Path]) -> list[DiagnosticResult]:
     return diagnostics
 
 
-def run_diagnostics() -> None:
-    ensure_python_version()
-    environment = detect_environment()
-
-    results: list[DiagnosticResult] = [
-        DiagnosticResult("Environment", "ok", environment),
-    ]
+def verify_manifest(manifest: Path = Path("artifacts/manifest.json")) -> list[DiagnosticResult]:
+    """Compare each artifact's recorded sha256 with the file on disk."""
+    if not manifest.exists():
+        return [DiagnosticResult(name="Manifest", status="error", details=f"{manifest} missing")]
+    with manifest.open("r", encoding="utf-8") as fp:
+        data = json.load(fp)
 
-    wt_settings = Path("artifacts/settings.json")
-    zsh_portable = Path("artifacts/zshrc.portable")
+    results: list[DiagnosticResult] = []
+    for item in data.get("artifacts", []) if isinstance(data, dict) else []:
+        if not isinstance(item, dict) or not isinstance(item.get("path"), str):
+            continue
+        path = Path(item["path"])
+        if not path.exists():
+            results.append(DiagnosticResult(name=item["path"], status="missing", details="File not found"))
+            continue
+        digest = sha256(path.read_bytes()).hexdigest()
+        if digest == item.get("sha256"):
+            results.append(DiagnosticResult(name=item["path"], status="ok", details="Hash matches manifest"))
+            continue
+        if "canonical_sha256" in item:
+            # Reformatting or reordering keys changes the bytes but not the document.
+            from .canonical import canonical_file_digest  # noqa: PLC0415
 
-    for path in (wt_settings, zsh_portable):
-        if path.exists():
             try:
-                if path.suffix == ".json":
-                    validate_json(path)
-                results.append(DiagnosticResult(path.name, "ok", "Readable"))
-            except ValueError as exc:
-                results.append(DiagnosticResult(path.name, "error", str(exc)))
-        else:
-            results.append(DiagnosticResult(path.name, "missing", "File not found"))
-
-    results.extend(validate_manifest([wt_settings, zsh_portable]))
-
-    git_status = subprocess.run(
-        ["git", "status", "--short"],
-        capture_output=True,
-        text=True,
-        check=False,
-    )
-    clean = not git_status.stdout.strip()
-    results.append(
-        DiagnosticResult(
-            "Git status",
-            "ok" if clean else "dirty",
-            "Working tree clean" if clean else git_status.stdout.strip(),
-        )
-    )
+                canonical = canonical_file_digest(path)
+            except ValueError:
+                canonical = None
+            if canonical == item["canonical_sha256"]:
+                results.append(
+                    DiagnosticResult(name=item["path"], status="ok", details="Canonical JSON matches manifest")
+                )
+                continue
+        results.append(DiagnosticResult(name=item["path"], status="mismatch", details=f"sha256 {digest}"))
+    return results
+
+
+def run_diagnostics(output_format: str = "table", use_cache: bool = True) -> list[DiagnosticResult]:
+    # diagnostics registers checks built from the helpers in this module.
+    from .diagnostics import DiagnosticsEngine  # noqa: PLC0415
+
+    ensure_python_version()
+    results = DiagnosticsEngine(use_cache=use_cache).run()
+
+    if output_format == "json":
+        sys.stdout.write(json.dumps([asdict(result) for result in results], indent=2) + "\n")
+        return results
+
+    from rich.table import Table  # noqa: PLC0415
 
     table = Table(title="Diagnostics")
     table.add_column("Check", style="cyan")
@@ -128,6 +135,7 @@ def run_diagnostics() -> None:
     for result in results:
         table.add_row(result.name, result.status, result.details)
     console.print(table)
+    return results
 
 
 def ensure_directory(path: Path) -> None:
@@ -135,29 +143,14 @@ def ensure_directory(path: Path) -> None:
 
 
 def resolve_windows_terminal_path() -> Path:
-    local_app_data = os.environ.get("LOCALAPPDATA")
-    if not local_app_data:
+    if not os.environ.get("LOCALAPPDATA"):
         raise FileNotFoundError("LOCALAPPDATA environment variable is not set")
 
-    candidates = [
-        Path(local_app_data)
-        / "Packages"
-        / "Microsoft.WindowsTerminal_8wekyb3d8bbwe"
-        / "LocalState"
-        / "settings.json",
-        Path(local_app_data)
-        / "Packages"
-        / "Microsoft.WindowsTerminalPreview_8wekyb3d8bbwe"
-        / "LocalState"
-        / "settings.json",
-        Path(local_app_data)
-        / "Microsoft"
-        / "Windows Terminal"
-        / "settings.json",
-    ]
-
-    for candidate in candidates:
-        if candidate.exists():
-            return candidate
-
-    raise FileNotFoundError("Windows Terminal settings.json not found in known locations")
+    settings = probe_environment().windows_terminal_settings
+    if settings is None or not settings.exists():
+        # The cached install disappeared, or settings.json was created on first launch without
+        # touching the watched directories. Re-stat just those paths; tools and WSL are unaffected.
+        settings = refresh_terminal_installs().windows_terminal_settings
+    if settings is None:
+        raise FileNotFoundError("Windows Terminal settings.json not found in known locations")
+    return settings
@@ -0,0 +1,148 @@
+"""Local vendor cache of git mirrors and font archives for offline installs."""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import urllib.parse
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+
+from .console import console
+from .downloads import DownloadCache, DownloadError
+from .tracing import span
+
+CACHE_ROOT = Path("vendor/cache")
+
+
+@dataclass(frozen=True)
+class VendorSource:
+    name: str
+    url: str
+    sha256: str | None = None
+    # A `sha256sum`-style list published with the release, consulted when no digest is pinned.
+    checksums: str | None = None
+
+
+GIT_SOURCES = (
+    VendorSource("oh-my-zsh", "https://github.com/ohmyzsh/ohmyzsh"),
+    VendorSource("zsh-syntax-highlighting", "https://github.com/zsh-users/zsh-syntax-highlighting"),
+    VendorSource("zsh-autosuggestions", "https://github.com/zsh-users/zsh-autosuggestions"),
+)
+
+# Overrides every other digest source, e.g. to pin a mirrored archive.
+FONT_SHA256_ENV = "OMNIFORGE_FONT_SHA256"
+FONT_SOURCES = (
+    VendorSource(
+        "CascadiaCode.zip",
+        "https://github.com/ryanoasis/nerd-fonts/releases/download/v3.1.1/CascadiaCode.zip",
+        checksums="https://github.com/ryanoasis/nerd-fonts/releases/download/v3.1.1/SHA-256.txt",
+    ),
+)
+
+
+class VendorCacheError(RuntimeError):
+    """Raised when the vendor cache cannot satisfy a request."""
+
+
+@dataclass
+class SyncResult:
+    mirrors: list[Path]
+    fonts: list[Path]
+
+
+def _git(args: list[str]) -> None:
+    console.print(f"[cyan]$ git {' '.join(args)}")
+    with span(f"git {args[0]}", argv=" ".join(args)):
+        subprocess.run(["git", *args], check=True, text=True)
+
+
+def mirror_path(name: str, root: Path = CACHE_ROOT) -> Path:
+    return root / "git" / f"{name}.git"
+
+
+def font_cache(root: Path = CACHE_ROOT) -> DownloadCache:
+    return DownloadCache(root / "fonts")
+
+
+def sync_mirror(source: VendorSource, root: Path = CACHE_ROOT) -> Path:
+    mirror = mirror_path(source.name, root)
+    if mirror.exists():
+        _git(["--git-dir", str(mirror), "remote", "update", "--prune"])
+    else:
+        mirror.parent.mkdir(parents=True, exist_ok=True)
+        _git(["clone", "--mirror", source.url, str(mirror)])
+    return mirror
+
+
+def _published_checksum(source: VendorSource, root: Path, offline: bool) -> str | None:
+    """The digest the release's checksum list gives for `source`; the list is cached like the archive."""
+    if source.checksums is None:
+        return None
+    cache = font_cache(root)
+    try:
+        listing = cache.lookup(source.checksums) if offline else cache.fetch(source.checksums)
+    except (DownloadError, OSError) as exc:
+        raise VendorCacheError(f"Cannot read the published checksums for {source.name}: {exc}") from exc
+    if listing is None:
+        return None
+    archive = PurePosixPath(urllib.parse.urlparse(source.url).path).name
+    for line in listing.read_text(encoding="utf-8").splitlines():
+        # `<digest>  <name>`, with `*<name>` for files hashed in binary mode.
+        digest, _, name = line.strip().partition(" ")
+        if name.strip().lstrip("*") == archive:
+            return digest
+    return None
+
+
+def font_checksum(source: VendorSource, root: Path = CACHE_ROOT, offline: bool = False) -> str:
+    """The sha256 a font archive must match; font downloads are never accepted unverified.
+
+    OMNIFORGE_FONT_SHA256 wins, then the digest pinned on `source`, then the release's checksum list.
+    """
+    checksum = os.environ.get(FONT_SHA256_ENV) or source.sha256 or _published_checksum(source, root, offline)
+    if not checksum:
+        raise VendorCacheError(f"No sha256 known for {source.name}; set {FONT_SHA256_ENV} to the release digest")
+    return checksum.lower()
+
+
+def sync_font(source: VendorSource, root: Path = CACHE_ROOT) -> Path:
+    return font_cache(root).fetch(source.url, font_checksum(source, root))
+
+
+def sync_cache(
+    root: Path = CACHE_ROOT,
+    git_sources: Iterable[VendorSource] = GIT_SOURCES,
+    font_sources: Iterable[VendorSource] = FONT_SOURCES,
+) -> SyncResult:
+    mirrors = [sync_mirror(source, root) for source in git_sources]
+    fonts = [sync_font(source, root) for source in font_sources]
+    console.print(f"[green]Vendor cache ready[/green] → {root}")
+    return SyncResult(mirrors=mirrors, fonts=fonts)
+
+
+def clone_command(
+    name: str,
+    url: str,
+    destination: Path,
+    offline: bool = False,
+    root: Path = CACHE_ROOT,
+) -> list[str]:
+    """Return the git clone invocation that prefers the local mirror over the network."""
+    mirror = mirror_path(name, root)
+    if mirror.exists():
+        if offline:
+            return ["git", "clone", str(mirror.resolve()), str(destination)]
+        return [
+            "git",
+            "clone",
+            "--reference-if-able",
+            str(mirror.resolve()),
+            "--dissociate",
+            url,
+            str(destination),
+        ]
+    if offline:
+        raise VendorCacheError(f"{name} is not cached under {root}; run `omniforge cache sync` first")
+    return ["git", "clone", url, str(destination), "--depth", "1"]